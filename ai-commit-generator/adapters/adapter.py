@@ -1,9 +1,129 @@
+import threading
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Awaitable, Iterator, Optional, TypeVar
+
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar('T')
+
+_loop: Optional['asyncio.AbstractEventLoop'] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def _run_loop(loop: 'asyncio.AbstractEventLoop') -> None:
+    import asyncio
+
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_forever()
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def get_event_loop() -> 'asyncio.AbstractEventLoop':
+    """The process-wide event loop async requests run on, started in a daemon thread on first use.
+
+    Async HTTP pools belong to the loop that opened their connections, so
+    asyncio.run per request would also mean a new connection per request.
+    One long-lived loop lets every request, from any thread, reuse them.
+    """
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            import asyncio
+
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_run_loop, args=(_loop,), name='adapter-event-loop', daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+def get_running_event_loop() -> Optional['asyncio.AbstractEventLoop']:
+    """The shared event loop if it has been started, without starting it."""
+    return _loop
+
+
+def run_async(coroutine: Awaitable[T]) -> T:
+    """Run coroutine on the shared event loop and wait for its result.
+
+    The coroutine sees the caller's context variables, as if awaited in place.
+    """
+    import asyncio
+    import contextvars
+
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("run_async cannot wait on the shared event loop from inside it")
+    future = contextvars.copy_context().run(asyncio.run_coroutine_threadsafe, coroutine, loop)
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def stop_event_loop() -> None:
+    """Stop the shared event loop once adapters are closed; run_async starts a new one if needed."""
+    global _loop, _loop_thread
+    with _loop_lock:
+        loop, thread = _loop, _loop_thread
+        _loop = _loop_thread = None
+    if loop is not None and thread is not None:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+def _resolve(future: 'asyncio.Future', result=None, error=None) -> None:
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
 
 class LanguageModelAdapter(ABC):
+    provider: str = "unknown"
+    model: str = ""
+    requires_api_key: bool = True
     
     @abstractmethod
     def send_message(self, prompt: str) -> str:
         """Send a message to the language model and get a response"""
         pass
 
+    def stream_message(self, prompt: str) -> Iterator[str]:
+        """Yield the response in chunks as they arrive; by default one chunk with the whole answer."""
+        yield self.send_message(prompt)
+
+    async def send_message_async(self, prompt: str) -> str:
+        """Asynchronous send_message; runs the blocking call in a daemon thread unless overridden.
+
+        A daemon thread is used instead of the loop's executor so that a
+        cancelled, still-blocked request never delays shutdown.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def run() -> None:
+            result, error = None, None
+            try:
+                result = self.send_message(prompt)
+            except Exception as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                pass  # The loop already finished, e.g. after a hedge won
+
+        threading.Thread(target=run, daemon=True).start()
+        return await future
+
+    def close(self) -> None:
+        """Release connections held by the adapter; it must not be used afterwards."""
+
@@ -1,17 +1,53 @@
+from typing import Any, Dict, Iterator, Optional
 from adapters.adapter import LanguageModelAdapter
+from adapters.pooling import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_TOKENS, DEFAULT_READ_TIMEOUT, LoopLocal,
+                              close_http_clients, make_async_http_client, make_http_client, make_timeout)
 import cohere
 
 class CohereAdapter(LanguageModelAdapter):
-    
-    def __init__(self, api_key: str):
-        self.client = cohere.Client(api_key)
-        self.response = ""
-    
+    provider = "cohere"
+    model = "command-r-plus"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, model: Optional[str] = None,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT):
+        self.api_key = api_key
+        self.base_url = base_url
+        if model:
+            self.model = model
+        self.max_tokens = max_tokens
+        # The SDK passes its timeout to every request, overriding the HTTP client's own
+        timeout = make_timeout(connect_timeout, read_timeout)
+        self._http_client = make_http_client(timeout)
+        self.client = cohere.Client(api_key, base_url=base_url, timeout=timeout, httpx_client=self._http_client)
+        self._async_http_clients = LoopLocal(lambda: make_async_http_client(timeout))
+        self._async_clients = LoopLocal(lambda: cohere.AsyncClient(
+            self.api_key, base_url=self.base_url, timeout=timeout, httpx_client=self._async_http_clients.get(),
+        ))
+
+    def _request(self, prompt: str) -> Dict[str, Any]:
+        return {
+            'model': self.model,
+            'prompt': prompt,
+            'max_tokens': self.max_tokens,
+            'temperature': 0.3,
+        }
+
     def send_message(self, prompt: str) -> str:
-        response = self.client.generate(
-            model="command-r-plus",
-            prompt=prompt,
-            max_tokens=100,
-            temperature=0.3,
-        )
+        response = self.client.generate(**self._request(prompt))
         return response.generations[0].text.strip()
+
+    def stream_message(self, prompt: str) -> Iterator[str]:
+        for event in self.client.generate_stream(**self._request(prompt)):
+            if event.event_type == 'text-generation':
+                yield event.text
+            elif event.event_type == 'stream-error':
+                raise RuntimeError(f"Cohere stream failed: {event.err}")
+
+    async def send_message_async(self, prompt: str) -> str:
+        response = await self._async_clients.get().generate(**self._request(prompt))
+        return response.generations[0].text.strip()
+
+    def close(self) -> None:
+        self._async_clients.pop_all()
+        close_http_clients(self._http_client, self._async_http_clients)
@@ -0,0 +1,45 @@
+import os
+import re
+import time
+from typing import Iterator, Optional
+from adapters.adapter import LanguageModelAdapter
+
+DEFAULT_RESPONSE = "chore: update project files\n\nGenerated offline by the fake adapter."
+
+
+class FakeAdapter(LanguageModelAdapter):
+    """Offline adapter that answers every prompt with a canned message.
+
+    Used by the benchmarks and for trying the hook without a provider account;
+    FAKE_MODEL_RESPONSE overrides the message and latency simulates a request.
+    Streaming yields the message word by word, chunk_delay seconds apart.
+    """
+    provider = "fake"
+    model = "fake"
+    requires_api_key = False
+
+    def __init__(self, api_key: str = '', response: Optional[str] = None, latency: float = 0.0,
+                 chunk_delay: float = 0.0):
+        self.api_key = api_key
+        self.response = response or os.getenv('FAKE_MODEL_RESPONSE', DEFAULT_RESPONSE)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.last_prompt: Optional[str] = None
+
+    def send_message(self, prompt: str) -> str:
+        self.calls += 1
+        self.last_prompt = prompt
+        if self.latency:
+            time.sleep(self.latency)
+        return self.response
+
+    def stream_message(self, prompt: str) -> Iterator[str]:
+        self.calls += 1
+        self.last_prompt = prompt
+        if self.latency:
+            time.sleep(self.latency)
+        for index, chunk in enumerate(re.findall(r'\S+\s*|\s+', self.response)):
+            if index and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield chunk
@@ -1,17 +1,54 @@
+from typing import Any, Dict, Iterator, Optional
 import openai
 from adapters.adapter import LanguageModelAdapter
+from adapters.pooling import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_TOKENS, DEFAULT_READ_TIMEOUT, LoopLocal,
+                              close_http_clients, make_async_http_client, make_http_client, make_timeout)
 
 class OpenAIAdapter(LanguageModelAdapter):
-    
-    def __init__(self, api_key: str):
-        openai.api_key = api_key
-        self.response = ""
-    
+    provider = "openai"
+    model = "gpt-3.5-turbo"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, model: Optional[str] = None,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT):
+        self.api_key = api_key
+        self.base_url = base_url
+        if model:
+            self.model = model
+        self.max_tokens = max_tokens
+        timeout = make_timeout(connect_timeout, read_timeout)
+        # Each adapter owns its client instead of configuring the module-level one
+        self._http_client = make_http_client(timeout)
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, http_client=self._http_client)
+        self._async_http_clients = LoopLocal(lambda: make_async_http_client(timeout))
+        self._async_clients = LoopLocal(lambda: openai.AsyncOpenAI(
+            api_key=self.api_key, base_url=self.base_url, timeout=timeout, http_client=self._async_http_clients.get(),
+        ))
+
+    def _request(self, prompt: str) -> Dict[str, Any]:
+        return {
+            'model': self.model,
+            'messages': [{"role": "user", "content": prompt}],
+            'max_tokens': self.max_tokens,
+        }
+
     def send_message(self, prompt: str) -> str:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=100
-        )
+        response = self.client.chat.completions.create(**self._request(prompt))
+        content = response.choices[0].message.content
+        return content.strip() if content is not None else ""
+
+    def stream_message(self, prompt: str) -> Iterator[str]:
+        # Closing the stream releases its connection back to the pool
+        with self.client.chat.completions.create(**self._request(prompt), stream=True) as chunks:
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def send_message_async(self, prompt: str) -> str:
+        response = await self._async_clients.get().chat.completions.create(**self._request(prompt))
         content = response.choices[0].message.content
         return content.strip() if content is not None else ""
+
+    def close(self) -> None:
+        self._async_clients.pop_all()
+        close_http_clients(self._http_client, self._async_http_clients)
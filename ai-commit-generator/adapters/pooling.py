@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import weakref
+from typing import Callable, Generic, List, Tuple, TypeVar
+import httpx
+from adapters.adapter import get_running_event_loop
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_MAX_TOKENS = 100
+MAX_CONNECTIONS = 16
+MAX_KEEPALIVE_CONNECTIONS = 8
+KEEPALIVE_EXPIRY = 60.0
+
+T = TypeVar('T')
+
+
+def make_timeout(connect_timeout: float, read_timeout: float) -> httpx.Timeout:
+    """Connect timeout for establishing the connection; read timeout between received bytes and for everything else."""
+    return httpx.Timeout(read_timeout, connect=connect_timeout)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY)
+
+
+def make_http_client(timeout: httpx.Timeout) -> httpx.Client:
+    """A thread-safe client whose keep-alive pool lets calls after the first skip the TLS handshake."""
+    return httpx.Client(timeout=timeout, limits=_limits(), follow_redirects=True)
+
+
+def make_async_http_client(timeout: httpx.Timeout) -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=timeout, limits=_limits(), follow_redirects=True)
+
+
+class LoopLocal(Generic[T]):
+    """One value per running event loop, created on first use.
+
+    Async HTTP pools are bound to the loop that opened their connections.
+    Requests normally all run on the shared loop (adapters.adapter.run_async),
+    but an adapter awaited from another loop gets its own client there.
+    Entries go away with their loop.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._values: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]' = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            value = self._values.get(loop)
+            if value is None:
+                value = self._values[loop] = self._factory()
+            return value
+
+    def pop_all(self) -> List[Tuple[asyncio.AbstractEventLoop, T]]:
+        """Remove and return every (loop, value) pair."""
+        with self._lock:
+            items = list(self._values.items())
+            self._values.clear()
+            return items
+
+
+def close_http_clients(client: httpx.Client, async_clients: 'LoopLocal[httpx.AsyncClient]') -> None:
+    """Close an adapter's pools; async ones are closed on the shared loop while it is running.
+
+    Clients bound to other loops are dropped: their loop has usually ended,
+    and closing them from outside it is not possible.
+    """
+    client.close()
+    shared_loop = get_running_event_loop()
+    for loop, async_client in async_clients.pop_all():
+        if loop is shared_loop and loop.is_running():
+            asyncio.run_coroutine_threadsafe(async_client.aclose(), loop).result()
@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+from adapters.adapter import LanguageModelAdapter
+
+
+class ReplayAdapter(LanguageModelAdapter):
+    """Replays prompt/response pairs recorded in a JSON Lines file.
+
+    Given an inner adapter it records instead: every prompt is sent to the
+    inner adapter and the pair is appended to the file. Replaying can wait
+    for the recorded latency so hook timings stay realistic offline.
+    """
+    provider = "replay"
+    model = "replay"
+    requires_api_key = False
+
+    def __init__(self, api_key: str = '', path: Optional[str] = None, inner: Optional[LanguageModelAdapter] = None,
+                 replay_latency: Optional[bool] = None):
+        self.api_key = api_key
+        self.path = path or os.getenv('LANGUAGE_MODEL_REPLAY_FILE')
+        if not self.path:
+            raise ValueError("No replay file configured; set LANGUAGE_MODEL_REPLAY_FILE")
+        self.inner = inner
+        if inner is not None:
+            # Recording is transparent, e.g. for cache keys
+            self.provider = inner.provider
+            self.model = inner.model
+        if replay_latency is None:
+            replay_latency = os.getenv('LANGUAGE_MODEL_REPLAY_LATENCY', '').lower() in ('1', 'true', 'yes')
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._recordings = self._load() if inner is None else {}
+
+    @staticmethod
+    def make_key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def _load(self) -> Dict[str, dict]:
+        recordings: Dict[str, dict] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    # Later recordings of the same prompt win
+                    recordings[entry['key']] = entry
+        except FileNotFoundError:
+            pass
+        return recordings
+
+    def _lookup(self, prompt: str) -> dict:
+        key = self.make_key(prompt)
+        entry = self._recordings.get(key)
+        if entry is None:
+            raise LookupError(f"No recorded response for prompt {key[:12]} in {self.path}")
+        return entry
+
+    def record(self, prompt: str, response: str, latency: float) -> None:
+        entry = {
+            'key': self.make_key(prompt),
+            'provider': self.provider,
+            'model': self.model,
+            'latency_ms': round(latency * 1000, 3),
+            'prompt': prompt,
+            'response': response,
+        }
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def send_message(self, prompt: str) -> str:
+        if self.inner is not None:
+            start = time.perf_counter()
+            response = self.inner.send_message(prompt)
+            self.record(prompt, response, time.perf_counter() - start)
+            return response
+
+        entry = self._lookup(prompt)
+        if self.replay_latency:
+            time.sleep(entry.get('latency_ms', 0) / 1000)
+        return entry['response']
+
+    async def send_message_async(self, prompt: str) -> str:
+        if self.inner is not None:
+            start = time.perf_counter()
+            response = await self.inner.send_message_async(prompt)
+            self.record(prompt, response, time.perf_counter() - start)
+            return response
+
+        entry = self._lookup(prompt)
+        if self.replay_latency:
+            await asyncio.sleep(entry.get('latency_ms', 0) / 1000)
+        return entry['response']
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
@@ -0,0 +1,125 @@
+import json
+import os
+import stat
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, List, Optional, TypedDict
+from commit_message_generator import CommitMessageGenerator
+
+DEFAULT_JOBS = 4
+DEFAULT_RATE = 2.0
+
+REWORD_SCRIPT = """#!/bin/sh
+# Generated by ai-commit-generator batch.
+# Usage: git rebase --exec {script} <base>
+# Each rebased commit is matched to its new message by patch id.
+id=$(git diff-tree -p --root HEAD | git patch-id --stable | cut -d' ' -f1)
+if [ -n "$id" ] && [ -f '{messages}'/"$id" ]; then
+    git commit --amend --no-verify --quiet -F '{messages}'/"$id"
+fi
+exit 0
+"""
+
+
+class BatchResult(TypedDict):
+    commit: str
+    patch_id: Optional[str]
+    message: Optional[str]
+    error: Optional[str]
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how many requests start per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def list_commits(rev_range: str) -> List[str]:
+    """Non-merge commits in rev_range, oldest first."""
+    output = subprocess.check_output(['git', 'rev-list', '--reverse', '--no-merges', rev_range], text=True)
+    return output.split()
+
+
+def get_commit_diff(commit: str) -> str:
+    """The patch a commit introduces, preceded by its id as `git diff-tree` prints it."""
+    return subprocess.check_output(
+        ['git', 'diff-tree', '-p', '--root', '--no-color', '--no-ext-diff', commit],
+        text=True, errors='replace',
+    )
+
+
+def get_patch_id(diff: str) -> Optional[str]:
+    output = subprocess.run(
+        ['git', 'patch-id', '--stable'], input=diff, capture_output=True, text=True, errors='replace',
+    ).stdout
+    return output.split()[0] if output else None
+
+
+def generate_batch(commits: List[str], generator: CommitMessageGenerator, branch_name: Optional[str] = None,
+                   ticket_number: Optional[str] = None, jobs: int = DEFAULT_JOBS,
+                   rate: float = DEFAULT_RATE) -> List[BatchResult]:
+    """Generate a message for every commit using a thread pool.
+
+    At most `jobs` requests are in flight at once and new requests start at no
+    more than `rate` per second. Results keep the order of `commits`.
+    """
+    bucket = TokenBucket(rate, max(1, jobs))
+
+    def generate_one(commit: str) -> BatchResult:
+        try:
+            diff = get_commit_diff(commit)
+            patch_id = get_patch_id(diff)
+            bucket.acquire()
+            message = generator.generate_commit_message(diff, branch_name, ticket_number)
+            return BatchResult(commit=commit, patch_id=patch_id, message=message, error=None)
+        except Exception as e:
+            return BatchResult(commit=commit, patch_id=None, message=None, error=str(e))
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return list(executor.map(generate_one, commits))
+
+
+def write_jsonl(results: List[BatchResult], stream: IO[str]) -> None:
+    for result in results:
+        stream.write(json.dumps(result) + '\n')
+
+
+def write_rebase_script(results: List[BatchResult], script_path: str) -> str:
+    """Write a `git rebase --exec` script plus one message file per patch id.
+
+    Returns the messages directory.
+    """
+    script_path = os.path.abspath(script_path)
+    messages_dir = script_path + '.d'
+    os.makedirs(messages_dir, exist_ok=True)
+    for result in results:
+        if result['message'] and result['patch_id']:
+            with open(os.path.join(messages_dir, result['patch_id']), 'w', encoding='utf-8') as f:
+                f.write(result['message'] + '\n')
+
+    with open(script_path, 'w', encoding='utf-8') as f:
+        f.write(REWORD_SCRIPT.format(script=script_path, messages=messages_dir.replace("'", "'\\''")))
+    os.chmod(script_path, os.stat(script_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return messages_dir
@@ -3,7 +3,9 @@ import os
 import subprocess
 import sys
 from pathlib import Path
-from .main import main as main_function
+from typing import Optional
+from .main import main as main_function, load_environment, DEFAULT_PROVIDER
+from .language_model_factory import LanguageModelFactory
 
 @click.group()
 @click.version_option()
@@ -13,12 +15,13 @@ def cli():
 
 @cli.command()
 @click.argument('commit_msg_file')
-def generate(commit_msg_file: str):
+@click.option('--no-cache', is_flag=True, help='Ignore cached messages and summaries and always query the language model.')
+def generate(commit_msg_file: str, no_cache: bool):
     """Generate commit message (used by pre-commit hook)."""
     # This calls your existing main.py logic
     sys.argv = ['ai-commit-generator', commit_msg_file]
     try:
-        main_function()
+        main_function(use_cache=not no_cache)
         click.echo("✓ Commit message generated successfully!")
     except SystemExit as e:
         if e.code != 0:
@@ -29,7 +32,139 @@ def generate(commit_msg_file: str):
         sys.exit(1)
 
 @cli.command()
-def install():
+@click.option('--socket', 'socket_path', default=None, help='Socket path (defaults to a per-user path).')
+@click.option('--stop', is_flag=True, help='Stop the running daemon.')
+def daemon(socket_path: Optional[str], stop: bool):
+    """Run a warm background server that generates commit messages."""
+    from .daemon import DaemonError, get_socket_path, serve, stop_daemon
+
+    socket_path = socket_path or get_socket_path()
+    if stop:
+        try:
+            stopped = stop_daemon(socket_path)
+        except DaemonError as e:
+            click.echo(f"Error: {e}", err=True)
+            sys.exit(1)
+        click.echo("✓ Daemon stopped" if stopped else "No daemon is running")
+        return
+
+    load_environment()
+    click.echo(f"Listening on {socket_path} (Ctrl+C to stop)")
+    try:
+        serve(socket_path)
+    except DaemonError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+@cli.command()
+@click.argument('rev_range')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=4, show_default=True, help='Maximum concurrent requests.')
+@click.option('--rate', type=click.FloatRange(min=0, min_open=True), default=2.0, show_default=True,
+              help='Maximum new requests per second.')
+@click.option('--format', 'output_format', type=click.Choice(['jsonl', 'rebase']), default='jsonl', show_default=True,
+              help='JSON Lines, or a script for `git rebase --exec`.')
+@click.option('--output', '-o', default=None, help='Output file (JSON Lines default to stdout).')
+@click.option('--no-cache', is_flag=True, help='Ignore cached messages and always query the language model.')
+def batch(rev_range: str, jobs: int, rate: float, output_format: str, output: Optional[str], no_cache: bool):
+    """Regenerate commit messages for every commit in REV_RANGE."""
+    from .batch import generate_batch, list_commits, write_jsonl, write_rebase_script
+    from .commit_message_generator import CommitMessageGenerator, HeuristicMessageGenerator
+    from .language_model_factory import LOCAL_PROVIDERS
+    from .main import create_adapter, extract_ticket_number, get_branch_name, get_importance_matcher, get_message_cache, get_provider
+
+    try:
+        load_environment()
+        commits = list_commits(rev_range)
+        if not commits:
+            click.echo("No commits in range", err=True)
+            return
+
+        provider = get_provider()
+        adapter = None if provider in LOCAL_PROVIDERS else create_adapter(provider)
+        try:
+            if adapter is None:
+                generator = HeuristicMessageGenerator(importance=get_importance_matcher())
+            else:
+                generator = CommitMessageGenerator(adapter, None if no_cache else get_message_cache(),
+                                                   importance=get_importance_matcher())
+            branch_name = get_branch_name()
+            click.echo(f"Generating messages for {len(commits)} commits...", err=True)
+            results = generate_batch(commits, generator, branch_name, extract_ticket_number(branch_name), jobs, rate)
+        finally:
+            if adapter is not None:
+                adapter.close()
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    if output_format == 'rebase':
+        script_path = output or 'ai-commit-reword.sh'
+        write_rebase_script(results, script_path)
+        click.echo(f"✓ Wrote {script_path}; apply with: git rebase --exec {os.path.abspath(script_path)} <base>", err=True)
+    elif output:
+        with open(output, 'w', encoding='utf-8') as f:
+            write_jsonl(results, f)
+    else:
+        write_jsonl(results, sys.stdout)
+
+    failed = sum(1 for result in results if result['error'])
+    if failed:
+        click.echo(f"⚠ {failed} of {len(results)} commits failed", err=True)
+        sys.exit(1)
+
+@cli.command()
+@click.option('--foreground', is_flag=True, help='Run the worker in this process instead of detaching it.')
+@click.option('--watch', 'watch_index', is_flag=True, help='Keep watching the index and speculate on every change.')
+def speculate(foreground: bool, watch_index: bool):
+    """Pre-generate a commit message for the staged changes in the background."""
+    from .git_utils import get_git_dir
+    from .speculative import speculate_once, start_speculation, watch
+
+    git_dir = get_git_dir()
+    if not git_dir:
+        click.echo("Error: Not in a git repository", err=True)
+        sys.exit(1)
+    if watch_index:
+        click.echo("Watching the index (Ctrl+C to stop)")
+        try:
+            watch(git_dir)
+        except KeyboardInterrupt:
+            pass
+    elif foreground:
+        message = speculate_once(git_dir)
+        click.echo(message if message is not None else "No message generated", err=message is None)
+    else:
+        start_speculation(git_dir)
+
+POST_INDEX_CHANGE_HOOK = """#!/bin/sh
+# Pre-generate a commit message whenever the index changes (ai-commit-generator)
+ai-commit-generator speculate >/dev/null 2>&1 </dev/null
+exit 0
+"""
+
+def install_speculation_hook() -> None:
+    """Install a post-index-change hook that starts the speculative worker."""
+    from .git_utils import get_git_dir
+    from .speculative import SPECULATIVE_DIRNAME
+
+    git_dir = get_git_dir()
+    hook_path = Path(git_dir) / 'hooks' / 'post-index-change'
+    if hook_path.exists():
+        click.echo(f"⚠ {hook_path} already exists; add `ai-commit-generator speculate` to it "
+                   "or run `ai-commit-generator speculate --watch`")
+        return
+    hook_path.parent.mkdir(parents=True, exist_ok=True)
+    hook_path.write_text(POST_INDEX_CHANGE_HOOK)
+    hook_path.chmod(0o755)
+    # The store directory is what opts the repository in for lookups
+    (Path(git_dir) / SPECULATIVE_DIRNAME).mkdir(parents=True, exist_ok=True)
+    click.echo("✓ Installed post-index-change hook for speculative messages")
+
+@cli.command()
+@click.option('--speculative', is_flag=True, help='Also pre-generate messages in the background as changes are staged.')
+def install(speculative: bool):
     """Install pre-commit hook in current repository."""
     if not Path('.git').exists():
         click.echo("Error: Not in a git repository", err=True)
@@ -80,6 +215,9 @@ LANGUAGE_MODEL_PROVIDER=cohere
     except subprocess.CalledProcessError as e:
         click.echo(f"Error installing pre-commit hooks: {e}", err=True)
 
+    if speculative:
+        install_speculation_hook()
+
     click.echo("\n🎉 Setup complete!")
     click.echo("Don't forget to:")
     click.echo("1. Add your API key to .env")
@@ -95,8 +233,9 @@ def config():
     env_file = Path('.env')
     if env_file.exists():
         click.echo("✓ .env file found")
+        load_environment()
         api_key = os.getenv('LANGUAGE_MODEL_API_KEY')
-        provider = os.getenv('LANGUAGE_MODEL_PROVIDER', 'cohere')
+        provider = os.getenv('LANGUAGE_MODEL_PROVIDER', DEFAULT_PROVIDER)
 
         if api_key:
             click.echo(f"✓ API key configured (***{api_key[-4:]})")
@@ -104,38 +243,116 @@ def config():
             click.echo("⚠ API key not set")
 
         click.echo(f"Provider: {provider}")
+        routed = os.getenv('LANGUAGE_MODEL_PROVIDERS')
+        if routed:
+            click.echo(f"Routing between: {routed}")
     else:
         click.echo("⚠ .env file not found")
 
     click.echo("\nSupported providers:")
-    click.echo("- cohere (default)")
-    click.echo("- openai") 
-    click.echo("- anthropic")
+    for name in LanguageModelFactory.available_providers():
+        suffix = " (default)" if name == DEFAULT_PROVIDER else ""
+        click.echo(f"- {name}{suffix}")
+
+@cli.command()
+@click.option('--recent', is_flag=True, help='Only count the recent requests the router looks at.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the stats as JSON.')
+@click.option('--clear', is_flag=True, help='Delete the recorded requests.')
+def stats(recent: bool, as_json: bool, clear: bool):
+    """Show latency and error rate per provider from the local request ledger."""
+    import json
+    from .main import get_telemetry_ledger
+    from .telemetry import recent_stats, summarize_entries
+
+    ledger = get_telemetry_ledger()
+    if ledger is None:
+        click.echo("Error: Not in a git repository", err=True)
+        sys.exit(1)
+    if clear:
+        ledger.clear()
+        click.echo("✓ Request ledger cleared")
+        return
+
+    entries = ledger.read()
+    provider_stats = recent_stats(entries) if recent else summarize_entries(entries)
+    if as_json:
+        click.echo(json.dumps(provider_stats, indent=2, sort_keys=True))
+        return
+    if not provider_stats:
+        click.echo("No requests recorded yet")
+        return
+
+    def ms(value: Optional[float]) -> str:
+        return '-' if value is None else f"{value:.0f}"
+
+    click.echo(f"{'provider':<24} {'requests':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for provider, row in sorted(provider_stats.items()):
+        click.echo(f"{provider:<24} {row['requests']:>8} {row['error_rate']:>6.0%} {ms(row['p50_ms']):>8} {ms(row['p95_ms']):>8}")
 
 @cli.command()
-def test():
+@click.option('--no-cache', is_flag=True, help='Ignore cached messages and summaries and always query the language model.')
+def test(no_cache: bool):
     """Test the commit message generator with current staged changes."""
     try:
-        from .main import get_diff, get_branch_name, get_gitignore_content, extract_ticket_number, generate_commit_message
+        from .main import get_staged_changes, get_branch_name, get_gitignore_content, get_importance_matcher, extract_ticket_number, generate_commit_message, get_prompt_token_budget, get_provider
 
-        diff = get_diff()
+        load_environment()
+        provider = get_provider()
+        gitignore_content = get_gitignore_content()
+        importance = get_importance_matcher()
+        diff, file_stats = get_staged_changes(get_prompt_token_budget(provider), gitignore_content, importance, not no_cache)
         branch_name = get_branch_name()
         ticket_number = extract_ticket_number(branch_name)
-        gitignore_content = get_gitignore_content()
+
+        def show_header():
+            click.echo("\n" + "="*50)
+            click.echo("Generated Commit Message:")
+            click.echo("="*50)
+
+        streamed = []
+
+        def show_chunk(chunk: str):
+            # Print tokens as they arrive instead of waiting for the whole message
+            if not streamed:
+                show_header()
+            streamed.append(chunk)
+            click.echo(chunk, nl=False)
 
         click.echo("Generating commit message for current staged changes...")
-        commit_message = generate_commit_message(diff, branch_name, ticket_number, gitignore_content)
+        commit_message = generate_commit_message(diff, branch_name, ticket_number, gitignore_content, use_cache=not no_cache, file_stats=file_stats, importance=importance, on_text=show_chunk)
 
-        click.echo("\n" + "="*50)
-        click.echo("Generated Commit Message:")
-        click.echo("="*50)
-        click.echo(commit_message)
+        if streamed:
+            click.echo()
+        else:
+            show_header()
+            click.echo(commit_message)
         click.echo("="*50)
 
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
+@cli.command()
+@click.option('--no-cache', is_flag=True, help='Ignore cached messages and summaries and always query the language model.')
+@click.option('--no-send', is_flag=True, help='Stop after building the prompt; do not call the language model.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the raw spans as JSON.')
+def profile(no_cache: bool, no_send: bool, as_json: bool):
+    """Run the pipeline on staged changes and show how long each stage takes."""
+    import json
+    from .main import profile_pipeline
+    from .timing import format_profile
+
+    try:
+        run = profile_pipeline(use_cache=not no_cache, send=not no_send)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    if as_json:
+        click.echo(json.dumps(run.to_dict(), indent=2))
+    else:
+        click.echo(format_profile(run))
+
 def main():
     cli()
 
@@ -0,0 +1,145 @@
+import sys
+from array import array
+from typing import Dict, Iterator, List, Mapping, Set
+
+FILE_CHANGE_KEYS = ('additions', 'deletions', 'file_type', 'important_changes')
+
+
+def file_type_of(filename: str) -> str:
+    return filename.rpartition('.')[2] if '.' in filename else 'unknown'
+
+
+class FileChangeView(Mapping):
+    """Read-only FileChangeSummary-style view of one row of a ColumnarChanges."""
+
+    __slots__ = ('_changes', '_row')
+
+    def __init__(self, changes: 'ColumnarChanges', row: int):
+        self._changes = changes
+        self._row = row
+
+    def __getitem__(self, key: str):
+        changes = self._changes
+        if key == 'additions':
+            return changes.additions[self._row]
+        if key == 'deletions':
+            return changes.deletions[self._row]
+        if key == 'file_type':
+            return changes.types[changes.type_ids[self._row]]
+        if key == 'important_changes':
+            return changes.important_changes_of(self._row)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FILE_CHANGE_KEYS)
+
+    def __len__(self) -> int:
+        return len(FILE_CHANGE_KEYS)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ColumnarChanges(Mapping):
+    """Per-file change summaries stored column by column.
+
+    Additions and deletions live in parallel int arrays, file types are
+    interned into a small table and key change lines go into one shared
+    string table referenced by index, so memory per file stays roughly
+    flat even for commits touching tens of thousands of files. Reading it
+    like the old Dict[str, FileChangeSummary] gives read-only row views.
+    """
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.additions = array('q')
+        self.deletions = array('q')
+        self.type_ids = array('l')
+        self.types: List[str] = []
+        self._type_ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        # Key changes as (row, string id) pairs in insertion order
+        self._change_rows = array('l')
+        self._change_ids = array('l')
+        self._offsets = None
+        self._ordered_ids = None
+
+    def _intern(self, table: List[str], ids: Dict[str, int], value: str) -> int:
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(table)
+            table.append(sys.intern(value))
+        return index
+
+    def add(self, path: str, additions: int, deletions: int, important_changes: List[str]) -> None:
+        """Add a file's counts, merging into an existing row for a path seen before."""
+        row = self._rows.get(path)
+        if row is None:
+            row = self._rows[path] = len(self.paths)
+            self.paths.append(path)
+            self.additions.append(additions)
+            self.deletions.append(deletions)
+            self.type_ids.append(self._intern(self.types, self._type_ids, file_type_of(path)))
+        else:
+            self.additions[row] += additions
+            self.deletions[row] += deletions
+        for change in important_changes:
+            self._change_rows.append(row)
+            self._change_ids.append(self._intern(self.strings, self._string_ids, change))
+        # Any new row shifts the offsets table, even one without key changes
+        self._offsets = None
+
+    def extend(self, other: 'ColumnarChanges') -> None:
+        """Append other's rows in order, merging paths already present."""
+        for row, path in enumerate(list(other.paths)):
+            self.add(path, other.additions[row], other.deletions[row], other.important_changes_of(row))
+        self._offsets = None
+
+    def _build_offsets(self) -> None:
+        # Counting sort of the (row, id) pairs by row; stable, so file order is kept
+        counts = array('l', [0]) * (len(self.paths) + 1)
+        for row in self._change_rows:
+            counts[row + 1] += 1
+        for row in range(len(self.paths)):
+            counts[row + 1] += counts[row]
+        positions = array('l', counts)
+        ordered = array('l', [0]) * len(self._change_ids)
+        for row, string_id in zip(self._change_rows, self._change_ids):
+            ordered[positions[row]] = string_id
+            positions[row] += 1
+        self._offsets = counts
+        self._ordered_ids = ordered
+
+    def important_changes_of(self, row: int) -> List[str]:
+        if not self._change_ids:
+            return []
+        if self._offsets is None:
+            self._build_offsets()
+        strings = self.strings
+        return [strings[i] for i in self._ordered_ids[self._offsets[row]:self._offsets[row + 1]]]
+
+    def total_additions(self) -> int:
+        return sum(self.additions)
+
+    def total_deletions(self) -> int:
+        return sum(self.deletions)
+
+    def file_types(self) -> Set[str]:
+        return {self.types[index] for index in set(self.type_ids)}
+
+    def __getitem__(self, path: str) -> FileChangeView:
+        return FileChangeView(self, self._rows[path])
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __repr__(self) -> str:
+        return f"ColumnarChanges({len(self.paths)} files)"
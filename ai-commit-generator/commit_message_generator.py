@@ -1,176 +1,425 @@
-import re
-from typing import Dict, List, Optional
+import sys
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 from adapters.adapter import LanguageModelAdapter
-from pathspec import PathSpec
-from pathspec.patterns.gitwildmatch import GitWildMatchPattern
-from schemas import FileChangeSummary, ChangeSummary
+from columnar import ColumnarChanges, file_type_of
+from compaction import compact_diff, estimate_tokens, get_token_budget, DEFAULT_TOKEN_BUDGET
+from diff_parser import DiffInput
+from hedging import HedgeAttempt, provider_adapters, track_hedge_attempts
+from heuristic import build_heuristic_message
+from hierarchical import (build_map_prompt, describe_group, format_group_summaries, get_map_reduce_mode, group_excerpts,
+                          group_files, needs_map_reduce, summarize_groups)
+from importance import ImportanceMatcher
+from message_cache import MessageCache
+from parallel_diff import parse_diff_parallel
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, send_with_breaker, send_with_deadline, stream_with_deadline
+from schemas import FileChangeSummary, ChangeSummary, FileStat
+from telemetry import TelemetryLedger
+from timing import span
+
+if TYPE_CHECKING:
+    from pathspec import PathSpec
+
+PROMPT_INSTRUCTIONS = """Write a Git commit message for the change described at the end, following the conventional commits specification.
+
+Format:
+type(optional_scope): concise description
+
+[body]
+
+[footer]
+
+Types: feat (new feature or significant enhancement), fix (bug fix), refactor (neither fixes a bug nor adds a feature), test, docs, chore (maintenance), style (formatting), perf (performance).
+
+Description: imperative mood ("add" not "added"), at most 50 characters, no period at the end, completes "If applied, this commit will...".
+
+Body: wrap at 72 characters; explain what changed and why, not how; give context and technical details for complex changes; list breaking changes or deprecations.
+
+Footer: reference the ticket as "Refs: #<ticket>" when one is given; list breaking changes with "BREAKING CHANGE:"; mention related issues or PRs if applicable.
+
+Rules:
+- Focus on the most significant changes first
+- Exclude sensitive information, credentials and internal identifiers
+- For large changes, group related modifications under a common theme
+- If changes span multiple concerns, focus on the primary purpose
+- Include migration notes if existing code needs updating
+
+"""
+PROMPT_PREFIX = PROMPT_INSTRUCTIONS + """The change, as "field: value" lines; key_changes lists added declarations per file, removed ones prefixed "- ", and diff is a compacted excerpt:
+
+"""
+# Final request of the map-reduce mode, written from per-group summaries
+REDUCE_PROMPT_PREFIX = PROMPT_INSTRUCTIONS + """The change, as "field: value" lines; parts summarizes each group of changed files:
+
+"""
+PROMPT_END = "\nCommit message:"
 
 
 class CommitMessageGenerator:
     
-    def __init__(self, adapter: LanguageModelAdapter):
+    def __init__(self, adapter: LanguageModelAdapter, cache: Optional[MessageCache] = None, token_budget: Optional[int] = None, importance: Optional[ImportanceMatcher] = None, deadline: Optional[float] = None, breaker: Optional[CircuitBreaker] = None, map_reduce: Optional[str] = None, ledger: Optional[TelemetryLedger] = None):
         self.adapter = adapter
+        self.cache = cache
+        self.token_budget = token_budget
+        self.importance = importance or ImportanceMatcher()
+        # time.monotonic() timestamp; when set, provider failures fall back to a local message
+        self.deadline = deadline
+        self.breaker = breaker
+        # off, auto or always; defaults to AI_COMMIT_MAP_REDUCE
+        self.map_reduce = map_reduce or get_map_reduce_mode()
+        # Where each provider request's latency and outcome is recorded
+        self.ledger = ledger
+
+    def get_token_budget(self) -> int:
+        """Token budget for the per-commit part of the prompt."""
+        if self.token_budget is not None:
+            return self.token_budget
+        if self.adapter is None:
+            return DEFAULT_TOKEN_BUDGET
+        # A hedged prompt has to fit every provider in the race
+        return min(get_token_budget(adapter.provider, adapter.model) for adapter in provider_adapters(self.adapter))
 
-    def _format_key_changes(self, key_changes: Dict[str, List[str]]) -> str:
-        """Format key changes for the prompt."""
+    def _format_key_changes(self, key_changes: Dict[str, List[str]], token_budget: Optional[int] = None) -> str:
+        """Format key changes one line per file, stopping once token_budget is used up."""
         result: List[str] = []
-        for filename, changes in key_changes.items():
-            if changes:
-                result.append(f"\n{filename}:")
-                result.extend(f"  - {change}" for change in changes[:5])  # Limit to 5 changes per file
-        return '\n'.join(result)
-
-    def summarize_diff(self, diff: str) -> Dict[str, FileChangeSummary]:
-        """Create a summary of changes by file and type."""
-        files_changed: Dict[str, FileChangeSummary] = {}
-        current_file = None
-        
-        for line in diff.split('\n'):
-            if line.startswith('diff --git'):
-                # Extract filename more robustly
-                parts = line.split()
-                if len(parts) >= 4:
-                    current_file = parts[-1].lstrip('b/')
-                    files_changed[current_file] = FileChangeSummary(
-                        additions=0,
-                        deletions=0,
-                        file_type=current_file.split('.')[-1] if '.' in current_file else 'unknown',
-                        important_changes=[]
-                    )
-            elif current_file and line.startswith('+') and not line.startswith('+++'):
-                files_changed[current_file]['additions'] += 1
-                # Store important changes like function definitions, class declarations, etc.
-                if re.match(r'^\+\s*(def|class|import|from|const|let|var|function|interface|type)', line):
-                    clean_line = line.lstrip('+').strip()
-                    if clean_line:
-                        files_changed[current_file]['important_changes'].append(clean_line)
-            elif current_file and line.startswith('-') and not line.startswith('---'):
-                files_changed[current_file]['deletions'] += 1
-
-        return files_changed
-
-    def get_gitignore_spec(self, gitignore_content: str) -> PathSpec:
+        used = 0
+        for index, (filename, changes) in enumerate(key_changes.items()):
+            if not changes:
+                continue
+            unique_changes = list(dict.fromkeys(changes))
+            entry = f"\n- {filename}: " + ' | '.join(unique_changes[:5])  # Limit to 5 changes per file
+            cost = estimate_tokens(entry)
+            if token_budget is not None and used + cost > token_budget:
+                result.append(f"\n- ... and {len(key_changes) - index} more files")
+                break
+            result.append(entry)
+            used += cost
+        return ''.join(result)
+
+    def summarize_diff(self, diff: DiffInput) -> Mapping[str, FileChangeSummary]:
+        """Create a summary of changes by file and type.
+
+        Accepts the diff as text, bytes, or an iterator of lines so large diffs
+        can be summarized in a single streaming pass. Very large diff texts are
+        split across cores.
+        """
+        with span('summarize_diff') as stats:
+            changes = parse_diff_parallel(diff)
+            stats['files'] = len(changes)
+        return changes
+
+    def summarize_changes(self, diff: DiffInput, file_stats: Optional[List[FileStat]] = None) -> Mapping[str, FileChangeSummary]:
+        """Per-file summaries from stats that already carry key changes, else from the diff."""
+        if not file_stats or any('important_changes' not in stat for stat in file_stats):
+            return self.summarize_diff(diff)
+        with span('summarize_diff') as stats:
+            changes = ColumnarChanges()
+            for stat in file_stats:
+                changes.add(stat['path'], stat['additions'], stat['deletions'], stat['important_changes'])
+            stats['files'] = len(changes)
+            stats['cached'] = True
+        return changes
+
+    def get_gitignore_spec(self, gitignore_content: str) -> 'PathSpec':
         """Create a PathSpec from gitignore patterns."""
+        from pathspec import PathSpec
+        from pathspec.patterns.gitwildmatch import GitWildMatchPattern
+
         return PathSpec.from_lines(GitWildMatchPattern, gitignore_content.splitlines())
 
-    def is_important_file(self, filename: str, gitignore_spec: Optional[PathSpec] = None) -> bool:
-        """Determine if a file is important based on type and gitignore."""
+    def is_important_file(self, filename: str, gitignore_spec: Optional['PathSpec'] = None) -> bool:
+        """Determine if a file is important based on type and ignore files."""
         if gitignore_spec and gitignore_spec.match_file(filename):
             return False
-            
-        # Files to ignore
-        ignore_patterns = [
-            r'\.lock$', r'\.log$', r'\.map$', r'\.min\.',
-            r'package-lock\.json$', r'yarn\.lock$',
-            r'\.git/', r'node_modules/', r'vendor/',
-        ]
-        
-        if any(re.search(pattern, filename) for pattern in ignore_patterns):
-            return False
-            
-        return True
+        return self.importance.is_important(filename)
 
-    def clean_diff(self, diff: str) -> str:
-        """Remove binary files and large diffs to stay within token limits."""
-        # Remove binary file changes
-        diff = re.sub(r'diff --git.*\nBinary files.*\n', '', diff)
-    
-        # Keep only the first 100 lines of large diffs to avoid token limits
-        lines = diff.split('\n')
-        if len(lines) > 100:
-            return '\n'.join(lines[:100]) + "\n... (truncated)"
-        return diff
-
-    def generate_commit_message(self, diff: str, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, gitignore_content: Optional[str] = None) -> str:
-        """Generate a commit message based on the provided diff."""
-        cleaned_diff = self.clean_diff(diff)
-        changes = self.summarize_diff(cleaned_diff)
-        
-        # Create gitignore spec if provided
-        gitignore_spec = None
-        if gitignore_content:
-            gitignore_spec = self.get_gitignore_spec(gitignore_content)
-        
+    def clean_diff(self, diff: DiffInput, token_budget: Optional[int] = None, gitignore_spec: Optional['PathSpec'] = None) -> str:
+        """Remove binary and unimportant files and compact the diff to stay within token limits."""
+        if token_budget is None:
+            token_budget = self.get_token_budget()
+        with span('clean_diff') as stats:
+            excerpt = compact_diff(diff, token_budget, lambda filename: self.is_important_file(filename, gitignore_spec))
+            stats['excerpt_tokens'] = estimate_tokens(excerpt)
+        return excerpt
+
+    def build_summary(self, changes: Mapping[str, FileChangeSummary], gitignore_spec: Optional['PathSpec'] = None, file_stats: Optional[List[FileStat]] = None) -> ChangeSummary:
+        """Combine per-file summaries into the summary used for the prompt.
+
+        When file_stats (from numstat) are given, totals and file lists come
+        from them, so they stay exact even if the diff was only partially read.
+        """
         # Filter important files
-        important_changes = {
-            filename: info 
-            for filename, info in changes.items() 
-            if self.is_important_file(filename, gitignore_spec)
+        with span('filter_ignored') as stats:
+            important_changes = {
+                filename: info
+                for filename, info in changes.items()
+                if self.is_important_file(filename, gitignore_spec)
+            }
+            stats['important_files'] = len(important_changes)
+        key_changes = {
+            filename: info['important_changes']
+            for filename, info in important_changes.items()
+            if info['important_changes']
         }
-        
-        # Prepare summary for AI
-        summary: ChangeSummary = ChangeSummary(
+
+        if file_stats is not None:
+            return ChangeSummary(
+                total_files=len(file_stats),
+                total_additions=sum(f['additions'] for f in file_stats),
+                total_deletions=sum(f['deletions'] for f in file_stats),
+                file_types=set(file_type_of(f['path']) for f in file_stats),
+                important_files=[f['path'] for f in file_stats if self.is_important_file(f['path'], gitignore_spec)],
+                key_changes=key_changes,
+            )
+
+        if isinstance(changes, ColumnarChanges):
+            # Sum the count columns directly instead of building a view per file
+            return ChangeSummary(
+                total_files=len(changes),
+                total_additions=changes.total_additions(),
+                total_deletions=changes.total_deletions(),
+                file_types=changes.file_types(),
+                important_files=list(important_changes.keys()),
+                key_changes=key_changes,
+            )
+
+        return ChangeSummary(
             total_files=len(changes),
             total_additions=sum(f['additions'] for f in changes.values()),
             total_deletions=sum(f['deletions'] for f in changes.values()),
             file_types=set(f['file_type'] for f in changes.values()),
             important_files=list(important_changes.keys()),
-            key_changes={
-                filename: info['important_changes']
-                for filename, info in important_changes.items()
-                if info['important_changes']
-            }
+            key_changes=key_changes,
         )
 
-        # Format key changes for better readability
-        formatted_key_changes = self._format_key_changes(summary['key_changes'])
-        file_types_str = ', '.join(summary['file_types']) if summary['file_types'] else 'unknown'
+    def build_prompt(self, diff: str, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, gitignore_content: Optional[str] = None, file_stats: Optional[List[FileStat]] = None) -> str:
+        """Build the language model prompt for the provided diff."""
+        return self.prepare_prompt(diff, branch_name, ticket_number, gitignore_content, file_stats)[1]
+
+    def prepare_prompt(self, diff: str, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, gitignore_content: Optional[str] = None, file_stats: Optional[List[FileStat]] = None) -> Tuple[ChangeSummary, str]:
+        """Build the change summary and the prompt made from it."""
+        _, _, summary, context = self._prepare(diff, branch_name, ticket_number, gitignore_content, file_stats)
+        return summary, context
 
-        context = f"""Analyze the following code changes and generate a Git commit message that follows the conventional commits specification. The changes include file modifications, additions, and deletions with the following context:
+    def _prepare(self, diff: str, branch_name: Optional[str], ticket_number: Optional[str], gitignore_content: Optional[str], file_stats: Optional[List[FileStat]]) -> Tuple[Mapping[str, FileChangeSummary], Optional['PathSpec'], ChangeSummary, str]:
+        with span('build_prompt') as stats:
+            # Stats come from the full diff (or numstat); only the excerpt sent to the model is compacted
+            changes = self.summarize_changes(diff, file_stats)
+        
+            # Create gitignore spec if provided
+            gitignore_spec = None
+            if gitignore_content:
+                gitignore_spec = self.get_gitignore_spec(gitignore_content)
+        
+            # Prepare summary for AI
+            summary = self.build_summary(changes, gitignore_spec, file_stats)
 
-Branch: {branch_name or 'N/A'}
-Ticket: {ticket_number or 'N/A'}
+            # Key changes share the budget with the diff excerpt
+            token_budget = self.get_token_budget()
+            formatted_key_changes = self._format_key_changes(summary['key_changes'], token_budget // 3)
+            excerpt_budget = token_budget - estimate_tokens(formatted_key_changes)
+            diff_excerpt = self.clean_diff(diff, excerpt_budget, gitignore_spec) or '-'
+            file_types_str = ','.join(sorted(summary['file_types'])) if summary['file_types'] else 'unknown'
 
-Summary of Changes:
-Files Changed: {summary['total_files']}
-Lines Added: {summary['total_additions']}
-Lines Deleted: {summary['total_deletions']}
-File Types Modified: {file_types_str}
+            # Static instructions first so providers can reuse the cached prefix
+            context = ''.join((
+                PROMPT_PREFIX,
+                f"branch: {branch_name or '-'}\n",
+                f"ticket: {ticket_number or '-'}\n",
+                f"files: {summary['total_files']} (+{summary['total_additions']}/-{summary['total_deletions']})\n",
+                f"types: {file_types_str}\n",
+                f"key_changes:{formatted_key_changes or ' -'}\n",
+                f"diff:\n{diff_excerpt}\n",
+                PROMPT_END,
+            ))
+            stats['prompt_bytes'] = len(context.encode('utf-8'))
+            stats['prompt_tokens'] = estimate_tokens(context)
 
-Key Changes by File:{formatted_key_changes}
+        return changes, gitignore_spec, summary, context
 
-Requirements:
+    def prepare_map_reduce_prompt(self, diff: str, changes: Mapping[str, FileChangeSummary], summary: ChangeSummary, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, file_stats: Optional[List[FileStat]] = None) -> Optional[str]:
+        """Summarize each group of files with concurrent requests and build the final prompt from the summaries.
 
-1. Follow this exact format:
-type(optional_scope): concise description
+        Returns None when the change doesn't call for it: map-reduce is off,
+        or in auto mode the change fits one prompt or forms a single group.
+        """
+        token_budget = self.get_token_budget()
+        if self.map_reduce == 'off' or not summary['important_files']:
+            return None
+        if self.breaker is not None and not any(self.breaker.allow(adapter.provider)
+                                                for adapter in provider_adapters(self.adapter)):
+            return None  # The final request fails fast and falls back anyway
+        if self.map_reduce == 'auto' and not needs_map_reduce(summary, token_budget):
+            return None
+        if file_stats is not None:
+            counts = {f['path']: (f['additions'], f['deletions']) for f in file_stats}
+        else:
+            counts = {path: (info['additions'], info['deletions']) for path, info in changes.items()}
+        groups = group_files(summary['important_files'], counts)
+        if self.map_reduce == 'auto' and len(groups) < 2:
+            return None
 
-[body]
+        key_changes = summary['key_changes']
+        with span('map_summaries') as stats:
+            excerpts = group_excerpts(diff, groups, token_budget * 2 // 3)
+            prompts = [
+                build_map_prompt(group, self._format_key_changes(
+                    {path: key_changes[path] for path in group['files'] if path in key_changes}, token_budget // 3,
+                ), excerpt)
+                for group, excerpt in zip(groups, excerpts)
+            ]
+            answers = summarize_groups(self.send_map_message, prompts, deadline=self.deadline)
+            stats['groups'] = len(groups)
+            stats['failed'] = sum(1 for answer in answers if answer is None)
+        if stats['failed']:
+            print(f"Warning: {stats['failed']} of {len(groups)} group summaries failed; describing them locally", file=sys.stderr)
+        summaries = [answer or describe_group(group, key_changes) for group, answer in zip(groups, answers)]
 
-[footer]
+        file_types_str = ','.join(sorted(summary['file_types'])) if summary['file_types'] else 'unknown'
+        return ''.join((
+            REDUCE_PROMPT_PREFIX,
+            f"branch: {branch_name or '-'}\n",
+            f"ticket: {ticket_number or '-'}\n",
+            f"files: {summary['total_files']} (+{summary['total_additions']}/-{summary['total_deletions']})\n",
+            f"types: {file_types_str}\n",
+            f"parts:{format_group_summaries(groups, summaries)}\n",
+            PROMPT_END,
+        ))
 
-2. Type must be one of:
-- feat: New feature or significant enhancement
-- fix: Bug fixes
-- refactor: Code changes that neither fix bugs nor add features
-- test: Adding or modifying tests
-- docs: Documentation changes
-- chore: Maintenance tasks
-- style: Code style/formatting changes
-- perf: Performance improvements
-
-3. Description Guidelines:
-- Must be imperative mood ("add" not "added")
-- Maximum 50 characters
-- No period at the end
-- Should complete the sentence "If applied, this commit will..."
-
-4. Body Guidelines:
-- Wrap at 72 characters
-- Explain the WHAT and WHY, not the HOW
-- Include context about the changes
-- Describe technical details for complex changes
-- List any breaking changes or deprecations
-
-5. Footer Guidelines:
-- Reference the ticket number using "Refs: #{ticket_number}" if provided
-- List any breaking changes with "BREAKING CHANGE:"
-- Mention related issues/PRs if applicable
-
-Additional Rules:
-- Focus on the most significant changes first
-- Exclude any sensitive information, credentials, or internal identifiers
-- For large changes, group related modifications under a common theme
-- If changes span multiple concerns, focus on the primary purpose
-- Include migration notes if changes require updates to existing code"""
+    def build_fallback_message(self, summary: ChangeSummary, ticket_number: Optional[str] = None, file_stats: Optional[List[FileStat]] = None) -> str:
+        """A message built locally from the change summary, used when the provider is unavailable."""
+        return build_heuristic_message(summary, ticket_number, file_stats=file_stats)
+
+    def _record(self, prompt: str, started: float, outcome: str, attempts: Sequence[HedgeAttempt] = ()) -> None:
+        if self.ledger is None:
+            return
+        prompt_tokens = estimate_tokens(prompt)
+        # Hedged requests are measured per provider that took part, so routing can use them
+        if attempts:
+            for provider, model, latency_ms, attempt_outcome in attempts:
+                self.ledger.record(provider, model, prompt_tokens, latency_ms, attempt_outcome)
+            return
+        self.ledger.record(self.adapter.provider, self.adapter.model, prompt_tokens,
+                           (time.monotonic() - started) * 1000, outcome)
+
+    def _record_failure(self, prompt: str, started: float, error: Exception, attempts: Sequence[HedgeAttempt] = ()) -> None:
+        # A skipped provider made no request, so there is nothing to measure
+        if not isinstance(error, CircuitOpenError):
+            self._record(prompt, started, 'timeout' if isinstance(error, DeadlineExceeded) else 'error', attempts)
+
+    def send_message(self, prompt: str) -> str:
+        """Send the prompt to the language model, timing the request."""
+        started = time.monotonic()
+        with span('send_message') as stats, track_hedge_attempts() as attempts:
+            stats['provider'] = self.adapter.provider
+            try:
+                if self.deadline is None:
+                    message = self.adapter.send_message(prompt)
+                else:
+                    message = send_with_deadline(self.adapter, prompt, self.deadline, breaker=self.breaker)
+            except Exception as e:
+                self._record_failure(prompt, started, e, attempts)
+                raise
+            stats['response_chars'] = len(message or '')
+        self._record(prompt, started, 'ok' if message and message.strip() else 'error', attempts)
+        return message
+
+    async def send_map_message(self, prompt: str, deadline: Optional[float]) -> str:
+        """Send one map prompt with send_message's timing, telemetry and circuit breaker.
+
+        Runs on the shared event loop, so the map requests can be in flight
+        together; deadline is the map requests' share of the time left.
+        """
+        started = time.monotonic()
+        with track_hedge_attempts() as attempts:
+            try:
+                if deadline is None:
+                    message = await self.adapter.send_message_async(prompt)
+                else:
+                    message = await send_with_breaker(self.adapter, prompt, deadline, breaker=self.breaker)
+            except Exception as e:
+                self._record_failure(prompt, started, e, attempts)
+                raise
+        self._record(prompt, started, 'ok' if message and message.strip() else 'error', attempts)
+        return message
+
+    def stream_message(self, prompt: str, on_text: Callable[[str], None]) -> Tuple[str, bool]:
+        """Send the prompt, passing the answer to on_text as it streams in.
+
+        Returns the message and whether it is complete; past the deadline it
+        is cut after the last line received.
+        """
+        started = time.monotonic()
+        with span('send_message') as stats, track_hedge_attempts() as attempts:
+            stats['provider'] = self.adapter.provider
+            stats['streamed'] = True
+            try:
+                if self.deadline is None:
+                    chunks = []
+                    for chunk in self.adapter.stream_message(prompt):
+                        chunks.append(chunk)
+                        on_text(chunk)
+                    message, complete = ''.join(chunks).strip(), True
+                else:
+                    message, complete = stream_with_deadline(self.adapter, prompt, self.deadline, on_text, breaker=self.breaker)
+            except Exception as e:
+                self._record_failure(prompt, started, e, attempts)
+                raise
+            stats['response_chars'] = len(message)
+            stats['complete'] = complete
+        self._record(prompt, started, ('ok' if complete else 'cutoff') if message else 'error', attempts)
+        return message, complete
+
+    def generate_commit_message(self, diff: str, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, gitignore_content: Optional[str] = None, file_stats: Optional[List[FileStat]] = None, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Generate a commit message based on the provided diff.
+
+        With on_text, the answer is streamed to it chunk by chunk; cached and
+        locally built messages are returned without streaming.
+        """
+        changes, _, summary, prompt = self._prepare(diff, branch_name, ticket_number, gitignore_content, file_stats)
+
+        # Map-reduce messages are cached apart, keyed by the single-request prompt
+        model = self.adapter.model if self.map_reduce == 'off' else f"{self.adapter.model}+map-reduce:{self.map_reduce}"
+        key = None
+        if self.cache is not None:
+            key = MessageCache.make_key(prompt, self.adapter.provider, model)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            prompt = self.prepare_map_reduce_prompt(diff, changes, summary, branch_name, ticket_number, file_stats) or prompt
+            if on_text is None:
+                message, complete = self.send_message(prompt), True
+            else:
+                message, complete = self.stream_message(prompt, on_text)
+        except Exception as e:
+            if self.deadline is None:
+                raise
+            print(f"Warning: {self.adapter.provider} unavailable ({e}); using a locally built message", file=sys.stderr)
+            return self.build_fallback_message(summary, ticket_number, file_stats)
+
+        if not complete:
+            print(f"Warning: {self.adapter.provider} was cut off at the deadline; keeping the lines received", file=sys.stderr)
+        # A message cut off at the deadline is used once but never cached
+        if key is not None and message and complete:
+            self.cache.put(key, message, self.adapter.provider, model)
+        return message
+
+
+class HeuristicMessageGenerator(CommitMessageGenerator):
+    """Writes the message locally from the change summary, for the heuristic provider.
+
+    There is no prompt, request or adapter; callers pick this generator
+    instead of a CommitMessageGenerator when the provider is in
+    LOCAL_PROVIDERS.
+    """
+
+    def __init__(self, importance: Optional[ImportanceMatcher] = None):
+        super().__init__(None, importance=importance, map_reduce='off')
 
-        return self.adapter.send_message(context)
+    def generate_commit_message(self, diff: str, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, gitignore_content: Optional[str] = None, file_stats: Optional[List[FileStat]] = None, on_text: Optional[Callable[[str], None]] = None) -> str:
+        changes = self.summarize_changes(diff, file_stats)
+        gitignore_spec = self.get_gitignore_spec(gitignore_content) if gitignore_content else None
+        summary = self.build_summary(changes, gitignore_spec, file_stats)
+        return build_heuristic_message(summary, ticket_number, changes, file_stats)
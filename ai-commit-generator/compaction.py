@@ -0,0 +1,239 @@
+import math
+import os
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from diff_parser import DiffInput, iter_line_blocks, parse_git_header
+
+DEFAULT_TOKEN_BUDGET = 2000
+
+# Budget for the per-commit part of the prompt, by (provider, model) or provider.
+# Kept well below each model's context window so request size stays predictable.
+PROMPT_TOKEN_BUDGETS: Dict[Tuple[str, Optional[str]], int] = {
+    ('cohere', 'command-r-plus'): 4000,
+    ('cohere', None): 3000,
+    ('openai', 'gpt-3.5-turbo'): 3000,
+    ('openai', None): 3000,
+}
+
+SIGNATURE_PATTERN = re.compile(
+    r'[+-]\s*(?:export\s+|public\s+|private\s+|protected\s+|static\s+|async\s+|pub\s+)*'
+    r'(?:def|class|function|interface|type|struct|enum|func|fn|impl|trait|const|let|var|import|from)\b'
+)
+HUNK_HEADER = '@@'
+TEST_PATH_PATTERN = re.compile(r'(^|/)(tests?|__tests__|spec)/|(_test|\.test|\.spec|_spec)\.|(^|/)test_')
+DOC_EXTENSIONS = {'md', 'rst', 'txt', 'adoc'}
+CONFIG_EXTENSIONS = {'json', 'yaml', 'yml', 'toml', 'ini', 'cfg', 'xml', 'csv'}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def get_token_budget(provider: str, model: str) -> int:
+    """Prompt token budget for a provider/model, overridable with AI_COMMIT_PROMPT_TOKENS."""
+    override = os.getenv('AI_COMMIT_PROMPT_TOKENS')
+    if override:
+        return int(override)
+    budget = PROMPT_TOKEN_BUDGETS.get((provider, model))
+    if budget is None:
+        budget = PROMPT_TOKEN_BUDGETS.get((provider, None), DEFAULT_TOKEN_BUDGET)
+    return budget
+
+
+def file_importance(filename: str) -> float:
+    """Relative weight of a file when sharing out the token budget."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if TEST_PATH_PATTERN.search(filename):
+        return 0.6
+    if extension in DOC_EXTENSIONS or extension in CONFIG_EXTENSIONS:
+        return 0.4
+    return 1.0
+
+
+class FileSection:
+    """The header and compacted hunks of one file in a diff.
+
+    Hunks are kept as (score, kept lines) pairs, with context and noise
+    already dropped; hunks without a single informative line are not kept.
+    """
+
+    def __init__(self, filename: str, header: str):
+        self.filename = filename
+        self.header = header
+        self.hunks: List[Tuple[int, List[str]]] = []
+        # Scored hunks left out while splitting because they could never fit
+        self.dropped_hunks = 0
+        self.changed_lines = 0
+        self.binary = False
+        self._hunk_costs: List[int] = []
+
+    def add_hunk(self, score: int, kept: List[str], max_tokens: Optional[int] = None) -> None:
+        """Keep a compacted hunk, dropping the least informative ones beyond max_tokens."""
+        if score == 0:
+            return
+        self.hunks.append((score, kept))
+        self._hunk_costs.append(_line_cost(kept))
+        if max_tokens is None:
+            return
+        cost = sum(self._hunk_costs)
+        # The best hunk always stays: _fit_file shows part of it when it is too large
+        while cost > max_tokens and len(self.hunks) > 1:
+            lowest = min(range(len(self.hunks)), key=lambda i: (self.hunks[i][0], -i))
+            cost -= self._hunk_costs.pop(lowest)
+            del self.hunks[lowest]
+            self.dropped_hunks += 1
+
+
+def split_file_sections(diff: DiffInput, max_tokens: Optional[int] = None,
+                        include: Optional[Callable[[str], bool]] = None) -> Iterator[FileSection]:
+    """Yield the per-file sections of a diff, compacting each hunk line by line as it is read.
+
+    Only one file's compacted hunks are held at a time; with max_tokens, the
+    least informative hunks of a file are dropped once its kept lines cost
+    more than that, as they could never fit in the prompt. Files include
+    rejects are skipped without looking at their lines.
+    """
+    section: Optional[FileSection] = None
+    kept: List[str] = []
+    score = 0
+    for block in iter_line_blocks(diff):
+        for line in block:
+            if line.startswith('diff --git '):
+                if section is not None:
+                    if kept:
+                        section.add_hunk(score, kept, max_tokens)
+                    yield section
+                filename = parse_git_header(line)
+                section = FileSection(filename, line) if include is None or include(filename) else None
+                kept = []
+            elif section is None:
+                continue
+            elif line.startswith(HUNK_HEADER):
+                if kept:
+                    section.add_hunk(score, kept, max_tokens)
+                kept = [line]
+                score = 0
+            elif kept:
+                if line[:1] not in ('+', '-'):
+                    continue
+                section.changed_lines += 1
+                if _is_noise(line):
+                    continue
+                kept.append(line)
+                score += 1
+                if SIGNATURE_PATTERN.match(line):
+                    score += 10
+            elif line.startswith('Binary files') or line.startswith('GIT binary patch'):
+                section.binary = True
+    if section is not None:
+        if kept:
+            section.add_hunk(score, kept, max_tokens)
+        yield section
+
+
+def _is_noise(line: str) -> bool:
+    """Changed lines that carry no information for a commit message."""
+    return not line[1:].strip()
+
+
+def _line_cost(lines: List[str]) -> int:
+    return sum(estimate_tokens(line) + 1 for line in lines)
+
+
+def _omitted_hunks_note(omitted: int) -> str:
+    return f"... ({omitted} more hunks omitted)"
+
+
+def _fit_file(section: FileSection, budget: int) -> List[str]:
+    """Keep the most informative hunks of a file within budget tokens, including the omitted-hunks note.
+
+    Returns an empty list when not even part of one hunk fits.
+    """
+    header = f"--- {section.filename}"
+    compacted = list(section.hunks)
+    total = len(compacted) + section.dropped_hunks
+    used = _line_cost([header])
+    if section.dropped_hunks or used + sum(_line_cost(kept) for _, kept in compacted) > budget:
+        # Some hunks will be left out, so the note about them has to fit too
+        used += _line_cost([_omitted_hunks_note(total)])
+    ranked = sorted(range(len(compacted)), key=lambda i: compacted[i][0], reverse=True)
+
+    chosen = set()
+    for index in ranked:
+        score, kept = compacted[index]
+        cost = _line_cost(kept)
+        if used + cost <= budget:
+            chosen.add(index)
+            used += cost
+        elif not chosen:
+            # Show part of the best hunk, signatures first
+            signatures = [line for line in kept[1:] if SIGNATURE_PATTERN.match(line)]
+            others = [line for line in kept[1:] if not SIGNATURE_PATTERN.match(line)]
+            partial = [kept[0]]
+            partial_used = used + _line_cost(partial)
+            for line in signatures + others:
+                line_cost = _line_cost([line])
+                if partial_used + line_cost > budget:
+                    break
+                partial.append(line)
+                partial_used += line_cost
+            if len(partial) > 1:
+                compacted[index] = (score, partial)
+                chosen.add(index)
+                used = partial_used
+
+    if not chosen:
+        return []
+
+    lines = [header]
+    for index in sorted(chosen):
+        lines.extend(compacted[index][1])
+    omitted = total - len(chosen)
+    if omitted:
+        lines.append(_omitted_hunks_note(omitted))
+    return lines
+
+
+def compact_diff(diff: DiffInput, token_budget: int, is_important: Optional[Callable[[str], bool]] = None) -> str:
+    """Compact a diff to at most token_budget (estimated) tokens.
+
+    Binary and unimportant files are dropped, and each remaining file gets a
+    share of the budget weighted by its importance and the size of its change.
+    Within a file, hunks with declarations and signatures are preferred;
+    context lines and whitespace-only changes are removed.
+    """
+    sections = [
+        section for section in split_file_sections(diff, token_budget, is_important)
+        if not section.binary and section.hunks
+    ]
+    return compact_sections(sections, token_budget)
+
+
+def compact_sections(sections: List[FileSection], token_budget: int) -> str:
+    """Compact already split, non-binary file sections to at most token_budget tokens."""
+    if not sections:
+        return ''
+
+    weights = [file_importance(s.filename) * (1 + math.log2(1 + s.changed_lines)) for s in sections]
+    # Reserve room for the trailing note about files that did not fit
+    remaining_budget = token_budget - 16
+    remaining_weight = sum(weights)
+    fitted: Dict[int, List[str]] = {}
+
+    # Heaviest files first; whatever a file leaves unused flows to the rest
+    for index in sorted(range(len(sections)), key=lambda i: weights[i], reverse=True):
+        share = int(remaining_budget * weights[index] / remaining_weight) if remaining_weight else 0
+        remaining_weight -= weights[index]
+        file_lines = _fit_file(sections[index], share)
+        if file_lines:
+            fitted[index] = file_lines
+            remaining_budget -= _line_cost(file_lines)
+
+    output: List[str] = []
+    for index in sorted(fitted):
+        output.extend(fitted[index])
+    omitted = len(sections) - len(fitted)
+    if omitted:
+        output.append(f"... ({omitted} more files omitted)")
+    return '\n'.join(output)
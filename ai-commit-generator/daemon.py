@@ -0,0 +1,276 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from adapters.adapter import LanguageModelAdapter
+from schemas import FileStat
+
+DEFAULT_CLIENT_TIMEOUT = 60.0
+# Extra time the client waits beyond the deadline for the daemon's (fallback) answer
+DEADLINE_GRACE = 0.5
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon is reachable but could not generate a message."""
+
+
+def is_supported() -> bool:
+    return hasattr(socket, 'AF_UNIX') and hasattr(os, 'getuid')
+
+
+def _private_socket_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), f'ai-commit-generator-{os.getuid()}')
+
+
+def get_socket_path() -> str:
+    """Per-user socket path, overridable with AI_COMMIT_DAEMON_SOCKET.
+
+    Without XDG_RUNTIME_DIR the socket goes in a private (0700) directory
+    under the temporary directory, which other users cannot create files in.
+    """
+    override = os.getenv('AI_COMMIT_DAEMON_SOCKET')
+    if override:
+        return override
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, f'ai-commit-generator-{os.getuid()}.sock')
+    return os.path.join(_private_socket_dir(), 'daemon.sock')
+
+
+def _ensure_private_dir(path: str) -> None:
+    """Create the socket's directory as 0700, refusing one another user created or can write to."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise DaemonError(f"{path} is not a directory owned by the current user")
+    if info.st_mode & 0o022 and not info.st_mode & stat.S_ISVTX:
+        raise DaemonError(f"{path} is writable by other users")
+
+
+def _check_socket_owner(socket_path: str) -> None:
+    """Refuse a socket that is not a private socket of the current user.
+
+    Raises FileNotFoundError if there is no socket, so callers can treat it
+    like a daemon that is not running.
+    """
+    info = os.lstat(socket_path)
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise DaemonError(f"Refusing to use {socket_path}: not a private socket owned by the current user")
+
+
+def _check_peer(sock: socket.socket) -> None:
+    """Refuse a daemon run by another user, where the platform reports the peer's credentials."""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    _, uid, _ = struct.unpack('3i', credentials)
+    if uid != os.getuid():
+        raise DaemonError(f"Refusing daemon running as uid {uid}")
+
+
+def daemon_available(socket_path: Optional[str] = None) -> bool:
+    """Cheap check for a daemon socket; a stale file is handled by the client."""
+    return is_supported() and os.path.exists(socket_path or get_socket_path())
+
+
+def _send_request(payload: Dict[str, Any], socket_path: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """Send one JSON request; return None if no daemon is listening."""
+    if not is_supported():
+        return None
+    try:
+        _check_socket_owner(socket_path)
+    except FileNotFoundError:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        _check_peer(sock)
+        sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as stream:
+            line = stream.readline()
+        if not line:
+            raise DaemonError("Daemon closed the connection without a response")
+        return json.loads(line)
+    finally:
+        sock.close()
+
+
+def request_commit_message(diff: str, branch_name: Optional[str], ticket_number: Optional[str],
+                           gitignore_content: Optional[str], provider: str, use_cache: bool = True,
+                           git_dir: Optional[str] = None, file_stats: Optional[List[FileStat]] = None,
+                           repo_root: Optional[str] = None, socket_path: Optional[str] = None,
+                           timeout: float = DEFAULT_CLIENT_TIMEOUT,
+                           deadline_seconds: Optional[float] = None) -> Optional[str]:
+    """Ask a running daemon for a commit message.
+
+    Returns None when no daemon is running so callers can fall back to
+    in-process generation. With deadline_seconds the daemon answers within
+    that time, falling back to a local message itself if needed.
+    """
+    if deadline_seconds is not None:
+        timeout = deadline_seconds + DEADLINE_GRACE
+    response = _send_request({
+        'command': 'generate',
+        'diff': diff,
+        'branch_name': branch_name,
+        'ticket_number': ticket_number,
+        'gitignore_content': gitignore_content,
+        'provider': provider,
+        'use_cache': use_cache,
+        'git_dir': git_dir,
+        'file_stats': file_stats,
+        'repo_root': repo_root,
+        'deadline_seconds': deadline_seconds,
+    }, socket_path or get_socket_path(), timeout)
+    if response is None:
+        return None
+    if 'error' in response:
+        raise DaemonError(response['error'])
+    return response['message']
+
+
+def stop_daemon(socket_path: Optional[str] = None) -> bool:
+    """Ask a running daemon to shut down; return False if none was running."""
+    return _send_request({'command': 'shutdown'}, socket_path or get_socket_path(), 5.0) is not None
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            response = self.server.dispatch(request)
+        except Exception as e:
+            response = {'error': str(e)}
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class CommitMessageDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server that keeps provider adapters, and their connections, warm."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._adapters: Dict[str, LanguageModelAdapter] = {}
+        self._adapters_lock = threading.Lock()
+        if os.path.dirname(socket_path) == _private_socket_dir():
+            _ensure_private_dir(os.path.dirname(socket_path))
+        _remove_stale_socket(socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def get_adapter(self, provider: str) -> LanguageModelAdapter:
+        from main import create_adapter, has_credentials
+
+        with self._adapters_lock:
+            adapter = self._adapters.get(provider)
+            if adapter is None:
+                if not has_credentials(provider):
+                    raise DaemonError("LANGUAGE_MODEL_API_KEY is not set in the daemon environment")
+                adapter = create_adapter(provider)
+                self._adapters[provider] = adapter
+            return adapter
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        command = request.get('command')
+        if command == 'ping':
+            return {'status': 'ok', 'pid': os.getpid()}
+        if command == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'status': 'stopping'}
+        if command == 'generate':
+            return {'message': self._generate(request)}
+        raise DaemonError(f"Unknown command: {command}")
+
+    def _generate(self, request: Dict[str, Any]) -> str:
+        from commit_message_generator import CommitMessageGenerator, HeuristicMessageGenerator
+        from importance import ImportanceMatcher
+        from language_model_factory import LOCAL_PROVIDERS
+        from message_cache import MessageCache
+        from resilience import CircuitBreaker
+        from telemetry import TelemetryLedger
+
+        git_dir = request.get('git_dir')
+        repo_root = request.get('repo_root')
+        cache = MessageCache.for_git_dir(git_dir) if request.get('use_cache') and git_dir else None
+        importance = ImportanceMatcher.from_repo(repo_root, git_dir) if repo_root else None
+        deadline = breaker = None
+        if request.get('deadline_seconds') is not None:
+            deadline = time.monotonic() + request['deadline_seconds']
+            breaker = CircuitBreaker.for_git_dir(git_dir) if git_dir else None
+        ledger = TelemetryLedger.for_git_dir(git_dir) if git_dir else None
+        if request['provider'] in LOCAL_PROVIDERS:
+            generator = HeuristicMessageGenerator(importance=importance)
+        else:
+            generator = CommitMessageGenerator(self.get_adapter(request['provider']), cache, importance=importance,
+                                               deadline=deadline, breaker=breaker, ledger=ledger)
+        return generator.generate_commit_message(
+            request['diff'],
+            request.get('branch_name'),
+            request.get('ticket_number'),
+            request.get('gitignore_content'),
+            request.get('file_stats'),
+        )
+
+    def close_adapters(self) -> None:
+        """Close every warm adapter's connections and stop the shared event loop they used."""
+        from adapters.adapter import stop_event_loop
+
+        with self._adapters_lock:
+            adapters, self._adapters = list(self._adapters.values()), {}
+        for adapter in adapters:
+            try:
+                adapter.close()
+            except Exception:
+                pass  # Shutting down anyway
+        stop_event_loop()
+
+    def server_close(self):
+        super().server_close()
+        self.close_adapters()
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove a socket file left behind by a daemon that is no longer running."""
+    if not os.path.lexists(socket_path):
+        return
+    _check_socket_owner(socket_path)
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    raise DaemonError(f"A daemon is already listening on {socket_path}")
+
+
+def serve(socket_path: Optional[str] = None) -> None:
+    """Run the daemon in the foreground until it is stopped."""
+    if not is_supported():
+        raise DaemonError("Unix domain sockets are not available on this platform")
+    server = CommitMessageDaemon(socket_path or get_socket_path())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,252 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from columnar import ColumnarChanges
+from extractors import REMOVED_PREFIX, Extractor, extractor_for
+
+DiffInput = Union[str, bytes, Iterable[Union[str, bytes]]]
+
+HUNK_HEADER_PATTERN = re.compile(r'@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@')
+
+_C_ESCAPES = {
+    'a': 7, 'b': 8, 't': 9, 'n': 10, 'v': 11, 'f': 12, 'r': 13,
+    '"': 34, '\\': 92,
+}
+
+
+def unquote_path(path: str) -> str:
+    """Undo git's C-style quoting of a path (core.quotePath)."""
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+
+    raw = bytearray()
+    body = path[1:-1]
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char == '\\' and i + 1 < len(body):
+            nxt = body[i + 1]
+            if nxt in '0123':
+                raw.append(int(body[i + 1:i + 4], 8))
+                i += 4
+                continue
+            raw.append(_C_ESCAPES.get(nxt, ord(nxt)))
+            i += 2
+            continue
+        raw.extend(char.encode('utf-8'))
+        i += 1
+    return raw.decode('utf-8', errors='replace')
+
+
+def _split_quoted(text: str) -> Tuple[str, str]:
+    """Split a leading quoted token off text, returning (token, rest)."""
+    i = 1
+    while i < len(text):
+        if text[i] == '\\':
+            i += 2
+            continue
+        if text[i] == '"':
+            return text[:i + 1], text[i + 1:].lstrip(' ')
+        i += 1
+    return text, ''
+
+
+def _strip_prefix(path: str, prefix: str) -> str:
+    """Remove a single a/ or b/ prefix, leaving the rest of the path intact."""
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+def parse_git_header(line: str) -> str:
+    """Return the destination path named by a 'diff --git' header line."""
+    rest = line[len('diff --git '):]
+    if rest.startswith('"'):
+        _, b_path = _split_quoted(rest)
+    elif ' "' in rest:
+        b_path = rest[rest.index(' "') + 1:]
+    else:
+        # Unquoted paths may contain spaces; when both sides name the same
+        # file the header splits exactly in the middle.
+        mid = (len(rest) - 1) // 2
+        a_path, b_path = rest[:mid], rest[mid + 1:]
+        if len(rest) % 2 == 0 or a_path[2:] != b_path[2:]:
+            idx = rest.rfind(' b/')
+            b_path = rest[idx + 1:] if idx >= 0 else rest.split(' ')[-1]
+    return _strip_prefix(unquote_path(b_path), 'b/')
+
+
+def _parse_file_line(line: str, prefix: str) -> Optional[str]:
+    """Return the path from a '--- a/x' or '+++ b/x' line, or None for /dev/null."""
+    path = line[4:].rstrip('\t')
+    if path == '/dev/null':
+        return None
+    return _strip_prefix(unquote_path(path), prefix)
+
+
+BLOCK_SIZE = 1 << 20
+
+
+def iter_line_blocks(diff: DiffInput) -> Iterator[List[str]]:
+    """Yield lists of diff lines (without newlines) in bounded-size blocks.
+
+    Text input is sliced at newline boundaries roughly every BLOCK_SIZE
+    characters, so the whole diff is never split into one giant list.
+    """
+    if isinstance(diff, bytes):
+        diff = diff.decode('utf-8', errors='replace')
+    if isinstance(diff, str):
+        start = 0
+        length = len(diff)
+        while start < length or start == 0:
+            end = diff.find('\n', start + BLOCK_SIZE) if start + BLOCK_SIZE < length else -1
+            if end < 0:
+                yield diff[start:].split('\n')
+                return
+            yield diff[start:end].split('\n')
+            start = end + 1
+        return
+
+    block: List[str] = []
+    for line in diff:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        block.append(line[:-1] if line.endswith('\n') else line)
+        if len(block) >= 4096:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+class DiffParser:
+    """Single-pass, hunk-aware summarizer for unified git diffs.
+
+    Lines can be fed incrementally, so a diff streamed from a subprocess never
+    has to be held in memory as a whole; only the per-file summaries are kept.
+    """
+
+    def __init__(self):
+        self.files = ColumnarChanges()
+        self._name: Optional[str] = None
+        self._extract: Optional[Extractor] = None
+        self._additions = 0
+        self._deletions = 0
+        self._important: List[str] = []
+        self._old_remaining = 0
+        self._new_remaining = 0
+
+    def _flush(self) -> None:
+        if self._name is None:
+            return
+        self.files.add(self._name, self._additions, self._deletions, self._important)
+        self._name = None
+
+    def _start_file(self, name: str) -> None:
+        self._flush()
+        self._set_name(name)
+        self._additions = 0
+        self._deletions = 0
+        self._important = []
+        self._old_remaining = 0
+        self._new_remaining = 0
+
+    def _set_name(self, name: str) -> None:
+        self._name = name
+        self._extract = extractor_for(name)
+
+    def feed(self, line: Union[str, bytes]) -> None:
+        """Feed a single diff line."""
+        self.feed_lines((line,))
+
+    def feed_lines(self, diff: DiffInput) -> None:
+        """Feed any number of lines (or a whole diff text) to the parser."""
+        extract = self._extract
+        hunk_match = HUNK_HEADER_PATTERN.match
+        old_remaining = self._old_remaining
+        new_remaining = self._new_remaining
+        additions = self._additions
+        deletions = self._deletions
+        important = self._important
+
+        for block in iter_line_blocks(diff):
+            for line in block:
+                if old_remaining > 0 or new_remaining > 0:
+                    first = line[:1]
+                    if first == '+':
+                        new_remaining -= 1
+                        additions += 1
+                        if extract is not None and extract(line, 1):
+                            clean_line = line[1:].strip()
+                            if clean_line:
+                                important.append(clean_line)
+                        continue
+                    if first == '-':
+                        old_remaining -= 1
+                        deletions += 1
+                        if extract is not None and extract(line, 1):
+                            # Removed signatures, e.g. a deleted or renamed function
+                            clean_line = line[1:].strip()
+                            if clean_line:
+                                important.append(REMOVED_PREFIX + clean_line)
+                        continue
+                    if first == ' ' or not line:
+                        old_remaining -= 1
+                        new_remaining -= 1
+                        continue
+                    if first == '\\':
+                        continue
+                    # Anything else means the hunk was cut short; treat it as a header.
+                    old_remaining = new_remaining = 0
+
+                if line.startswith('diff --git '):
+                    self._additions, self._deletions = additions, deletions
+                    self._start_file(parse_git_header(line))
+                    additions = deletions = 0
+                    important = self._important
+                    extract = self._extract
+                elif self._name is None:
+                    continue
+                elif line.startswith('@@'):
+                    match = hunk_match(line)
+                    if match:
+                        old_count, new_count = match.groups()
+                        old_remaining = 1 if old_count is None else int(old_count)
+                        new_remaining = 1 if new_count is None else int(new_count)
+                elif line.startswith('+++ '):
+                    path = _parse_file_line(line, 'b/')
+                    if path is not None:
+                        self._set_name(path)
+                        extract = self._extract
+                elif line.startswith('--- '):
+                    continue
+                elif line.startswith('rename to ') or line.startswith('copy to '):
+                    self._set_name(unquote_path(line.split(' to ', 1)[1]))
+                    extract = self._extract
+                elif line.startswith('+'):
+                    # Diffs without hunk headers (hand-written or truncated input)
+                    additions += 1
+                    if extract is not None and extract(line, 1):
+                        clean_line = line[1:].strip()
+                        if clean_line:
+                            important.append(clean_line)
+                elif line.startswith('-'):
+                    deletions += 1
+                    if extract is not None and extract(line, 1):
+                        clean_line = line[1:].strip()
+                        if clean_line:
+                            important.append(REMOVED_PREFIX + clean_line)
+
+        self._old_remaining = old_remaining
+        self._new_remaining = new_remaining
+        self._additions = additions
+        self._deletions = deletions
+
+    def close(self) -> ColumnarChanges:
+        """Finish parsing and return the summaries keyed by file name."""
+        self._flush()
+        return self.files
+
+
+def parse_diff(diff: DiffInput) -> ColumnarChanges:
+    """Summarize a diff given as text, bytes, or an iterator of lines."""
+    parser = DiffParser()
+    parser.feed_lines(diff)
+    return parser.close()
@@ -0,0 +1,95 @@
+import posixpath
+import re
+from typing import Callable, Dict, Optional
+
+# Called as extractor(line, 1) on a diff line, skipping its +/- marker
+Extractor = Callable[[str, int], Optional['re.Match']]
+
+# Bump when extraction changes so cached summaries are recomputed
+EXTRACTOR_VERSION = 2
+
+# Prefix of key changes taken from removed lines
+REMOVED_PREFIX = '- '
+
+# Used for extensions without a dedicated extractor; the original keyword set
+GENERIC_PATTERN = re.compile(r'\s*(def|class|import|from|const|let|var|function|interface|type)')
+
+# Patterns start with one alternation of leading keywords (modifiers
+# included), so the common non-matching line fails on its first character.
+# They are compiled on first use to keep hook startup fast.
+LANGUAGE_PATTERNS: Dict[str, str] = {
+    'python': r'\s*(?:async\s+def|def|class|import|from)\s',
+    'javascript': (
+        r'\s*(?:export|declare|abstract|async\s+function|function\*?|class|interface|type|enum|namespace|const|let|var|import)\s'
+    ),
+    # gofmt puts declarations in column 0
+    'go': r'(?:func|type|import|const|var)\s',
+    'rust': r'\s*(?:pub|async\s+fn|const|unsafe|extern|fn|impl|struct|enum|trait|mod|use|type|macro_rules!)[\s<(]',
+    # Types, plus members with a modifier: `public int size() {`
+    'jvm': (
+        r'\s*(?:@\w+\s+)?(?:public|protected|private|internal|static|final|abstract|sealed|open|override|'
+        r'synchronized|native|data|suspend|class|interface|enum|record|object|fun|import)\s'
+    ),
+    # Preprocessor lines, types and top-level function definitions
+    'c': (
+        r'(?:\s*(?:#\s*include|#\s*define|class|struct|enum|union|namespace|template|typedef)\b'
+        r'|(?!(?:return|else|if|for|while|switch|case|goto)\b)[A-Za-z_][\w<>:,*& ]*[ *&][A-Za-z_~][\w:~]*\s*\([^;]*$)'
+    ),
+    'ruby': r'\s*(?:def|class|module|require|require_relative)\s',
+    'php': r'\s*(?:public|protected|private|static|abstract|final|function|class|interface|trait|enum|namespace|use)\s',
+    'swift': (
+        r'\s*(?:@\w+\s+)?(?:public|private|internal|fileprivate|open|static|final|override|mutating|'
+        r'func|class|struct|enum|protocol|extension|actor|import)\s'
+    ),
+    'sql': (
+        r'(?i)\s*(?:create|alter|drop)\s+(?:or\s+replace\s+)?(?:(?:temporary|temp|unique|materialized|virtual)\s+)?'
+        r'(?:table|view|index|function|procedure|trigger|schema|type|sequence|extension)\b'
+    ),
+    'shell': r'\s*(?:function\s+[\w-]+|[\w-]+\s*\(\)\s*\{?\s*$|source\s|\.\s)',
+}
+
+EXTENSION_LANGUAGES: Dict[str, str] = {
+    'py': 'python', 'pyi': 'python', 'pyx': 'python',
+    'js': 'javascript', 'jsx': 'javascript', 'mjs': 'javascript', 'cjs': 'javascript',
+    'ts': 'javascript', 'tsx': 'javascript', 'mts': 'javascript', 'cts': 'javascript',
+    'vue': 'javascript', 'svelte': 'javascript',
+    'go': 'go',
+    'rs': 'rust',
+    'java': 'jvm', 'kt': 'jvm', 'kts': 'jvm', 'scala': 'jvm', 'groovy': 'jvm', 'cs': 'jvm', 'dart': 'jvm',
+    'c': 'c', 'h': 'c', 'cc': 'c', 'cpp': 'c', 'cxx': 'c', 'hh': 'c', 'hpp': 'c', 'hxx': 'c', 'm': 'c', 'mm': 'c',
+    'rb': 'ruby', 'rake': 'ruby',
+    'php': 'php',
+    'swift': 'swift',
+    'sql': 'sql',
+    'sh': 'shell', 'bash': 'shell', 'zsh': 'shell',
+}
+
+# Data, lock and documentation files: no line is worth matching
+NO_EXTRACTOR_EXTENSIONS = {
+    'json', 'jsonl', 'lock', 'sum', 'yaml', 'yml', 'toml', 'ini', 'cfg', 'conf', 'env', 'properties',
+    'csv', 'tsv', 'txt', 'log', 'xml', 'svg', 'html', 'htm', 'css', 'scss', 'less', 'map', 'snap',
+    'md', 'rst', 'adoc', 'tex', 'po', 'pot', 'ipynb', 'pbxproj', 'resx', 'plist',
+}
+GENERATED_SUFFIXES = ('.min.js', '.min.css', '.pb.go', '_pb2.py', '_pb2_grpc.py', '.g.dart', '.designer.cs', '.generated.ts')
+
+
+_compiled: Dict[str, Extractor] = {}
+
+
+def _extractor(language: str) -> Extractor:
+    extract = _compiled.get(language)
+    if extract is None:
+        extract = _compiled[language] = re.compile(LANGUAGE_PATTERNS[language]).match
+    return extract
+
+
+def extractor_for(path: str) -> Optional[Extractor]:
+    """The key change matcher for a file, or None when its lines aren't worth scanning."""
+    name = posixpath.basename(path).lower()
+    if name.endswith(GENERATED_SUFFIXES):
+        return None
+    extension = name.rpartition('.')[2] if '.' in name else ''
+    if extension in NO_EXTRACTOR_EXTENSIONS:
+        return None
+    language = EXTENSION_LANGUAGES.get(extension)
+    return GENERIC_PATTERN.match if language is None else _extractor(language)
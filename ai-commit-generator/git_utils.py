@@ -0,0 +1,93 @@
+import os
+import posixpath
+import subprocess
+from typing import List, Optional
+from schemas import GitContext
+
+# Every tracked .gitignore, whatever the current directory
+GITIGNORE_PATHSPEC = ':(top)*.gitignore'
+
+
+def get_git_dir() -> Optional[str]:
+    """Return the absolute path of the repository's git directory, if any."""
+    try:
+        git_dir = subprocess.check_output(
+            ['git', 'rev-parse', '--absolute-git-dir'],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+        return git_dir if git_dir else None
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def _show_current_branch() -> Optional[str]:
+    try:
+        branch = subprocess.check_output(['git', 'branch', '--show-current'], text=True, stderr=subprocess.DEVNULL).strip()
+        return branch if branch else None
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def read_head_branch(git_dir: str) -> Optional[str]:
+    """Return the branch HEAD points to by reading the HEAD file; None when detached."""
+    try:
+        with open(os.path.join(git_dir, 'HEAD'), 'r', encoding='utf-8') as f:
+            head = f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return _show_current_branch()
+    if not head.startswith('ref: '):
+        return None
+    ref = head[len('ref: '):]
+    if ref == 'refs/heads/.invalid':
+        # reftable repositories keep the real HEAD in the ref store
+        return _show_current_branch()
+    return ref[len('refs/heads/'):] if ref.startswith('refs/heads/') else None
+
+
+def parse_gitignore_dirs(listing: bytes) -> List[str]:
+    """Directories holding a .gitignore from NUL-separated `git ls-files -z` output."""
+    paths = listing.decode('utf-8', errors='replace').split('\0')
+    return [posixpath.dirname(path) for path in paths if posixpath.basename(path) == '.gitignore']
+
+
+def collect_git_context() -> Optional[GitContext]:
+    """Collect what the hook needs to know about the repository in one pass.
+
+    The repository root, git directory and tracked .gitignore files come
+    from two git processes started together; the branch is read from HEAD
+    and the root .gitignore from the working tree root, so the result is
+    the same when run from a subdirectory or a linked worktree. Returns
+    None outside a working tree or when git is missing.
+    """
+    try:
+        rev_parse = subprocess.Popen(['git', 'rev-parse', '--show-toplevel', '--absolute-git-dir'],
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        return None
+    ls_files = subprocess.Popen(['git', 'ls-files', '-z', '--full-name', '--', GITIGNORE_PATHSPEC],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output, _ = rev_parse.communicate()
+    listing, _ = ls_files.communicate()
+    lines = output.decode('utf-8', errors='replace').splitlines()
+    if rev_parse.returncode != 0 or len(lines) < 2:
+        return None
+
+    repo_root, git_dir = lines[0], lines[1]
+    gitignore_content = None
+    try:
+        with open(os.path.join(repo_root, '.gitignore'), 'r', encoding='utf-8') as f:
+            gitignore_content = f.read()
+    except (OSError, UnicodeDecodeError):
+        pass
+    if ls_files.returncode == 0:
+        gitignore_dirs = parse_gitignore_dirs(listing)
+    else:
+        gitignore_dirs = [''] if gitignore_content is not None else []
+    return GitContext(
+        repo_root=repo_root,
+        git_dir=git_dir,
+        branch_name=read_head_branch(git_dir),
+        gitignore_content=gitignore_content,
+        gitignore_dirs=gitignore_dirs,
+    )
@@ -0,0 +1,158 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+from adapters.adapter import LanguageModelAdapter, run_async
+
+if TYPE_CHECKING:
+    import asyncio
+    from resilience import CircuitBreaker
+
+DEFAULT_HEDGE_DELAY = 2.0
+
+# (provider, model, latency_ms, outcome) of every hedged attempt that finished
+HedgeAttempt = Tuple[str, str, float, str]
+_attempts: 'ContextVar[Optional[List[HedgeAttempt]]]' = ContextVar('hedge_attempts', default=None)
+_breaker: 'ContextVar[Optional[CircuitBreaker]]' = ContextVar('hedge_breaker', default=None)
+
+
+@contextmanager
+def track_hedge_attempts() -> Iterator[List[HedgeAttempt]]:
+    """Collect the hedged attempts made within the block, so each can be measured under its own provider.
+
+    Attempts cancelled because another adapter answered first are not included.
+    """
+    attempts: List[HedgeAttempt] = []
+    token = _attempts.set(attempts)
+    try:
+        yield attempts
+    finally:
+        _attempts.reset(token)
+
+
+@contextmanager
+def breaker_per_provider(breaker: 'CircuitBreaker') -> Iterator[None]:
+    """Within the block, hedged requests leave out providers whose circuit is open
+    and record each finished attempt under its own provider.
+
+    Attempts cancelled because another adapter answered first are not recorded.
+    """
+    token = _breaker.set(breaker)
+    try:
+        yield
+    finally:
+        _breaker.reset(token)
+
+
+def is_valid_message(message: Optional[str]) -> bool:
+    return bool(message and message.strip())
+
+
+async def hedged_send(prompt: str, adapters: Sequence[LanguageModelAdapter], delay: float = DEFAULT_HEDGE_DELAY) -> str:
+    """Send prompt to adapters in order, starting the next one after delay seconds.
+
+    The first valid answer wins and the remaining requests are cancelled. A
+    request that fails or returns an empty answer starts the next adapter
+    immediately instead of waiting for the delay.
+    """
+    import asyncio
+
+    if not adapters:
+        raise ValueError("At least one adapter is required")
+    breaker = _breaker.get()
+    if breaker is not None:
+        # Should every circuit have opened since the caller checked, race them all anyway
+        adapters = [adapter for adapter in adapters if breaker.allow(adapter.provider)] or adapters
+
+    pending: List['asyncio.Task'] = []
+    errors: List[BaseException] = []
+    next_index = 0
+    launched: Dict['asyncio.Task', Tuple[LanguageModelAdapter, float]] = {}
+    attempts = _attempts.get()
+
+    def launch_next() -> None:
+        nonlocal next_index
+        adapter = adapters[next_index]
+        next_index += 1
+        task = asyncio.ensure_future(adapter.send_message_async(prompt))
+        launched[task] = (adapter, time.monotonic())
+        pending.append(task)
+
+    def finish(task: 'asyncio.Task', outcome: str) -> None:
+        adapter, started = launched[task]
+        if attempts is not None:
+            attempts.append((adapter.provider, adapter.model, (time.monotonic() - started) * 1000, outcome))
+        if breaker is not None:
+            if outcome == 'ok':
+                breaker.record_success(adapter.provider)
+            else:
+                breaker.record_failure(adapter.provider)
+
+    launch_next()
+    try:
+        while pending:
+            timeout = delay if next_index < len(adapters) else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                pending.remove(task)
+                if task.exception() is not None:
+                    finish(task, 'error')
+                    errors.append(task.exception())
+                elif is_valid_message(task.result()):
+                    finish(task, 'ok')
+                    return task.result()
+                else:
+                    finish(task, 'error')
+                    errors.append(ValueError("Language model returned an empty message"))
+
+            # Hedge after the delay, or right away once nothing is in flight
+            if next_index < len(adapters) and (not done or not pending):
+                launch_next()
+    except asyncio.CancelledError:
+        # Cancelled from outside, e.g. at the deadline: every request in flight timed out
+        for task in pending:
+            finish(task, 'timeout')
+        raise
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    raise errors[-1]
+
+
+class HedgedAdapter(LanguageModelAdapter):
+    """Adapter that races a primary provider against backups after a delay."""
+
+    def __init__(self, adapters: Sequence[LanguageModelAdapter], delay: float = DEFAULT_HEDGE_DELAY):
+        if not adapters:
+            raise ValueError("At least one adapter is required")
+        self.adapters = list(adapters)
+        self.delay = delay
+        self.provider = '+'.join(adapter.provider for adapter in self.adapters)
+        self.model = '+'.join(adapter.model for adapter in self.adapters)
+
+    def send_message(self, prompt: str) -> str:
+        return run_async(self.send_message_async(prompt))
+
+    async def send_message_async(self, prompt: str) -> str:
+        return await hedged_send(prompt, self.adapters, self.delay)
+
+    def close(self) -> None:
+        for adapter in self.adapters:
+            adapter.close()
+
+
+def provider_adapters(adapter: LanguageModelAdapter) -> List[LanguageModelAdapter]:
+    """The adapters that send adapter's requests to a provider: a hedged adapter's racers, else adapter itself.
+
+    A recording ReplayAdapter is looked through to the adapter it wraps.
+    """
+    inner = getattr(adapter, 'inner', None)
+    if inner is not None:
+        return provider_adapters(inner)
+    if isinstance(adapter, HedgedAdapter):
+        return list(adapter.adapters)
+    return [adapter]
@@ -0,0 +1,182 @@
+import posixpath
+import re
+import textwrap
+from typing import Dict, List, Mapping, Optional, Tuple
+from compaction import CONFIG_EXTENSIONS, DOC_EXTENSIONS, TEST_PATH_PATTERN
+from schemas import ChangeSummary, FileChangeSummary, FileStat
+
+SUBJECT_LIMIT = 50
+BODY_WIDTH = 72
+MAX_LISTED_FILES = 8
+
+LOCKFILE_NAMES = {
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml', 'bun.lockb',
+    'poetry.lock', 'pipfile.lock', 'pdm.lock', 'uv.lock', 'cargo.lock', 'go.sum',
+    'composer.lock', 'gemfile.lock', 'podfile.lock', 'mix.lock', 'flake.lock',
+}
+DOC_NAMES = {'readme', 'changelog', 'contributing', 'license', 'authors', 'notice'}
+CI_PATH_PATTERN = re.compile(r'(^|/)(\.github/workflows|\.circleci|\.gitlab-ci\.yml|\.travis\.yml|azure-pipelines\.yml|Jenkinsfile)')
+# Directory names too generic to make a useful scope
+GENERIC_DIRS = {
+    'src', 'lib', 'app', 'pkg', 'internal', 'source', 'sources', 'main', 'java', 'python',
+    'test', 'tests', '__tests__', 'spec', 'specs', 'doc', 'docs',
+}
+DECLARATION_PATTERN = re.compile(
+    r'(?:(?:export|default|public|protected|private|internal|static|final|async|abstract|unsafe|pub(?:\([^)]*\))?)\s+)*'
+    r'(?:def|class|function|interface|type|fn|func|fun|struct|enum|trait|module|record|protocol)\s+([A-Za-z_$][\w$]*)'
+)
+
+
+def is_lockfile(path: str) -> bool:
+    name = posixpath.basename(path).lower()
+    return name in LOCKFILE_NAMES or name.endswith('.lock')
+
+
+def is_doc(path: str) -> bool:
+    name = posixpath.basename(path).lower()
+    stem, _, extension = name.rpartition('.')
+    return extension in DOC_EXTENSIONS or (stem or extension) in DOC_NAMES or path.lower().startswith('docs/')
+
+
+def is_test(path: str) -> bool:
+    return TEST_PATH_PATTERN.search(path) is not None
+
+
+def new_declarations(key_changes: Dict[str, List[str]], files: List[str]) -> List[str]:
+    """Names of functions, classes and types added in files, in order."""
+    names: List[str] = []
+    seen = set()
+    for path in files:
+        for change in key_changes.get(path, ()):
+            match = DECLARATION_PATTERN.match(change)
+            if match and match.group(1) not in seen:
+                seen.add(match.group(1))
+                names.append(match.group(1))
+    return names
+
+
+def infer_scope(files: List[str]) -> Optional[str]:
+    """Last meaningful directory of the files' common path, if any."""
+    directories = [posixpath.dirname(path) for path in files]
+    if not directories or not all(directories):
+        return None
+    common = posixpath.commonpath(directories)
+    for part in reversed(common.split('/') if common else []):
+        if part.lower() not in GENERIC_DIRS and not part.startswith('.'):
+            return part
+    return None
+
+
+def infer_type(files: List[str], all_files: List[str], declarations: List[str], statuses: Dict[str, str],
+               additions: int, deletions: int) -> str:
+    """Conventional commit type from paths and content."""
+    if all_files and all(is_lockfile(path) for path in all_files):
+        return 'chore'
+    if not files:
+        return 'chore'
+    if all(is_test(path) for path in files):
+        return 'test'
+    if all(is_doc(path) for path in files):
+        return 'docs'
+    if all(CI_PATH_PATTERN.search(path) for path in files):
+        return 'ci'
+    code_files = [path for path in files if not is_doc(path) and not is_test(path)]
+    if declarations or any(statuses.get(path) == 'A' for path in code_files):
+        return 'feat'
+    if all(path.rsplit('.', 1)[-1].lower() in CONFIG_EXTENSIONS for path in files):
+        return 'chore'
+    if additions == 0 and deletions:
+        return 'refactor'
+    return 'fix' if additions + deletions <= 20 else 'refactor'
+
+
+def _describe(commit_type: str, files: List[str], all_files: List[str], declarations: List[str],
+              statuses: Dict[str, str]) -> str:
+    names = sorted(set(posixpath.basename(path) for path in files))
+    target = names[0] if len(names) == 1 else f"{len(files)} files"
+    if commit_type == 'chore' and all_files and all(is_lockfile(path) for path in all_files):
+        return 'update dependencies'
+    if commit_type == 'feat' and declarations:
+        return f"add {declarations[0]}" if len(declarations) == 1 else f"add {declarations[0]} and {len(declarations) - 1} more"
+    if commit_type == 'feat':
+        added = [posixpath.basename(path) for path in files if statuses.get(path) == 'A']
+        return f"add {added[0]}" if len(added) == 1 else f"add {len(added)} files"
+    if commit_type == 'test':
+        return f"update tests in {target}" if len(names) == 1 else 'update tests'
+    if commit_type == 'docs':
+        return f"update {target}" if len(names) == 1 else 'update documentation'
+    if commit_type == 'refactor' and statuses and all(statuses.get(path) == 'D' for path in files):
+        return f"remove {target}"
+    if not files:
+        return f"update {len(all_files)} files" if len(all_files) != 1 else f"update {posixpath.basename(all_files[0])}"
+    return f"update {target}"
+
+
+def _fit_subject(commit_type: str, scope: Optional[str], description: str) -> str:
+    subject = f"{commit_type}({scope}): {description}" if scope else f"{commit_type}: {description}"
+    if len(subject) <= SUBJECT_LIMIT:
+        return subject
+    # Drop the scope first, then shorten the description at a word boundary
+    prefix = f"{commit_type}: "
+    description = textwrap.shorten(description, SUBJECT_LIMIT - len(prefix), placeholder='')
+    return (prefix + description).rstrip()
+
+
+def _file_counts(path: str, changes: Optional[Mapping[str, FileChangeSummary]],
+                 stats: Dict[str, FileStat]) -> Optional[Tuple[int, int]]:
+    if path in stats:
+        return stats[path]['additions'], stats[path]['deletions']
+    if changes and path in changes:
+        return changes[path]['additions'], changes[path]['deletions']
+    return None
+
+
+def build_heuristic_message(summary: ChangeSummary, ticket_number: Optional[str] = None,
+                            changes: Optional[Mapping[str, FileChangeSummary]] = None,
+                            file_stats: Optional[List[FileStat]] = None) -> str:
+    """Write a conventional commit message from the change summary alone.
+
+    The type comes from the kinds of files touched and whether declarations
+    were added, the scope from the files' common directory. The subject is
+    kept within 50 characters and the body wrapped at 72.
+    """
+    files = list(summary['important_files'])
+    if file_stats is not None:
+        all_files = [stat['path'] for stat in file_stats]
+    elif changes is not None:
+        all_files = list(changes)
+    else:
+        all_files = files
+    stats = {stat['path']: stat for stat in file_stats or ()}
+    statuses = {path: stat['status'] for path, stat in stats.items()}
+    # Only declarations in code count towards feat; new test functions don't
+    declarations = new_declarations(summary['key_changes'], [path for path in files if not is_test(path) and not is_doc(path)])
+
+    commit_type = infer_type(files, all_files, declarations, statuses,
+                             summary['total_additions'], summary['total_deletions'])
+    scope = infer_scope(files or all_files)
+    if commit_type == 'chore' and all_files and all(is_lockfile(path) for path in all_files):
+        scope = 'deps'
+    subject = _fit_subject(commit_type, scope, _describe(commit_type, files, all_files, declarations, statuses))
+
+    count = summary['total_files']
+    noun = 'file' if count == 1 else 'files'
+    paragraphs = [f"Update {count} {noun} (+{summary['total_additions']}/-{summary['total_deletions']} lines)."]
+    listed = files or all_files
+    if listed:
+        bullets = []
+        for path in listed[:MAX_LISTED_FILES]:
+            counts = _file_counts(path, changes, stats)
+            entry = f"- {path}" + (f" (+{counts[0]}/-{counts[1]})" if counts else '')
+            added = new_declarations(summary['key_changes'], [path])
+            if added:
+                entry += f": add {', '.join(added[:4])}" + (' and more' if len(added) > 4 else '')
+            bullets.append(textwrap.fill(entry, BODY_WIDTH, subsequent_indent='  '))
+        if len(listed) > MAX_LISTED_FILES:
+            bullets.append(f"- ... and {len(listed) - MAX_LISTED_FILES} more")
+        paragraphs.append('\n'.join(bullets))
+
+    message = subject + '\n\n' + '\n\n'.join(paragraphs)
+    if ticket_number:
+        message += f"\n\nRefs: #{ticket_number}"
+    return message
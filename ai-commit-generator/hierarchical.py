@@ -0,0 +1,163 @@
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+from adapters.adapter import run_async
+from compaction import FileSection, compact_sections, split_file_sections
+from diff_parser import DiffInput
+from hedging import is_valid_message
+from schemas import ChangeSummary, FileGroup
+
+DEFAULT_CONCURRENCY = 4
+MAX_GROUPS = 8
+# Deepest directory level files are grouped by
+MAX_GROUP_DEPTH = 4
+# Rough prompt tokens per changed line before compaction
+CHANGED_LINE_TOKENS = 12
+# Share of the time left before the deadline given to the map requests
+MAP_DEADLINE_SHARE = 2 / 3
+
+MAP_PROMPT_PREFIX = """Summarize one part of a larger Git change in at most three short lines of plain text: what changed and why, naming the most important files or declarations. Do not write a commit message.
+
+The part, as "field: value" lines; key_changes lists added declarations per file, removed ones prefixed "- ", and diff is a compacted excerpt:
+
+"""
+MAP_PROMPT_END = "\nSummary:"
+
+# Sends one map prompt with the map requests' deadline (None for no deadline)
+MapSend = Callable[[str, Optional[float]], Awaitable[str]]
+
+
+def get_map_reduce_mode() -> str:
+    """When to summarize per group first, from AI_COMMIT_MAP_REDUCE: off (default), auto or always."""
+    value = os.getenv('AI_COMMIT_MAP_REDUCE', '').strip().lower()
+    if value in ('1', 'true', 'yes', 'on', 'always'):
+        return 'always'
+    if value == 'auto':
+        return 'auto'
+    return 'off'
+
+
+def get_map_concurrency() -> int:
+    """Maximum map requests in flight, from AI_COMMIT_MAP_CONCURRENCY."""
+    return max(1, int(os.getenv('AI_COMMIT_MAP_CONCURRENCY', DEFAULT_CONCURRENCY)))
+
+
+def get_patch_token_budget(token_budget: int) -> int:
+    """Tokens of staged patch to read: every group gets its own excerpt when map-reduce may run."""
+    return token_budget * MAX_GROUPS if get_map_reduce_mode() != 'off' else token_budget
+
+
+def needs_map_reduce(summary: ChangeSummary, token_budget: int) -> bool:
+    """Whether the changed lines are estimated not to fit a single prompt."""
+    changed_lines = summary['total_additions'] + summary['total_deletions']
+    return changed_lines * CHANGED_LINE_TOKENS > token_budget
+
+
+def _directory_prefix(path: str, depth: int) -> str:
+    directories = path.split('/')[:-1]
+    return '/'.join(directories[:depth]) if directories else '.'
+
+
+def group_files(paths: Sequence[str], counts: Mapping[str, Tuple[int, int]], max_groups: int = MAX_GROUPS) -> List[FileGroup]:
+    """Group paths by directory, largest change first, merging the smallest into "other".
+
+    counts maps each path to its (additions, deletions).
+
+    When every file sits below one directory the grouping moves a level
+    down, so a change inside src/ is split by src/<module>.
+    """
+    depth = 1
+    while True:
+        buckets: Dict[str, List[str]] = {}
+        for path in paths:
+            buckets.setdefault(_directory_prefix(path, depth), []).append(path)
+        if len(buckets) > 1 or depth >= MAX_GROUP_DEPTH or not any(path.count('/') > depth for path in paths):
+            break
+        depth += 1
+
+    groups = [
+        FileGroup(
+            name=name,
+            files=files,
+            additions=sum(counts[path][0] for path in files),
+            deletions=sum(counts[path][1] for path in files),
+        )
+        for name, files in buckets.items()
+    ]
+    groups.sort(key=lambda group: group['additions'] + group['deletions'], reverse=True)
+    if len(groups) > max_groups:
+        rest = groups[max_groups - 1:]
+        groups = groups[:max_groups - 1] + [FileGroup(
+            name='other',
+            files=[path for group in rest for path in group['files']],
+            additions=sum(group['additions'] for group in rest),
+            deletions=sum(group['deletions'] for group in rest),
+        )]
+    return groups
+
+
+def group_excerpts(diff: DiffInput, groups: List[FileGroup], token_budget: int) -> List[str]:
+    """Compact each group's part of the diff to token_budget, splitting the diff only once."""
+    group_of = {path: index for index, group in enumerate(groups) for path in group['files']}
+    sections: List[List[FileSection]] = [[] for _ in groups]
+    for section in split_file_sections(diff, token_budget, group_of.__contains__):
+        if not section.binary and section.hunks:
+            sections[group_of[section.filename]].append(section)
+    return [compact_sections(group_sections, token_budget) for group_sections in sections]
+
+
+def build_map_prompt(group: FileGroup, formatted_key_changes: str, excerpt: str) -> str:
+    return ''.join((
+        MAP_PROMPT_PREFIX,
+        f"part: {group['name']}\n",
+        f"files: {len(group['files'])} (+{group['additions']}/-{group['deletions']})\n",
+        f"key_changes:{formatted_key_changes or ' -'}\n",
+        f"diff:\n{excerpt or '-'}\n",
+        MAP_PROMPT_END,
+    ))
+
+
+def describe_group(group: FileGroup, key_changes: Mapping[str, List[str]], limit: int = 5) -> str:
+    """A locally built one-line summary, used when a map request fails."""
+    declarations = [change for path in group['files'] for change in key_changes.get(path, [])]
+    names = ', '.join(list(dict.fromkeys(declarations))[:limit]) or ', '.join(group['files'][:limit])
+    return f"changes in {names}"
+
+
+async def _map_all(send: MapSend, prompts: Sequence[str], concurrency: int, deadline: Optional[float]) -> list:
+    import asyncio
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(prompt: str) -> Optional[str]:
+        async with semaphore:
+            message = await send(prompt, deadline)
+        return ' '.join(message.split()) if is_valid_message(message) else None
+
+    return await asyncio.gather(*(run(prompt) for prompt in prompts), return_exceptions=True)
+
+
+def summarize_groups(send: MapSend, prompts: Sequence[str], concurrency: Optional[int] = None,
+                     deadline: Optional[float] = None) -> List[Optional[str]]:
+    """Send the map prompts concurrently through send; None marks a failed or empty answer.
+
+    send(prompt, deadline) is awaited for each prompt, so the caller decides
+    how requests are retried, measured and guarded. With a deadline the map
+    requests get part of the time left, keeping the rest for the final
+    request. Without one, the first error is raised only if every request
+    failed.
+    """
+    if deadline is not None:
+        deadline = time.monotonic() + (deadline - time.monotonic()) * MAP_DEADLINE_SHARE
+    results = run_async(_map_all(send, prompts, concurrency or get_map_concurrency(), deadline))
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if deadline is None and errors and len(errors) == len(results):
+        raise errors[0]
+    return [result if isinstance(result, str) else None for result in results]
+
+
+def format_group_summaries(groups: List[FileGroup], summaries: List[str]) -> str:
+    return ''.join(
+        f"\n- {group['name']} ({len(group['files'])} files, +{group['additions']}/-{group['deletions']}): {text}"
+        for group, text in zip(groups, summaries)
+    )
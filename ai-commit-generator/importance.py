@@ -0,0 +1,297 @@
+import os
+import posixpath
+import re
+import subprocess
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+from git_utils import parse_gitignore_dirs
+
+BUILTIN_IGNORE_PATTERNS = [
+    r'\.lock$', r'\.log$', r'\.map$', r'\.min\.',
+    r'package-lock\.json$', r'yarn\.lock$',
+    r'\.git/', r'node_modules/', r'vendor/',
+]
+# is_important tests BUILTIN_IGNORE_PATTERNS as plain string checks, which
+# are several times cheaper than the regex; yarn.lock is covered by .lock
+BUILTIN_IGNORE_SUFFIXES = ('.lock', '.log', '.map', 'package-lock.json')
+
+AICOMMITIGNORE = '.aicommitignore'
+
+NAMED_GROUP = re.compile(r'\(\?P<[^>]+>')
+ANY_DIR_PREFIX = '^(?:.+/)?'
+FILE_OR_DIR_SUFFIX = '(?:(?P<ps_d>/).*)?$'
+DIR_ONLY_SUFFIX = '(?P<ps_d>/).*$'
+
+
+class IgnorePattern:
+    """One compiled gitignore pattern.
+
+    Patterns without a slash match the basename at any depth; for those a
+    basename-only regex is kept, which is much cheaper than the full-path one.
+    """
+
+    __slots__ = ('ignore', 'regex', 'basename_source', 'basename_match', 'dir_only')
+
+    def __init__(self, ignore: bool, regex: Pattern):
+        self.ignore = ignore
+        self.regex = regex
+        source = regex.pattern
+        self.dir_only = source.endswith(DIR_ONLY_SUFFIX) and not source.endswith(FILE_OR_DIR_SUFFIX)
+        self.basename_source: Optional[str] = None
+        self.basename_match = None
+        if source.startswith(ANY_DIR_PREFIX):
+            suffix = DIR_ONLY_SUFFIX if self.dir_only else FILE_OR_DIR_SUFFIX
+            if source.endswith(suffix):
+                core = source[len(ANY_DIR_PREFIX):-len(suffix)]
+                if '/' not in core.replace('[^/]', ''):
+                    self.basename_source = core
+                    self.basename_match = re.compile(core + '$').match
+
+    def matches_file(self, relative_path: str, basename: str) -> bool:
+        if self.dir_only:
+            return False  # Directories are checked, and memoized, separately
+        if self.basename_match is not None:
+            return self.basename_match(basename) is not None
+        return self.regex.match(relative_path) is not None
+
+
+class CompiledPatterns:
+    """The patterns of one ignore file, in file order."""
+
+    def __init__(self, patterns: List[IgnorePattern]):
+        self.patterns = patterns
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def match(self, path: str) -> Optional[bool]:
+        """Last matching pattern wins; None when no pattern matches."""
+        for pattern in reversed(self.patterns):
+            if pattern.regex.match(path):
+                return pattern.ignore
+        return None
+
+    def match_file(self, relative_path: str, basename: str) -> Optional[bool]:
+        for pattern in reversed(self.patterns):
+            if pattern.matches_file(relative_path, basename):
+                return pattern.ignore
+        return None
+
+
+Chain = List[Tuple[str, CompiledPatterns]]
+
+
+def compile_ignore_lines(lines: Iterable[str]) -> CompiledPatterns:
+    """Compile gitignore-style lines."""
+    from pathspec.patterns.gitwildmatch import GitWildMatchPattern
+
+    compiled: List[IgnorePattern] = []
+    for line in lines:
+        pattern = GitWildMatchPattern(line)
+        if pattern.include is not None:
+            compiled.append(IgnorePattern(pattern.include, pattern.regex))
+    return CompiledPatterns(compiled)
+
+
+class _FileFilter:
+    """Quick any-match test for files in directories sharing the same ignore chain.
+
+    When every file pattern in the chain matches on the basename, decide
+    settles the question with one regex: its alternatives are the patterns
+    in the order git applies them (deepest file first, last line first), so
+    the first one to match names the pattern that wins.
+    """
+
+    def __init__(self, chain: Chain):
+        basename_sources = []
+        path_sources = []
+        for base, patterns in chain:
+            for pattern in patterns.patterns:
+                if pattern.dir_only:
+                    continue
+                if pattern.basename_source is not None:
+                    basename_sources.append(pattern.basename_source)
+                else:
+                    source = NAMED_GROUP.sub('(?:', pattern.regex.pattern)
+                    path_sources.append(re.escape(base) + source[1:])
+        self.basename_match = re.compile('(?:' + '|'.join(basename_sources) + ')$').match if basename_sources else None
+        self.path_match = re.compile('^(?:' + '|'.join(path_sources) + ')').match if path_sources else None
+
+        self.decide = None
+        self.ignores: Dict[str, bool] = {}
+        if basename_sources and not path_sources:
+            alternatives = []
+            for base, patterns in chain:
+                for pattern in reversed(patterns.patterns):
+                    if not pattern.dir_only:
+                        name = f'p{len(alternatives)}'
+                        self.ignores[name] = pattern.ignore
+                        alternatives.append(f'(?P<{name}>{NAMED_GROUP.sub("(?:", pattern.basename_source)})')
+            self.decide = re.compile('|'.join(alternatives)).fullmatch
+
+    def may_match(self, path: str, basename: str) -> bool:
+        return bool((self.basename_match is not None and self.basename_match(basename))
+                    or (self.path_match is not None and self.path_match(path)))
+
+
+# A directory's file filter, split into the parts is_important reads, and ignore chain
+DirectoryEntry = Tuple[Optional[Callable[[str], Any]], Dict[str, bool],
+                       Optional[Callable[[str], Any]], Optional[Callable[[str], Any]], Chain]
+
+
+def _read_lines(path: str) -> List[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().splitlines()
+    except (IOError, UnicodeDecodeError):
+        return []
+
+
+class ImportanceMatcher:
+    """Decides which changed paths matter for the commit message.
+
+    Built-in noise patterns are checked with plain string tests. Ignore
+    files are honoured like git does: the root ``.gitignore`` plus every
+    nested one, ``.git/info/exclude`` and a project ``.aicommitignore``.
+    Nested files are only read when a path below them is classified, and
+    whether a directory is ignored is memoized, so classifying many paths
+    that share directories costs little more than one regex per path. Each
+    directory's file patterns are compiled together, so that regex usually
+    decides on its own.
+    """
+
+    def __init__(self, root: Optional[str] = None, gitignore_dirs: Iterable[str] = (),
+                 root_patterns: Iterable[str] = ()):
+        self.root = root
+        # Directories (relative, '' for the root) that contain a .gitignore
+        self._gitignore_dirs = set(gitignore_dirs)
+        self._root_patterns = compile_ignore_lines(root_patterns)
+        self._level_cache: Dict[str, CompiledPatterns] = {}
+        self._chain_cache: Dict[str, Chain] = {}
+        self._filter_cache: Dict[str, Tuple[_FileFilter, Chain]] = {}
+        self._shared_filters: Dict[Tuple[str, ...], _FileFilter] = {}
+        self._dir_cache: Dict[str, bool] = {'': False}
+        self._entry_cache: Dict[str, Optional[DirectoryEntry]] = {}
+
+    @classmethod
+    def from_repo(cls, root: str, git_dir: Optional[str] = None,
+                  gitignore_dirs: Optional[List[str]] = None) -> 'ImportanceMatcher':
+        """Build a matcher for the repository at root.
+
+        gitignore_dirs skips listing the tracked .gitignore files when the caller already has them.
+        """
+        root_lines: List[str] = []
+        if git_dir:
+            root_lines.extend(_read_lines(os.path.join(git_dir, 'info', 'exclude')))
+        root_lines.extend(_read_lines(os.path.join(root, AICOMMITIGNORE)))
+        return cls(root, list_gitignore_dirs(root) if gitignore_dirs is None else gitignore_dirs, root_lines)
+
+    def _level(self, directory: str) -> CompiledPatterns:
+        patterns = self._level_cache.get(directory)
+        if patterns is None:
+            path = os.path.join(self.root or '', directory, '.gitignore')
+            patterns = compile_ignore_lines(_read_lines(path) if self.root is not None else [])
+            self._level_cache[directory] = patterns
+        return patterns
+
+    def _chain(self, directory: str) -> Chain:
+        """Ignore levels that apply to entries of directory, deepest first."""
+        chain = self._chain_cache.get(directory)
+        if chain is not None:
+            return chain
+
+        if directory:
+            chain = list(self._chain(posixpath.dirname(directory)))
+            if directory in self._gitignore_dirs:
+                chain.insert(0, (directory + '/', self._level(directory)))
+        else:
+            chain = []
+            if '' in self._gitignore_dirs:
+                chain.append(('', self._level('')))
+            if self._root_patterns:
+                chain.append(('', self._root_patterns))
+        self._chain_cache[directory] = chain
+        return chain
+
+    def _file_filter(self, directory: str) -> Tuple[_FileFilter, Chain]:
+        entry = self._filter_cache.get(directory)
+        if entry is None:
+            chain = [(base, patterns) for base, patterns in self._chain(directory) if patterns]
+            # Directories below the same .gitignore files share one compiled filter
+            key = tuple(base for base, _ in chain)
+            file_filter = self._shared_filters.get(key)
+            if file_filter is None:
+                file_filter = self._shared_filters[key] = _FileFilter(chain)
+            entry = self._filter_cache[directory] = (file_filter, chain)
+        return entry
+
+    def _is_directory_pattern_ignored(self, directory: str, parent: str) -> bool:
+        candidate = directory + '/'
+        for base, patterns in self._chain(parent):
+            result = patterns.match(candidate[len(base):])
+            if result is not None:
+                return result
+        return False
+
+    def _is_file_ignored(self, path: str, directory: str) -> bool:
+        basename = path[len(directory) + 1:] if directory else path
+        file_filter, chain = self._file_filter(directory)
+        if not file_filter.may_match(path, basename):
+            return False
+        for base, patterns in chain:
+            result = patterns.match_file(path[len(base):], basename)
+            if result is not None:
+                return result
+        return False
+
+    def is_directory_ignored(self, directory: str) -> bool:
+        ignored = self._dir_cache.get(directory)
+        if ignored is None:
+            parent = posixpath.dirname(directory)
+            ignored = self.is_directory_ignored(parent) or self._is_directory_pattern_ignored(directory, parent)
+            self._dir_cache[directory] = ignored
+        return ignored
+
+    def _directory_entry(self, directory: str) -> Optional[DirectoryEntry]:
+        """What is_important needs for files in directory, or None when the directory is ignored."""
+        entry = None
+        if not self.is_directory_ignored(directory):
+            file_filter, chain = self._file_filter(directory)
+            entry = (file_filter.decide, file_filter.ignores, file_filter.basename_match, file_filter.path_match, chain)
+        self._entry_cache[directory] = entry
+        return entry
+
+    def is_important(self, path: str) -> bool:
+        if (path.endswith(BUILTIN_IGNORE_SUFFIXES) or '.min.' in path or '.git/' in path
+                or 'node_modules/' in path or 'vendor/' in path):
+            return False
+        directory, _, basename = path.rpartition('/')
+        try:
+            entry = self._entry_cache[directory]
+        except KeyError:
+            entry = self._directory_entry(directory)
+        if entry is None:
+            return False
+        decide, ignores, basename_match, path_match, chain = entry
+        if decide is not None:
+            match = decide(basename)
+            return match is None or not ignores[match.lastgroup]
+        # The filter is inlined here, as this runs once per path
+        if not ((basename_match is not None and basename_match(basename))
+                or (path_match is not None and path_match(path))):
+            return True
+        for base, patterns in chain:
+            result = patterns.match_file(path[len(base):], basename)
+            if result is not None:
+                return not result
+        return True
+
+
+def list_gitignore_dirs(root: str) -> List[str]:
+    """Directories (relative to root) holding a tracked .gitignore, read from the index."""
+    try:
+        output = subprocess.check_output(
+            ['git', 'ls-files', '-z', '--', '*.gitignore'], cwd=root, stderr=subprocess.DEVNULL,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return [''] if os.path.exists(os.path.join(root, '.gitignore')) else []
+    return parse_gitignore_dirs(output)
@@ -1,14 +1,170 @@
+import importlib
+import sys
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Type, Union
 from adapters.adapter import LanguageModelAdapter
-from adapters.cohere import CohereAdapter
-from adapters.open_ai import OpenAIAdapter
+from schemas import ProviderStats
+
+ENTRY_POINT_GROUP = 'ai_commit_generator.adapters'
+
+# Prompt price in USD per million tokens by (provider, model) or provider, for the routing cost ceiling
+PROMPT_COSTS: Dict[Tuple[str, Optional[str]], float] = {
+    ('cohere', 'command-r-plus'): 2.5,
+    ('cohere', None): 2.5,
+    ('openai', 'gpt-3.5-turbo'): 0.5,
+    ('openai', None): 0.5,
+    ('fake', None): 0.0,
+    ('replay', None): 0.0,
+    ('heuristic', None): 0.0,
+}
+# Model of each built-in adapter when <PROVIDER>_MODEL is unset, known without importing its SDK
+DEFAULT_MODELS: Dict[str, str] = {
+    'cohere': 'command-r-plus',
+    'openai': 'gpt-3.5-turbo',
+}
+# Providers that build the message locally without a request or an adapter
+# (see HeuristicMessageGenerator): they have no latency to compare and are
+# only routed to when no other candidate is left
+LOCAL_PROVIDERS = {'heuristic'}
+# Recent requests needed before a provider is judged on its latency
+MIN_SAMPLES = 3
+# Providers failing at least this often are only used when every candidate is
+DEGRADED_ERROR_RATE = 0.25
+
+AdapterTarget = Union[str, Type[LanguageModelAdapter]]
+
+
+def get_prompt_cost(provider: str, model: Optional[str] = None) -> Optional[float]:
+    """Prompt price in USD per million tokens, or None when unknown."""
+    cost = PROMPT_COSTS.get((provider, model))
+    if cost is None:
+        cost = PROMPT_COSTS.get((provider, None))
+    return cost
+
+
+def _entry_points(group: str):
+    from importlib import metadata
+
+    if sys.version_info >= (3, 10):
+        return metadata.entry_points(group=group)
+    return metadata.entry_points().get(group, [])
 
 
 class LanguageModelFactory:
-    @staticmethod
-    def create_adapter(model_name: str, api_key: str) -> LanguageModelAdapter:
-        if model_name == 'cohere':
-            return CohereAdapter(api_key)
-        elif model_name == 'openai':
-            return OpenAIAdapter(api_key)
-        else:
+    """Lazy registry of language model adapters.
+
+    Providers map to "module:Class" strings so that only the selected
+    adapter's module (and its SDK) is ever imported. Third-party adapters can
+    be registered at runtime or through the ``ai_commit_generator.adapters``
+    entry point group.
+    """
+
+    _registry: Dict[str, AdapterTarget] = {
+        'cohere': 'adapters.cohere:CohereAdapter',
+        'openai': 'adapters.open_ai:OpenAIAdapter',
+        'fake': 'adapters.fake:FakeAdapter',
+        'replay': 'adapters.replay:ReplayAdapter',
+    }
+    _entry_points_loaded = False
+
+    @classmethod
+    def register(cls, name: str, target: AdapterTarget) -> None:
+        """Register an adapter class, or a "module:Class" path to import on first use."""
+        cls._registry[name] = target
+
+    @classmethod
+    def _load_entry_points(cls) -> None:
+        if cls._entry_points_loaded:
+            return
+        cls._entry_points_loaded = True
+        for entry_point in _entry_points(ENTRY_POINT_GROUP):
+            cls._registry.setdefault(entry_point.name, entry_point.value)
+
+    @classmethod
+    def available_providers(cls) -> List[str]:
+        cls._load_entry_points()
+        return sorted(set(cls._registry) | LOCAL_PROVIDERS)
+
+    @classmethod
+    def get_adapter_class(cls, model_name: str) -> Type[LanguageModelAdapter]:
+        if model_name in LOCAL_PROVIDERS:
+            raise ValueError(f"The {model_name} provider builds messages locally and has no adapter")
+        if model_name not in cls._registry:
+            cls._load_entry_points()
+        target = cls._registry.get(model_name)
+        if target is None:
             raise ValueError(f"Unknown model: {model_name}")
+
+        if isinstance(target, str):
+            module_name, _, class_name = target.partition(':')
+            target = getattr(importlib.import_module(module_name), class_name)
+            cls._registry[model_name] = target
+        return target
+
+    @classmethod
+    def get_default_model(cls, model_name: str) -> Optional[str]:
+        """The model an adapter uses unless one is configured; None if unknown."""
+        if model_name in DEFAULT_MODELS:
+            return DEFAULT_MODELS[model_name]
+        try:
+            return cls.get_adapter_class(model_name).model or None
+        except (ValueError, ImportError):
+            return None
+
+    @classmethod
+    def create_adapter(cls, model_name: str, api_key: str, base_url: Optional[str] = None, **options: Any) -> LanguageModelAdapter:
+        """Instantiate an adapter.
+
+        base_url and options (model, max_tokens, connect_timeout, read_timeout)
+        are only passed when set and when the adapter's constructor takes them,
+        so shared settings such as LANGUAGE_MODEL_READ_TIMEOUT don't break the
+        offline adapters.
+        """
+        import inspect
+
+        adapter_class = cls.get_adapter_class(model_name)
+        kwargs = {name: value for name, value in options.items() if value is not None}
+        if base_url:
+            kwargs['base_url'] = base_url
+        parameters = inspect.signature(adapter_class).parameters.values()
+        if not any(parameter.kind is parameter.VAR_KEYWORD for parameter in parameters):
+            accepted = {parameter.name for parameter in parameters}
+            kwargs = {name: value for name, value in kwargs.items() if name in accepted}
+        return adapter_class(api_key, **kwargs)
+
+    @classmethod
+    def route(cls, candidates: Sequence[str], stats: Mapping[str, ProviderStats], max_cost: Optional[float] = None,
+              models: Optional[Mapping[str, Optional[str]]] = None) -> str:
+        """Pick the provider for the next request from recent per-provider stats.
+
+        Candidates whose known prompt cost exceeds max_cost are left out, and
+        LOCAL_PROVIDERS are only picked when nothing else remains.
+        Providers with fewer than MIN_SAMPLES recent requests are tried first,
+        in the given order, so every candidate gets measured. After that the
+        lowest p50 latency wins among providers failing less than
+        DEGRADED_ERROR_RATE of the time, so a slow or failing provider is
+        routed around until its entries age out.
+        """
+        models = models or {}
+        affordable = [
+            provider for provider in candidates
+            if max_cost is None or (get_prompt_cost(provider, models.get(provider)) or 0.0) <= max_cost
+        ]
+        if not affordable:
+            raise ValueError(f"No provider among {', '.join(candidates)} is within the cost ceiling of {max_cost}")
+        remote = [provider for provider in affordable if provider not in LOCAL_PROVIDERS]
+        if not remote:
+            return affordable[0]
+        affordable = remote
+
+        for provider in affordable:
+            provider_stats = stats.get(provider)
+            if provider_stats is None or provider_stats['requests'] < MIN_SAMPLES:
+                return provider
+
+        def score(provider: str) -> Tuple[bool, float, float]:
+            provider_stats = stats[provider]
+            p50 = provider_stats['p50_ms']
+            degraded = provider_stats['error_rate'] >= DEGRADED_ERROR_RATE
+            return degraded, provider_stats['error_rate'] if degraded else 0.0, float('inf') if p50 is None else p50
+
+        return min(affordable, key=score)
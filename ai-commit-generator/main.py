@@ -1,47 +1,123 @@
 import os
 import sys
 import subprocess
-from typing import Optional
-from commit_message_generator import CommitMessageGenerator
-from language_model_factory import LanguageModelFactory
-from dotenv import load_dotenv
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from adapters.adapter import LanguageModelAdapter
+from commit_message_generator import CommitMessageGenerator, HeuristicMessageGenerator
+from compaction import get_token_budget
+from daemon import DaemonError, daemon_available, request_commit_message
+from git_utils import collect_git_context
+from hedging import DEFAULT_HEDGE_DELAY, HedgedAdapter
+from hierarchical import get_patch_token_budget
+from importance import ImportanceMatcher
+from language_model_factory import LOCAL_PROVIDERS, LanguageModelFactory
+from message_cache import MessageCache
+from resilience import CircuitBreaker, get_deadline_seconds
+from schemas import FileStat, GitContext
+from speculative import read_speculative_message
+from staged import collect_staged_changes
+from summary_cache import BlobSummaryCache
+from telemetry import TelemetryLedger, recent_stats
+from timing import Profile, emit_profile, profiling, span, timing_destination
 
-load_dotenv()
+DEFAULT_PROVIDER = 'cohere'
 
-def get_diff() -> str:
-    """Get the staged diff for commit message generation."""
+_environment_loaded = False
+_git_context: Optional[GitContext] = None
+_git_context_loaded = False
+_provider: Optional[str] = None
+
+
+class GenerationError(RuntimeError):
+    """Raised when a commit message cannot be generated; the CLI wrappers print it and exit."""
+
+
+def load_environment() -> None:
+    """Load variables from .env once, importing python-dotenv only when needed."""
+    global _environment_loaded
+    if _environment_loaded:
+        return
+    _environment_loaded = True
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def get_git_context(refresh: bool = False) -> Optional[GitContext]:
+    """Get the repository root, git directory, branch and ignore files, collected once per process."""
+    global _git_context, _git_context_loaded
+    if refresh or not _git_context_loaded:
+        with span('git_context'):
+            _git_context = collect_git_context()
+        _git_context_loaded = True
+    return _git_context
+
+
+def get_git_dir() -> Optional[str]:
+    context = get_git_context()
+    return context['git_dir'] if context else None
+
+
+def get_importance_matcher(repo_root: Optional[str] = None) -> ImportanceMatcher:
+    """Get a matcher honouring the repository's nested .gitignore files, info/exclude and .aicommitignore."""
+    if repo_root is not None:
+        with span('load_ignore_rules'):
+            return ImportanceMatcher.from_repo(repo_root, get_git_dir())
+    context = get_git_context()
+    with span('load_ignore_rules'):
+        if context is None:
+            return ImportanceMatcher()
+        return ImportanceMatcher.from_repo(context['repo_root'], context['git_dir'], context['gitignore_dirs'])
+
+
+def read_staged_changes(token_budget: int, gitignore_content: Optional[str] = None, importance: Optional[ImportanceMatcher] = None,
+                        use_cache: bool = True) -> Tuple[str, List[FileStat]]:
+    """Get exact stats for all staged files and a patch sized to the prompt budget.
+
+    With use_cache, per-file summaries of unchanged blobs come from the blob summary cache.
+    The patch is read for every map-reduce group when that mode is enabled.
+    Raises GenerationError when git fails or nothing is staged.
+    """
+    generator = CommitMessageGenerator(None, importance=importance)
+    gitignore_spec = generator.get_gitignore_spec(gitignore_content) if gitignore_content else None
     try:
-        diff = subprocess.check_output(['git', 'diff', '--cached'], text=True).strip()
-        if not diff:
-            print("Error: No staged changes detected. Please stage files before committing.", file=sys.stderr)
-            sys.exit(1)
-        return diff
+        with span('get_diff') as stats:
+            diff, file_stats = collect_staged_changes(
+                get_patch_token_budget(token_budget), lambda filename: generator.is_important_file(filename, gitignore_spec),
+                get_summary_cache() if use_cache else None,
+            )
+            stats['files'] = len(file_stats)
+            stats['diff_bytes'] = len(diff.encode('utf-8'))
     except subprocess.CalledProcessError as e:
-        print(f"Error getting git diff: {e}", file=sys.stderr)
-        sys.exit(1)
-    except FileNotFoundError:
-        print("Error: Git is not installed or not in PATH.", file=sys.stderr)
+        raise GenerationError(f"Error getting git diff: {e}") from e
+    except FileNotFoundError as e:
+        raise GenerationError("Error: Git is not installed or not in PATH.") from e
+
+    if not file_stats:
+        raise GenerationError("Error: No staged changes detected. Please stage files before committing.")
+    return diff, file_stats
+
+
+def get_staged_changes(token_budget: int, gitignore_content: Optional[str] = None, importance: Optional[ImportanceMatcher] = None,
+                       use_cache: bool = True) -> Tuple[str, List[FileStat]]:
+    """read_staged_changes for the CLI: prints the error and exits instead of raising."""
+    try:
+        return read_staged_changes(token_budget, gitignore_content, importance, use_cache)
+    except GenerationError as e:
+        print(e, file=sys.stderr)
         sys.exit(1)
 
 
 def get_branch_name() -> Optional[str]:
     """Get the current branch name."""
-    try:
-        branch = subprocess.check_output(['git', 'branch', '--show-current'], text=True).strip()
-        return branch if branch else None
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return None
+    context = get_git_context()
+    return context['branch_name'] if context else None
 
 
 def get_gitignore_content() -> Optional[str]:
-    """Get the content of .gitignore file if it exists."""
-    try:
-        if os.path.exists('.gitignore'):
-            with open('.gitignore', 'r', encoding='utf-8') as f:
-                return f.read()
-    except (IOError, UnicodeDecodeError):
-        pass
-    return None
+    """Get the content of the .gitignore file at the repository root if it exists."""
+    context = get_git_context()
+    return context['gitignore_content'] if context else None
 
 
 def extract_ticket_number(branch_name: Optional[str]) -> Optional[str]:
@@ -65,44 +141,328 @@ def extract_ticket_number(branch_name: Optional[str]) -> Optional[str]:
     return None
 
 
-def generate_commit_message(diff: str, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, gitignore_content: Optional[str] = None) -> str:
-    """Generate a commit message using an AI model."""
-    api_key = os.getenv('LANGUAGE_MODEL_API_KEY')
-    if not api_key:
-        print("Error: LANGUAGE_MODEL_API_KEY environment variable is not set.", file=sys.stderr)
-        sys.exit(1)
-    
+def get_message_cache() -> Optional[MessageCache]:
+    """Get the commit message cache stored under the repository's git directory."""
+    git_dir = get_git_dir()
+    return MessageCache.for_git_dir(git_dir) if git_dir else None
+
+
+def get_summary_cache() -> Optional[BlobSummaryCache]:
+    """Get the per-blob diff summary cache stored under the repository's git directory."""
+    git_dir = get_git_dir()
+    return BlobSummaryCache.for_git_dir(git_dir) if git_dir else None
+
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """Get the provider circuit breaker whose state is stored under the repository's git directory."""
+    git_dir = get_git_dir()
+    return CircuitBreaker.for_git_dir(git_dir) if git_dir else None
+
+
+def get_telemetry_ledger() -> Optional[TelemetryLedger]:
+    """Get the provider request ledger stored under the repository's git directory."""
+    git_dir = get_git_dir()
+    return TelemetryLedger.for_git_dir(git_dir) if git_dir else None
+
+
+def get_candidate_providers() -> List[str]:
+    """Providers to route between from LANGUAGE_MODEL_PROVIDERS (comma-separated), else LANGUAGE_MODEL_PROVIDER."""
+    providers = [name.strip() for name in os.getenv('LANGUAGE_MODEL_PROVIDERS', '').split(',') if name.strip()]
+    return providers or [os.getenv('LANGUAGE_MODEL_PROVIDER', DEFAULT_PROVIDER)]
+
+
+def get_provider(refresh: bool = False) -> str:
+    """Get the provider for this run, chosen once per process.
+
+    With several candidates in LANGUAGE_MODEL_PROVIDERS, the factory's routing
+    policy picks the one with the best recent latency in the telemetry ledger,
+    skipping providers without credentials, with an open circuit breaker or
+    above LANGUAGE_MODEL_MAX_COST (USD per million prompt tokens).
+    """
+    global _provider
+    if _provider is not None and not refresh:
+        return _provider
+    candidates = get_candidate_providers()
+    if len(candidates) == 1:
+        _provider = candidates[0]
+        return _provider
+
+    with span('route_provider') as stats:
+        candidates = [provider for provider in candidates if has_credentials(provider)] or candidates
+        breaker = get_circuit_breaker()
+        if breaker is not None:
+            candidates = [provider for provider in candidates if breaker.allow(provider)] or candidates
+        ledger = get_telemetry_ledger()
+        provider_stats = recent_stats(ledger.read()) if ledger is not None else {}
+        max_cost = os.getenv('LANGUAGE_MODEL_MAX_COST')
+        models = {provider: get_model(provider) for provider in candidates}
+        try:
+            _provider = LanguageModelFactory.route(candidates, provider_stats, float(max_cost) if max_cost else None, models)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        stats['provider'] = _provider
+    return _provider
+
+
+def get_api_key(provider: str) -> Optional[str]:
+    """Get the API key for a provider, preferring <PROVIDER>_API_KEY over LANGUAGE_MODEL_API_KEY."""
+    return os.getenv(f'{provider.upper()}_API_KEY') or os.getenv('LANGUAGE_MODEL_API_KEY')
+
+
+def get_base_url(provider: str) -> Optional[str]:
+    """Get the API base URL override for a provider from <PROVIDER>_BASE_URL, e.g. to use a local mock server."""
+    return os.getenv(f'{provider.upper()}_BASE_URL') or None
+
+
+def get_adapter_options(provider: str) -> Dict[str, Any]:
+    """Model, max_tokens and HTTP timeouts for a provider's adapter; unset values are left to the adapter.
+
+    Read from <PROVIDER>_MODEL and <PROVIDER>_MAX_TOKENS (falling back to
+    LANGUAGE_MODEL_MAX_TOKENS), and LANGUAGE_MODEL_CONNECT_TIMEOUT and
+    LANGUAGE_MODEL_READ_TIMEOUT in seconds.
+    """
+    max_tokens = os.getenv(f'{provider.upper()}_MAX_TOKENS') or os.getenv('LANGUAGE_MODEL_MAX_TOKENS')
+    connect_timeout = os.getenv('LANGUAGE_MODEL_CONNECT_TIMEOUT')
+    read_timeout = os.getenv('LANGUAGE_MODEL_READ_TIMEOUT')
+    return {
+        'model': os.getenv(f'{provider.upper()}_MODEL') or None,
+        'max_tokens': int(max_tokens) if max_tokens else None,
+        'connect_timeout': float(connect_timeout) if connect_timeout else None,
+        'read_timeout': float(read_timeout) if read_timeout else None,
+    }
+
+
+def get_model(provider: str) -> Optional[str]:
+    """The model provider's adapter will use: <PROVIDER>_MODEL, else the adapter's default."""
+    return get_adapter_options(provider)['model'] or LanguageModelFactory.get_default_model(provider)
+
+
+def get_hedge_provider() -> Optional[str]:
+    return os.getenv('LANGUAGE_MODEL_HEDGE_PROVIDER') or None
+
+
+def get_prompt_token_budget(provider: str) -> int:
+    """Prompt token budget of provider's model, the same budget the generator trims the prompt to.
+
+    When requests are hedged, the smaller of the two providers' budgets.
+    """
+    providers = [provider]
+    hedge_provider = get_hedge_provider()
+    if hedge_provider and hedge_provider not in LOCAL_PROVIDERS:
+        providers.append(hedge_provider)
+    return min(get_token_budget(name, get_model(name)) for name in providers)
+
+
+def has_credentials(provider: str) -> bool:
+    """Whether provider has an API key configured or needs none, like the offline adapters and local providers."""
+    if provider in LOCAL_PROVIDERS or get_api_key(provider):
+        return True
+    try:
+        return not LanguageModelFactory.get_adapter_class(provider).requires_api_key
+    except (ValueError, ImportError):
+        return False
+
+
+def create_adapter(provider: str) -> LanguageModelAdapter:
+    """Create the adapter for provider, hedged with LANGUAGE_MODEL_HEDGE_PROVIDER if configured.
+
+    With LANGUAGE_MODEL_RECORD_FILE set, every prompt and response is also
+    recorded there for later replay with the "replay" provider. LOCAL_PROVIDERS
+    have no adapter; use HeuristicMessageGenerator for them.
+    """
+    hedge_provider = get_hedge_provider()
+    if hedge_provider in LOCAL_PROVIDERS:
+        raise ValueError(f"The {hedge_provider} provider does not send prompts, so it cannot hedge requests; "
+                         "unset LANGUAGE_MODEL_HEDGE_PROVIDER or choose a prompt-based provider")
+    adapter = LanguageModelFactory.create_adapter(provider, get_api_key(provider) or '', get_base_url(provider),
+                                                  **get_adapter_options(provider))
+
+    if hedge_provider and hedge_provider != provider:
+        if not has_credentials(hedge_provider):
+            raise ValueError(f"No API key configured for hedge provider {hedge_provider}")
+        hedge_adapter = LanguageModelFactory.create_adapter(
+            hedge_provider, get_api_key(hedge_provider) or '', get_base_url(hedge_provider),
+            **get_adapter_options(hedge_provider)
+        )
+        delay = float(os.getenv('LANGUAGE_MODEL_HEDGE_DELAY', DEFAULT_HEDGE_DELAY))
+        adapter = HedgedAdapter([adapter, hedge_adapter], delay)
+
+    record_file = os.getenv('LANGUAGE_MODEL_RECORD_FILE')
+    if record_file:
+        from adapters.replay import ReplayAdapter
+        adapter = ReplayAdapter(path=record_file, inner=adapter)
+    return adapter
+
+
+def generate_with_daemon(diff: str, branch_name: Optional[str], ticket_number: Optional[str], gitignore_content: Optional[str], provider: str, use_cache: bool, file_stats: Optional[List[FileStat]] = None, deadline: Optional[float] = None) -> Optional[str]:
+    """Ask a running daemon for the commit message; None means generate in-process."""
+    if not daemon_available():
+        return None
+    remaining = None
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+    try:
+        context = get_git_context()
+        git_dir, repo_root = (context['git_dir'], context['repo_root']) if context else (None, None)
+        with span('daemon_request'):
+            return request_commit_message(diff, branch_name, ticket_number, gitignore_content, provider, use_cache, git_dir, file_stats, repo_root, deadline_seconds=remaining)
+    except (DaemonError, OSError, ValueError) as e:
+        print(f"Warning: daemon request failed, generating in-process: {e}", file=sys.stderr)
+        return None
+
+
+def generate_message(diff: str, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, gitignore_content: Optional[str] = None, use_cache: bool = True, use_daemon: bool = True, file_stats: Optional[List[FileStat]] = None, importance: Optional[ImportanceMatcher] = None, deadline: Optional[float] = None, on_text: Optional[Callable[[str], None]] = None) -> str:
+    """Generate a commit message using an AI model, raising on failure.
+
+    With a deadline (a time.monotonic() timestamp), provider requests are
+    retried until it passes and a locally built message is returned instead
+    of failing. With on_text, the provider's answer is streamed to it.
+    Long-running callers such as the speculative watcher use this directly.
+    """
+    load_environment()
+    provider = get_provider()
+    if provider in LOCAL_PROVIDERS:
+        generator = HeuristicMessageGenerator(importance=importance or get_importance_matcher())
+        return generator.generate_commit_message(diff, branch_name, ticket_number, gitignore_content, file_stats)
+
+    if use_daemon:
+        message = generate_with_daemon(diff, branch_name, ticket_number, gitignore_content, provider, use_cache, file_stats, deadline)
+        if message is not None:
+            return message
+
+    if not has_credentials(provider):
+        raise GenerationError("Error: LANGUAGE_MODEL_API_KEY environment variable is not set.")
+
+    adapter = None
     try:
-        adapter = LanguageModelFactory.create_adapter('cohere', api_key)
-        generator = CommitMessageGenerator(adapter)
-        return generator.generate_commit_message(diff, branch_name, ticket_number, gitignore_content)
+        adapter = create_adapter(provider)
+        cache = get_message_cache() if use_cache else None
+        breaker = get_circuit_breaker() if deadline is not None else None
+        generator = CommitMessageGenerator(adapter, cache, importance=importance or get_importance_matcher(),
+                                           deadline=deadline, breaker=breaker, ledger=get_telemetry_ledger())
+        return generator.generate_commit_message(diff, branch_name, ticket_number, gitignore_content, file_stats, on_text)
     except Exception as e:
-        print(f"Error creating language model adapter: {e}", file=sys.stderr)
+        raise GenerationError(f"Error creating language model adapter: {e}") from e
+    finally:
+        if adapter is not None:
+            adapter.close()
+
+
+def generate_commit_message(diff: str, branch_name: Optional[str] = None, ticket_number: Optional[str] = None, gitignore_content: Optional[str] = None, use_cache: bool = True, use_daemon: bool = True, file_stats: Optional[List[FileStat]] = None, importance: Optional[ImportanceMatcher] = None, deadline: Optional[float] = None, on_text: Optional[Callable[[str], None]] = None) -> str:
+    """generate_message for the CLI: prints the error and exits instead of raising."""
+    try:
+        return generate_message(diff, branch_name, ticket_number, gitignore_content, use_cache, use_daemon, file_stats,
+                                importance, deadline, on_text)
+    except GenerationError as e:
+        print(e, file=sys.stderr)
         sys.exit(1)
 
 
-def main():
+def generate_speculative_message() -> str:
+    """Generate a message for the staged changes without a deadline, for the speculative worker.
+
+    Raises GenerationError rather than exiting, so a watcher survives a failed provider call.
+    """
+    load_environment()
+    # The watcher calls this repeatedly in one process, across branch switches
+    get_git_context(refresh=True)
+    provider = get_provider()
+    gitignore_content = get_gitignore_content()
+    importance = get_importance_matcher()
+    diff, file_stats = read_staged_changes(get_prompt_token_budget(provider), gitignore_content, importance)
+    branch_name = get_branch_name()
+    return generate_message(diff, branch_name, extract_ticket_number(branch_name), gitignore_content,
+                            file_stats=file_stats, importance=importance)
+
+
+class MessageFileWriter:
+    """Writes a streamed message to the commit message file as each line completes.
+
+    The subject line lands in the file as soon as it has arrived, so an
+    interrupted hook still leaves a usable message behind.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._text = ''
+        self._written = 0
+
+    def __call__(self, chunk: str) -> None:
+        self._text += chunk
+        end = self._text.rfind('\n')
+        if end > self._written and self._text[:end].strip():
+            self.write(self._text[:end].rstrip())
+            self._written = end
+
+    def write(self, message: str) -> None:
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(message)
+
+
+def profile_pipeline(use_cache: bool = True, send: bool = True) -> Profile:
+    """Run the pipeline on the staged changes in-process, recording every stage."""
+    load_environment()
+    provider = get_provider()
+    profile = Profile()
+    with profiling(profile):
+        gitignore_content = get_gitignore_content()
+        importance = get_importance_matcher()
+        diff, file_stats = get_staged_changes(get_prompt_token_budget(provider), gitignore_content, importance, use_cache)
+        branch_name = get_branch_name()
+        ticket_number = extract_ticket_number(branch_name)
+
+        if send:
+            # Skip the daemon so the provider request is timed as its own stage
+            generate_commit_message(diff, branch_name, ticket_number, gitignore_content, use_cache,
+                                    use_daemon=False, file_stats=file_stats, importance=importance)
+        else:
+            generator = CommitMessageGenerator(None, token_budget=get_prompt_token_budget(provider), importance=importance)
+            generator.build_prompt(diff, branch_name, ticket_number, gitignore_content, file_stats)
+    return profile
+
+
+def main(use_cache: bool = True):
     """Main function to generate and write the commit message."""
     if len(sys.argv) < 2:
         print("Error: Commit message file path is missing.", file=sys.stderr)
         sys.exit(1)
 
+    load_environment()
     commit_msg_filepath = sys.argv[1]
     print(f"Writing commit message to {commit_msg_filepath}")
+    deadline_seconds = get_deadline_seconds()
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
     
+    destination = timing_destination()
+    profile = Profile() if destination else None
     try:
-        # Get all necessary information
-        diff = get_diff()
-        branch_name = get_branch_name()
-        ticket_number = extract_ticket_number(branch_name)
-        gitignore_content = get_gitignore_content()
-        
-        # Generate commit message
-        commit_message = generate_commit_message(diff, branch_name, ticket_number, gitignore_content)
+        with profiling(profile):
+            # Get all necessary information
+            provider = get_provider()
+            branch_name = get_branch_name()
+            writer = MessageFileWriter(commit_msg_filepath)
+
+            # Use a message generated in the background for exactly this index if there is one
+            commit_message = None
+            if use_cache:
+                with span('speculative_lookup') as stats:
+                    commit_message = read_speculative_message(get_git_dir(), provider, branch_name)
+                    stats['hit'] = commit_message is not None
+
+            if commit_message is None:
+                gitignore_content = get_gitignore_content()
+                importance = get_importance_matcher()
+                diff, file_stats = get_staged_changes(get_prompt_token_budget(provider), gitignore_content, importance, use_cache)
+                ticket_number = extract_ticket_number(branch_name)
+
+                # Generate commit message, streaming completed lines into the file
+                commit_message = generate_commit_message(diff, branch_name, ticket_number, gitignore_content, use_cache, file_stats=file_stats, importance=importance, deadline=deadline, on_text=writer)
 
-        # Write the commit message to the file
-        with open(commit_msg_filepath, 'w', encoding='utf-8') as f:
-            f.write(commit_message)
+            # Write the final commit message to the file
+            writer.write(commit_message)
             
         print("Commit message generated successfully!")
 
@@ -111,14 +471,20 @@ def main():
         
         # Log error to file if possible
         try:
-            os.makedirs(".git/hooks", exist_ok=True)
-            with open(".git/hooks/error.log", "a", encoding='utf-8') as log_file:
-                log_file.write(error_msg + "\n")
+            git_dir = get_git_dir()
+            if git_dir:
+                hooks_dir = os.path.join(git_dir, 'hooks')
+                os.makedirs(hooks_dir, exist_ok=True)
+                with open(os.path.join(hooks_dir, 'error.log'), "a", encoding='utf-8') as log_file:
+                    log_file.write(error_msg + "\n")
         except Exception:
             pass  # If we can't log, don't fail completely
             
         print(error_msg, file=sys.stderr)
         sys.exit(1)
+    finally:
+        if profile is not None:
+            emit_profile(profile, destination)
 
 
 if __name__ == "__main__":
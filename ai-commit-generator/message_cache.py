@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_AGE = 14 * 24 * 60 * 60
+CACHE_DIRNAME = os.path.join('ai-commit-generator', 'cache')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize line endings and trailing whitespace so equivalent prompts share a key."""
+    lines = prompt.replace('\r\n', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+class MessageCache:
+    """Content-addressed store of generated commit messages.
+
+    Entries live as one file per key, written atomically via rename so several
+    hooks can share the directory. Last access is tracked through the file's
+    mtime, which drives both LRU ordering and age-based expiry.
+    """
+
+    def __init__(self, directory: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    @classmethod
+    def for_git_dir(cls, git_dir: str) -> 'MessageCache':
+        return cls(os.path.join(git_dir, CACHE_DIRNAME))
+
+    @staticmethod
+    def make_key(prompt: str, provider: str, model: str) -> str:
+        digest = hashlib.sha256()
+        for part in (provider, model, normalize_prompt(prompt)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached message for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                self._remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                message = json.load(f)['message']
+            os.utime(path)
+            return message
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, message: str, provider: str = '', model: str = '') -> None:
+        """Store a message; failures are ignored since the cache is best-effort."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'provider': provider, 'model': model, 'created': time.time(),
+                               'message': message}, f)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+            self.evict()
+        except OSError:
+            pass
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.json') or name.startswith('.tmp-'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones until within limits."""
+        now = time.time()
+        entries = []
+        for mtime, size, path in self._entries():
+            if now - mtime > self.max_age:
+                self._remove(path)
+            else:
+                entries.append((mtime, size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            total_bytes -= size
+            self._remove(path)
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Another hook may have removed it already
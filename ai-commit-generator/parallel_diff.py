@@ -0,0 +1,91 @@
+import os
+import sys
+from typing import List, Optional
+from columnar import ColumnarChanges
+from diff_parser import DiffInput, parse_diff
+
+# Below this many characters starting workers costs more than it saves
+DEFAULT_PARALLEL_THRESHOLD = 16 * 1024 * 1024
+# More chunks than workers, so one slow chunk doesn't leave the other cores idle
+CHUNKS_PER_WORKER = 2
+FILE_HEADER = '\ndiff --git '
+
+
+def get_worker_count() -> int:
+    """Workers for summarizing huge diffs, from AI_COMMIT_WORKERS; defaults to the usable cores."""
+    value = os.getenv('AI_COMMIT_WORKERS')
+    if value:
+        return max(1, int(value))
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_parallel_threshold() -> int:
+    """Diff size in characters from which summarizing goes parallel, from AI_COMMIT_PARALLEL_THRESHOLD."""
+    value = os.getenv('AI_COMMIT_PARALLEL_THRESHOLD')
+    return int(value) if value else DEFAULT_PARALLEL_THRESHOLD
+
+
+def is_free_threaded() -> bool:
+    """True on free-threaded builds with the GIL actually disabled."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def split_diff(diff: str, chunks: int) -> List[str]:
+    """Split diff text at 'diff --git' lines into at most chunks pieces of similar size.
+
+    Every file section stays whole, so each piece can be parsed on its own.
+    """
+    target = max(1, len(diff) // max(1, chunks))
+    pieces: List[str] = []
+    start = 0
+    while len(pieces) < chunks - 1:
+        boundary = diff.find(FILE_HEADER, start + target)
+        if boundary < 0:
+            break
+        pieces.append(diff[start:boundary + 1])
+        start = boundary + 1
+    pieces.append(diff[start:])
+    return pieces
+
+
+def parse_diff_parallel(diff: DiffInput, workers: Optional[int] = None,
+                        threshold: Optional[int] = None) -> ColumnarChanges:
+    """parse_diff spread over several cores for very large diffs.
+
+    The diff is split on file boundaries and the chunks are parsed in a
+    process pool, or in threads on free-threaded builds. Results are merged
+    in diff order, so the summary is identical to parse_diff's. Streams,
+    diffs below the threshold and single-core machines take the serial path.
+    """
+    if not isinstance(diff, (str, bytes)):
+        return parse_diff(diff)
+    workers = get_worker_count() if workers is None else workers
+    threshold = get_parallel_threshold() if threshold is None else threshold
+    if workers < 2 or len(diff) < threshold:
+        return parse_diff(diff)
+
+    if isinstance(diff, bytes):
+        diff = diff.decode('utf-8', errors='replace')
+    chunks = split_diff(diff, workers * CHUNKS_PER_WORKER)
+    if len(chunks) < 2:
+        return parse_diff(diff)
+
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    executor_class = ThreadPoolExecutor if is_free_threaded() else ProcessPoolExecutor
+    try:
+        with executor_class(max_workers=min(workers, len(chunks))) as executor:
+            results = list(executor.map(parse_diff, chunks))
+    except (OSError, BrokenProcessPool):
+        # No usable process pool (e.g. restricted sandboxes); still summarize
+        return parse_diff(diff)
+
+    changes = results[0]
+    for part in results[1:]:
+        changes.extend(part)
+    return changes
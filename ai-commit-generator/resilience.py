@@ -0,0 +1,284 @@
+import contextvars
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from adapters.adapter import LanguageModelAdapter, run_async
+from hedging import breaker_per_provider, is_valid_message, provider_adapters
+
+DEFAULT_DEADLINE = 5.0
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 1.0
+# An attempt is not started with less time than this left before the deadline
+MIN_ATTEMPT_TIME = 0.25
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 5 * 60
+CIRCUIT_FILENAME = os.path.join('ai-commit-generator', 'circuit.json')
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when no answer arrived before the deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a provider is skipped because its circuit breaker is open."""
+
+
+def get_deadline_seconds() -> Optional[float]:
+    """End-to-end hook deadline from AI_COMMIT_DEADLINE; 0 disables it."""
+    value = os.getenv('AI_COMMIT_DEADLINE')
+    seconds = float(value) if value else DEFAULT_DEADLINE
+    return seconds if seconds > 0 else None
+
+
+def get_retries() -> int:
+    return int(os.getenv('AI_COMMIT_RETRIES', DEFAULT_RETRIES))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number attempt (starting at 1)."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Per-provider failure counts persisted in the git directory.
+
+    After failure_threshold failed requests in a row the provider is skipped
+    for cooldown seconds, so later commits don't each wait for the full
+    deadline. The first request after the cool-down is a trial: success
+    closes the circuit, failure opens it again. Updates are best-effort.
+    """
+
+    def __init__(self, path: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown: float = DEFAULT_COOLDOWN):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+    @classmethod
+    def for_git_dir(cls, git_dir: str) -> 'CircuitBreaker':
+        return cls(os.path.join(git_dir, CIRCUIT_FILENAME))
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, state: Dict[str, Dict[str, Any]]) -> None:
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError:
+            pass
+
+    def allow(self, key: str) -> bool:
+        entry = self._load().get(key)
+        return not entry or entry.get('open_until', 0) <= time.time()
+
+    def record_success(self, key: str) -> None:
+        state = self._load()
+        if key in state:
+            del state[key]
+            self._save(state)
+
+    def record_failure(self, key: str) -> None:
+        state = self._load()
+        entry = state.setdefault(key, {'failures': 0, 'open_until': 0})
+        entry['failures'] += 1
+        if entry['failures'] >= self.failure_threshold:
+            entry['open_until'] = time.time() + self.cooldown
+        self._save(state)
+
+
+def _is_hedged(adapter: LanguageModelAdapter, breaker: CircuitBreaker) -> bool:
+    """Whether adapter races several providers, each keeping its own circuit.
+
+    Raises CircuitOpenError when every one of them is skipped.
+    """
+    providers = provider_adapters(adapter)
+    if len(providers) < 2:
+        return False
+    if not any(breaker.allow(inner.provider) for inner in providers):
+        raise CircuitOpenError(f"{adapter.provider} are all skipped after repeated failures")
+    return True
+
+
+async def send_with_retries(adapter: LanguageModelAdapter, prompt: str, deadline: float,
+                            retries: int = DEFAULT_RETRIES) -> str:
+    """Send prompt, retrying failures and empty answers with jittered backoff until deadline.
+
+    deadline is a time.monotonic() timestamp. Each attempt is cancelled when
+    the deadline passes.
+    """
+    import asyncio
+
+    last_error: Optional[BaseException] = None
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff_delay(attempt)
+            if deadline - time.monotonic() - delay < MIN_ATTEMPT_TIME:
+                break
+            await asyncio.sleep(delay)
+
+        remaining = deadline - time.monotonic()
+        if remaining < MIN_ATTEMPT_TIME:
+            break
+        try:
+            message = await asyncio.wait_for(adapter.send_message_async(prompt), remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{adapter.provider} did not answer before the deadline") from None
+        except Exception as e:
+            last_error = e
+            continue
+        if is_valid_message(message):
+            return message
+        last_error = ValueError("Language model returned an empty message")
+
+    if last_error is not None:
+        raise last_error
+    raise DeadlineExceeded(f"No time left to query {adapter.provider}")
+
+
+async def send_with_breaker(adapter: LanguageModelAdapter, prompt: str, deadline: float,
+                            retries: Optional[int] = None, breaker: Optional[CircuitBreaker] = None) -> str:
+    """send_with_retries that also consults and updates a circuit breaker.
+
+    A hedged adapter's providers are each tracked under their own name, so
+    one failing provider opens its circuit without taking the others along.
+    """
+    if breaker is not None and _is_hedged(adapter, breaker):
+        with breaker_per_provider(breaker):
+            return await send_with_breaker(adapter, prompt, deadline, retries)
+    key = adapter.provider
+    if breaker is not None and not breaker.allow(key):
+        raise CircuitOpenError(f"{key} is skipped after repeated failures")
+
+    try:
+        message = await send_with_retries(adapter, prompt, deadline, get_retries() if retries is None else retries)
+    except Exception:
+        if breaker is not None:
+            breaker.record_failure(key)
+        raise
+    if breaker is not None:
+        breaker.record_success(key)
+    return message
+
+
+def send_with_deadline(adapter: LanguageModelAdapter, prompt: str, deadline: float,
+                       retries: Optional[int] = None, breaker: Optional[CircuitBreaker] = None) -> str:
+    """Blocking send_with_breaker."""
+    return run_async(send_with_breaker(adapter, prompt, deadline, retries, breaker))
+
+
+_STREAM_END = object()
+
+
+def _stream_in_thread(adapter: LanguageModelAdapter, prompt: str) -> 'queue.Queue':
+    """Run adapter.stream_message in a daemon thread, so an abandoned stream never blocks exit.
+
+    The thread runs in a copy of the caller's context, like run_async.
+    """
+    chunks: 'queue.Queue' = queue.Queue()
+
+    def run() -> None:
+        try:
+            for chunk in adapter.stream_message(prompt):
+                chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        else:
+            chunks.put(_STREAM_END)
+
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+    return chunks
+
+
+def cut_off(text: str) -> Optional[str]:
+    """The complete lines of a partially received message, or None while the subject is unfinished."""
+    end = text.rfind('\n')
+    if end < 0 or not is_valid_message(text[:end]):
+        return None
+    return text[:end].rstrip()
+
+
+def stream_with_deadline(adapter: LanguageModelAdapter, prompt: str, deadline: float,
+                         on_text: Callable[[str], None], retries: Optional[int] = None,
+                         breaker: Optional[CircuitBreaker] = None) -> Tuple[str, bool]:
+    """Stream the answer to on_text chunk by chunk, stopping at the deadline.
+
+    Returns the message and whether it arrived complete. Failures before the
+    first chunk are retried like send_with_deadline. Once text is arriving,
+    the deadline or an error ends the message after its last complete line;
+    without a complete subject line they raise.
+    """
+    if breaker is not None and _is_hedged(adapter, breaker):
+        with breaker_per_provider(breaker):
+            return stream_with_deadline(adapter, prompt, deadline, on_text, retries)
+    key = adapter.provider
+    if breaker is not None and not breaker.allow(key):
+        raise CircuitOpenError(f"{key} is skipped after repeated failures")
+    retries = get_retries() if retries is None else retries
+
+    received: List[str] = []
+    last_error: Optional[BaseException] = None
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff_delay(attempt)
+            if deadline - time.monotonic() - delay < MIN_ATTEMPT_TIME:
+                break
+            time.sleep(delay)
+        if deadline - time.monotonic() < MIN_ATTEMPT_TIME:
+            break
+
+        chunks = _stream_in_thread(adapter, prompt)
+        while True:
+            try:
+                item = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = DeadlineExceeded(f"{adapter.provider} did not finish before the deadline")
+            if item is _STREAM_END:
+                message = ''.join(received).strip()
+                if is_valid_message(message):
+                    if breaker is not None:
+                        breaker.record_success(key)
+                    return message, True
+                last_error = ValueError("Language model returned an empty message")
+                break
+            if isinstance(item, BaseException):
+                partial = cut_off(''.join(received))
+                if partial is not None:
+                    # Keep the slow or broken tail out of the commit, but not the lines before it
+                    if breaker is not None:
+                        breaker.record_success(key)
+                    return partial, False
+                last_error = item
+                break
+            received.append(item)
+            on_text(item)
+
+        if received or isinstance(last_error, DeadlineExceeded):
+            # Text already went to on_text, so a retry can't start over cleanly
+            break
+
+    if breaker is not None:
+        breaker.record_failure(key)
+    if last_error is not None:
+        raise last_error
+    raise DeadlineExceeded(f"No time left to query {adapter.provider}")
@@ -1,4 +1,4 @@
-from typing import Dict, List, TypedDict, Set
+from typing import Dict, List, Optional, TypedDict, Set
 
 class FileChangeSummary(TypedDict):
     additions: int
@@ -14,3 +14,60 @@ class ChangeSummary(TypedDict):
     file_types: Set[str]
     important_files: List[str]
     key_changes: Dict[str, List[str]]
+
+
+class _FileStatFields(TypedDict):
+    path: str
+    status: str
+    additions: int
+    deletions: int
+    binary: bool
+
+
+class FileStat(_FileStatFields, total=False):
+    # Key change lines; present when the stats came from the blob summary cache
+    important_changes: List[str]
+
+
+class RawChange(TypedDict):
+    old_blob: str
+    new_blob: str
+    status: str
+    path: str
+    old_path: Optional[str]
+
+
+class GitContext(TypedDict):
+    repo_root: str
+    git_dir: str
+    branch_name: Optional[str]
+    # Contents of the .gitignore at the repository root
+    gitignore_content: Optional[str]
+    # Directories (relative to repo_root) holding a tracked .gitignore
+    gitignore_dirs: List[str]
+
+
+class FileGroup(TypedDict):
+    name: str
+    files: List[str]
+    additions: int
+    deletions: int
+
+
+class TelemetryEntry(TypedDict):
+    timestamp: float
+    provider: str
+    model: str
+    prompt_tokens: int
+    latency_ms: float
+    # ok, error, timeout or cutoff
+    outcome: str
+
+
+class ProviderStats(TypedDict):
+    requests: int
+    errors: int
+    error_rate: float
+    # Over successful requests; None without any
+    p50_ms: Optional[float]
+    p95_ms: Optional[float]
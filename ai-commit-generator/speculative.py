@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Speculative commit messages generated in the background while changes are staged.
+
+Run without arguments (e.g. from a post-index-change or pre-commit stage hook)
+to start a detached worker and return immediately; --foreground runs the
+worker in this process and --watch keeps polling the index for changes.
+The worker waits until the index has stopped changing, generates a message
+for it and stores it keyed by the staged tree (`git write-tree`), the branch
+and the provider, so the prepare-commit-msg hook can use it instantly.
+"""
+import argparse
+import hashlib
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from git_utils import get_git_dir, read_head_branch
+from message_cache import MessageCache
+
+DEFAULT_DEBOUNCE = 1.0
+POLL_INTERVAL = 0.5
+MAX_ENTRIES = 32
+SPECULATIVE_DIRNAME = os.path.join('ai-commit-generator', 'speculative')
+LOCK_FILENAME = os.path.join('ai-commit-generator', 'speculate.lock')
+
+
+def get_debounce() -> float:
+    """Seconds the index must stay unchanged before generating, from AI_COMMIT_SPECULATE_DEBOUNCE."""
+    value = os.getenv('AI_COMMIT_SPECULATE_DEBOUNCE')
+    return float(value) if value else DEFAULT_DEBOUNCE
+
+
+def get_store(git_dir: str) -> MessageCache:
+    return MessageCache(os.path.join(git_dir, SPECULATIVE_DIRNAME), max_entries=MAX_ENTRIES)
+
+
+def _git(args) -> Optional[str]:
+    try:
+        output = subprocess.check_output(['git'] + args, text=True, stderr=subprocess.DEVNULL).strip()
+        return output or None
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def get_index_tree() -> Optional[str]:
+    """Tree ID of the staged content, or None with unmerged paths or outside a repository."""
+    return _git(['write-tree'])
+
+
+def has_staged_changes(tree: str) -> bool:
+    return tree != _git(['rev-parse', '-q', '--verify', 'HEAD^{tree}'])
+
+
+def speculation_key(tree: str, branch_name: Optional[str], provider: str) -> str:
+    digest = hashlib.sha256()
+    for part in (tree, branch_name or '', provider):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def read_speculative_message(git_dir: Optional[str], provider: str, branch_name: Optional[str]) -> Optional[str]:
+    """The message generated in the background for the current index, if there is one."""
+    if not git_dir or not os.path.isdir(os.path.join(git_dir, SPECULATIVE_DIRNAME)):
+        return None
+    tree = get_index_tree()
+    if tree is None:
+        return None
+    return get_store(git_dir).get(speculation_key(tree, branch_name, provider))
+
+
+@contextmanager
+def _exclusive(git_dir: str) -> Iterator[bool]:
+    """Hold the speculation lock if nobody else does; yields whether it was acquired."""
+    try:
+        import fcntl
+    except ImportError:
+        yield True
+        return
+    path = os.path.join(git_dir, LOCK_FILENAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def wait_for_stable_index(debounce: float) -> Optional[str]:
+    """Wait until the staged tree stays the same for debounce seconds and return it."""
+    tree = get_index_tree()
+    while tree is not None:
+        time.sleep(debounce)
+        current = get_index_tree()
+        if current == tree:
+            return tree
+        tree = current
+    return None
+
+
+def run_speculation(git_dir: str, debounce: Optional[float] = None) -> Optional[str]:
+    """Generate and store a message for the index once it settles.
+
+    Returns None when another worker is already running; that worker checks
+    the index again after generating, so the latest change is still covered.
+    """
+    from main import generate_speculative_message, get_provider, load_environment
+
+    load_environment()
+    debounce = get_debounce() if debounce is None else debounce
+    store = get_store(git_dir)
+    with _exclusive(git_dir) as acquired:
+        if not acquired:
+            return None
+        while True:
+            tree = wait_for_stable_index(debounce)
+            if tree is None or not has_staged_changes(tree):
+                return None
+            branch_name = read_head_branch(git_dir)
+            provider = get_provider(refresh=True)
+            key = speculation_key(tree, branch_name, provider)
+            message = store.get(key)
+            if message is not None:
+                return message
+            message = generate_speculative_message()
+            # Only keep it if the index didn't move on while the model was answering
+            if get_index_tree() == tree:
+                store.put(key, message, provider)
+                return message
+
+
+def speculate_once(git_dir: str, debounce: Optional[float] = None) -> Optional[str]:
+    """run_speculation, reporting a failure on stderr instead of raising, so a watcher keeps going."""
+    try:
+        return run_speculation(git_dir, debounce)
+    except Exception as e:
+        print(f"Warning: speculative generation failed: {e}", file=sys.stderr)
+    except SystemExit as e:
+        # Shared helpers such as provider routing still exit on configuration errors
+        print(f"Warning: speculative generation stopped with exit status {e.code}", file=sys.stderr)
+    return None
+
+
+def start_speculation(git_dir: str) -> None:
+    """Start a detached worker for the current index and return at once."""
+    # Creating the directory opts the repository in for prepare-commit-msg lookups
+    os.makedirs(os.path.join(git_dir, SPECULATIVE_DIRNAME), exist_ok=True)
+    options = {'start_new_session': True} if os.name == 'posix' else {
+        'creationflags': getattr(subprocess, 'DETACHED_PROCESS', 0) | getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
+    }
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--foreground'],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        close_fds=True,
+        **options,
+    )
+
+
+def watch(git_dir: str, debounce: Optional[float] = None, interval: float = POLL_INTERVAL) -> None:
+    """Poll the index file and speculate whenever it changes; runs until interrupted."""
+    os.makedirs(os.path.join(git_dir, SPECULATIVE_DIRNAME), exist_ok=True)
+    index_path = os.path.join(git_dir, 'index')
+    last_seen = None
+    while True:
+        try:
+            modified = os.stat(index_path).st_mtime_ns
+        except OSError:
+            modified = None
+        if modified != last_seen:
+            speculate_once(git_dir, debounce)
+            # write-tree may have refreshed the index itself
+            try:
+                last_seen = os.stat(index_path).st_mtime_ns
+            except OSError:
+                last_seen = None
+        time.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--foreground', action='store_true', help='run the worker in this process')
+    parser.add_argument('--watch', action='store_true', help='keep watching the index for changes')
+    args = parser.parse_args()
+
+    git_dir = get_git_dir()
+    if not git_dir:
+        print("Error: Not in a git repository", file=sys.stderr)
+        sys.exit(1)
+    if args.watch:
+        try:
+            watch(git_dir)
+        except KeyboardInterrupt:
+            pass
+    elif args.foreground:
+        speculate_once(git_dir)
+    else:
+        start_speculation(git_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+import os
+import subprocess
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from compaction import file_importance
+from diff_parser import parse_diff
+from schemas import FileStat, RawChange
+from summary_cache import BlobSummaryCache
+
+# Raw patch characters read per token of prompt budget; compaction drops
+# context lines, so the raw patch needs to be several times the budget.
+PATCH_CHARS_PER_TOKEN = 32
+# Rough size of one changed line in the patch, used to pick files before streaming.
+AVERAGE_LINE_CHARS = 48
+PATHS_PER_BATCH = 256
+
+
+def _git_z(args: List[str], paths: Optional[List[str]] = None) -> List[str]:
+    if paths is None:
+        output = subprocess.check_output(['git'] + args, stderr=subprocess.DEVNULL)
+        return output.decode('utf-8', errors='replace').split('\0')
+
+    env = dict(os.environ, GIT_LITERAL_PATHSPECS='1')
+    tokens: List[str] = []
+    for start in range(0, len(paths), PATHS_PER_BATCH):
+        output = subprocess.check_output(['git'] + args + ['--'] + paths[start:start + PATHS_PER_BATCH],
+                                         stderr=subprocess.DEVNULL, env=env)
+        tokens.extend(output.decode('utf-8', errors='replace').split('\0'))
+    return tokens
+
+
+def get_numstat(paths: Optional[List[str]] = None) -> List[FileStat]:
+    """Exact per-file line counts from `git diff --cached --numstat -z`.
+
+    Binary files report '-' for both counts and are flagged instead.
+    """
+    tokens = _git_z(['diff', '--cached', '--numstat', '-z'], paths)
+    stats: List[FileStat] = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        i += 1
+        if not token:
+            continue
+        additions, deletions, path = token.split('\t', 2)
+        if not path:
+            # Renames and copies: the old and new paths follow as separate fields
+            path = tokens[i + 1]
+            i += 2
+        binary = additions == '-'
+        stats.append(FileStat(
+            path=path,
+            status='M',
+            additions=0 if binary else int(additions),
+            deletions=0 if binary else int(deletions),
+            binary=binary,
+        ))
+    return stats
+
+
+def get_name_status() -> Dict[str, str]:
+    """Map each staged path to its status letter (A, M, D, R, C, T)."""
+    tokens = _git_z(['diff', '--cached', '--name-status', '-z'])
+    statuses: Dict[str, str] = {}
+    i = 0
+    while i < len(tokens) - 1:
+        status = tokens[i]
+        if not status:
+            i += 1
+            continue
+        if status[0] in ('R', 'C'):
+            statuses[tokens[i + 2]] = status[0]
+            i += 3
+        else:
+            statuses[tokens[i + 1]] = status[0]
+            i += 2
+    return statuses
+
+
+def get_file_stats() -> List[FileStat]:
+    """Per-file counts, binary flags and statuses for the staged changes."""
+    stats = get_numstat()
+    statuses = get_name_status()
+    for stat in stats:
+        stat['status'] = statuses.get(stat['path'], stat['status'])
+    return stats
+
+
+def get_raw_changes() -> List[RawChange]:
+    """Blob IDs, status and paths of every staged file from `git diff --cached --raw -z`.
+
+    Unlike numstat this only compares the index with HEAD and never diffs
+    file contents, so it stays cheap for large staged sets.
+    """
+    tokens = _git_z(['diff', '--cached', '--raw', '-z', '--no-abbrev'])
+    changes: List[RawChange] = []
+    i = 0
+    while i < len(tokens) - 1:
+        header = tokens[i]
+        if not header.startswith(':'):
+            i += 1
+            continue
+        _, _, old_blob, new_blob, status = header[1:].split(' ', 4)
+        if status[0] in ('R', 'C'):
+            old_path, path = tokens[i + 1], tokens[i + 2]
+            i += 3
+        else:
+            old_path, path = None, tokens[i + 1]
+            i += 2
+        changes.append(RawChange(old_blob=old_blob, new_blob=new_blob, status=status[0], path=path, old_path=old_path))
+    return changes
+
+
+def _with_source(path: str, sources: Dict[str, str]) -> List[str]:
+    source = sources.get(path)
+    return [path] if source is None else [source, path]
+
+
+def get_cached_file_stats(cache: BlobSummaryCache, is_important: Optional[Callable[[str], bool]] = None) -> Tuple[List[FileStat], List[RawChange]]:
+    """Per-file stats from the blob summary cache, plus the changes whose key changes aren't cached yet.
+
+    Files whose blob pair isn't cached only get their counts from numstat
+    here, and come back without important_changes; those are taken from
+    the patch streamed for the prompt (see fill_key_changes), so a cold
+    cache doesn't read any file's patch twice. After a one-file edit in an
+    amend loop only that file is looked at again.
+    """
+    changes = get_raw_changes()
+    entries: Dict[str, dict] = {}
+    missing: List[RawChange] = []
+    for change in changes:
+        entry = cache.get(change)
+        if entry is None or (entry['important_changes'] is None and (is_important is None or is_important(change['path']))):
+            missing.append(change)
+        else:
+            entries[change['path']] = entry
+
+    unread: List[RawChange] = []
+    if missing:
+        # Renames need both sides in the pathspec for git to pair them up
+        sources = {change['path']: change['old_path'] for change in missing if change['old_path'] is not None}
+        paths: List[str] = []
+        for change in missing:
+            paths.extend(_with_source(change['path'], sources))
+        fresh = {stat['path']: stat for stat in get_numstat(paths)}
+        for change in missing:
+            stat = fresh.get(change['path'])
+            if stat is None:
+                continue
+            entry = {key: stat[key] for key in ('additions', 'deletions', 'binary')}
+            # None marks key changes that were never read
+            entry['important_changes'] = [] if stat['binary'] else None
+            cache.put(change, entry)
+            entries[change['path']] = entry
+            if not stat['binary'] and (is_important is None or is_important(change['path'])):
+                unread.append(change)
+
+    unread_paths = {change['path'] for change in unread}
+    stats: List[FileStat] = []
+    for change in changes:
+        entry = entries.get(change['path'])
+        if entry is None:
+            continue
+        stat = FileStat(
+            path=change['path'],
+            status=change['status'],
+            additions=entry['additions'],
+            deletions=entry['deletions'],
+            binary=entry['binary'],
+        )
+        if change['path'] not in unread_paths:
+            stat['important_changes'] = entry['important_changes'] or []
+        stats.append(stat)
+    return stats, unread
+
+
+def fill_key_changes(cache: BlobSummaryCache, stats: List[FileStat], unread: List[RawChange], patch: str, char_limit: int) -> None:
+    """Take the key changes get_cached_file_stats left out from the streamed patch and cache them.
+
+    Only files whose whole patch was streamed are cached; the file the patch
+    was cut in keeps its partial key changes for this run only, and files
+    that weren't streamed at all get none.
+    """
+    summaries = parse_diff(patch)
+    cut = summaries.paths[-1] if summaries.paths and len(patch) >= char_limit else None
+    unread_by_path = {change['path']: change for change in unread}
+    for stat in stats:
+        if 'important_changes' in stat:
+            continue
+        path = stat['path']
+        if path not in summaries:
+            stat['important_changes'] = []
+            continue
+        stat['important_changes'] = summaries[path]['important_changes']
+        if path != cut:
+            change = unread_by_path[path]
+            cache.put(change, dict(additions=stat['additions'], deletions=stat['deletions'], binary=False,
+                                   important_changes=stat['important_changes']))
+    cache.save()
+
+
+def select_patch_files(stats: List[FileStat], char_limit: int, is_important: Optional[Callable[[str], bool]] = None) -> List[str]:
+    """Pick the files worth streaming, most important first, until char_limit is reached."""
+    candidates = [
+        stat for stat in stats
+        if not stat['binary'] and stat['additions'] + stat['deletions'] > 0
+        and (is_important is None or is_important(stat['path']))
+    ]
+    candidates.sort(key=lambda stat: file_importance(stat['path']), reverse=True)
+
+    selected: List[str] = []
+    expected = 0
+    for stat in candidates:
+        if expected >= char_limit:
+            break
+        selected.append(stat['path'])
+        expected += (stat['additions'] + stat['deletions']) * AVERAGE_LINE_CHARS
+    return selected
+
+
+def _iter_patch_lines(paths: List[str]) -> Iterator[str]:
+    """Stream `git diff --cached` for paths; the subprocess is killed if iteration stops early."""
+    env = dict(os.environ, GIT_LITERAL_PATHSPECS='1')
+    process = subprocess.Popen(
+        ['git', 'diff', '--cached', '--no-color', '--no-ext-diff', '--'] + paths,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+    )
+    try:
+        for raw_line in process.stdout:
+            yield raw_line.decode('utf-8', errors='replace')
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+
+
+def _header_path(header: str, ranks: Dict[str, int]) -> Optional[str]:
+    """The path in paths a "diff --git a/... b/..." header belongs to, or None when it can't be told."""
+    header = header.rstrip('\n')
+    index = header.find(' b/')
+    while index != -1:
+        path = header[index + 3:]
+        if path in ranks:
+            return path
+        index = header.find(' b/', index + 1)
+    return None
+
+
+def _take(lines: List[str], section: List[str], read: int, char_limit: int) -> int:
+    for line in section:
+        if read >= char_limit:
+            break
+        lines.append(line)
+        read += len(line)
+    return read
+
+
+def stream_patch(paths: List[str], char_limit: int, sources: Optional[Dict[str, str]] = None) -> str:
+    """Read the staged patch for paths in their order, stopping git once char_limit characters are read.
+
+    git prints a batch's files in path order rather than in the order asked
+    for. The file next in line is copied straight through; a file git prints
+    ahead of it is held back (no more than the characters still wanted)
+    until every file ranked before it has been read, or git has gone past
+    them without printing them. sources maps renamed paths to their old
+    path so git diffs them as renames.
+    """
+    sources = sources or {}
+    lines: List[str] = []
+    read = 0
+    # Batch paths to stay well below the platform's argument length limit
+    for start in range(0, len(paths), PATHS_PER_BATCH):
+        batch = paths[start:start + PATHS_PER_BATCH]
+        ranks = {path: rank for rank, path in enumerate(batch)}
+        git_order = sorted(batch)
+        passed = 0
+        # A rank is settled once its file has been copied or git has gone past it;
+        # the extra slot collects sections whose header names none of the paths.
+        settled = [False] * (len(batch) + 1)
+        held: Dict[int, List[str]] = {}
+        next_rank = 0
+        rank = -1
+        section: List[str] = []
+        section_size = 0
+        pathspec: List[str] = []
+        for path in batch:
+            pathspec.extend(_with_source(path, sources))
+        patch_lines = _iter_patch_lines(pathspec)
+        try:
+            for line in patch_lines:
+                if rank == -1 or line.startswith('diff --git '):
+                    if rank == next_rank:
+                        settled[rank] = True
+                    elif section:
+                        held.setdefault(rank, []).extend(section)
+                    path = _header_path(line, ranks)
+                    if path is None:
+                        rank = len(batch)
+                    else:
+                        rank = ranks[path]
+                        while passed < len(git_order) and git_order[passed] < path:
+                            skipped = ranks[git_order[passed]]
+                            if skipped not in held:
+                                settled[skipped] = True
+                            passed += 1
+                    while next_rank < len(batch) and (settled[next_rank] or next_rank in held):
+                        if next_rank in held:
+                            read = _take(lines, held.pop(next_rank), read, char_limit)
+                            if read >= char_limit:
+                                return ''.join(lines)
+                            settled[next_rank] = True
+                        next_rank += 1
+                    section = []
+                    section_size = 0
+                if rank == next_rank:
+                    lines.append(line)
+                    read += len(line)
+                    if read >= char_limit:
+                        return ''.join(lines)
+                elif section_size < char_limit - read:
+                    section.append(line)
+                    section_size += len(line)
+        finally:
+            patch_lines.close()
+
+        if rank != next_rank and section:
+            held.setdefault(rank, []).extend(section)
+        for held_rank in sorted(held):
+            read = _take(lines, held[held_rank], read, char_limit)
+            if read >= char_limit:
+                return ''.join(lines)
+    return ''.join(lines)
+
+
+def collect_staged_changes(token_budget: int, is_important: Optional[Callable[[str], bool]] = None,
+                           cache: Optional[BlobSummaryCache] = None) -> Tuple[str, List[FileStat]]:
+    """Collect exact stats for every staged file plus a budget-sized patch.
+
+    Stats come from cheap numstat/name-status calls, or from the blob summary
+    cache when one is given; the patch is streamed only for important,
+    non-binary files and reading stops once it is large enough to fill the
+    prompt budget. With a cache, key changes missing from it are parsed
+    from that same patch.
+    """
+    char_limit = token_budget * PATCH_CHARS_PER_TOKEN
+    if cache is None:
+        stats = get_file_stats()
+        return stream_patch(select_patch_files(stats, char_limit, is_important), char_limit), stats
+
+    stats, unread = get_cached_file_stats(cache, is_important)
+    sources = {change['path']: change['old_path'] for change in unread if change['old_path'] is not None}
+    patch = stream_patch(select_patch_files(stats, char_limit, is_important), char_limit, sources)
+    fill_key_changes(cache, stats, unread, patch, char_limit)
+    return patch, stats
@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from extractors import EXTRACTOR_VERSION
+from schemas import RawChange
+
+DEFAULT_MAX_ENTRIES = 20000
+SUMMARY_CACHE_FILENAME = os.path.join('ai-commit-generator', 'summaries.json')
+
+
+class BlobSummaryCache:
+    """Per-file diff summaries keyed by (old blob, new blob, path).
+
+    A blob pair always diffs the same way, so during amend and fixup loops
+    only files whose staged content changed need to be read and parsed
+    again. Entries are kept in one JSON file in least recently used order
+    and the oldest are dropped beyond max_entries. Saving is best-effort.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: Optional['OrderedDict[str, Dict[str, Any]]'] = None
+        self._dirty = False
+
+    @classmethod
+    def for_git_dir(cls, git_dir: str) -> 'BlobSummaryCache':
+        return cls(os.path.join(git_dir, SUMMARY_CACHE_FILENAME))
+
+    @staticmethod
+    def make_key(change: RawChange) -> str:
+        # Object IDs are fixed-length hex, so the path can't make keys ambiguous;
+        # entries from an older extractor simply age out
+        return f"{EXTRACTOR_VERSION}:{change['old_blob']}:{change['new_blob']}:{change['path']}"
+
+    def _load(self) -> 'OrderedDict[str, Dict[str, Any]]':
+        if self._entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f, object_pairs_hook=OrderedDict)
+                self._entries = entries if isinstance(entries, OrderedDict) else OrderedDict()
+            except (OSError, ValueError):
+                self._entries = OrderedDict()
+        return self._entries
+
+    def get(self, change: RawChange) -> Optional[Dict[str, Any]]:
+        """Return the summary stored for a change and mark it as recently used."""
+        entries = self._load()
+        key = self.make_key(change)
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+            self._dirty = True
+        return entry
+
+    def put(self, change: RawChange, entry: Dict[str, Any]) -> None:
+        entries = self._load()
+        key = self.make_key(change)
+        entries[key] = entry
+        entries.move_to_end(key)
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the entries back, dropping the least recently used beyond max_entries."""
+        if not self._dirty:
+            return
+        entries = self._load()
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError:
+            pass
+        self._dirty = False
+
+    def clear(self) -> None:
+        self._entries = OrderedDict()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self._dirty = False
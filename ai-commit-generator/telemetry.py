@@ -0,0 +1,122 @@
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional
+from schemas import ProviderStats, TelemetryEntry
+
+TELEMETRY_FILENAME = os.path.join('ai-commit-generator', 'telemetry.jsonl')
+DEFAULT_MAX_BYTES = 256 * 1024
+# Entries looked at per provider when judging its recent behaviour
+RECENT_REQUESTS = 20
+# Older entries are ignored for routing, so a provider routed around is tried again
+RECENT_SECONDS = 24 * 60 * 60
+
+
+class TelemetryLedger:
+    """Append-only JSON lines log of provider requests in the git directory.
+
+    Each request adds one short line. Once the file grows past max_bytes
+    the older half is dropped, so reading it stays cheap. Writes are
+    best-effort and never fail a commit.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def for_git_dir(cls, git_dir: str) -> 'TelemetryLedger':
+        return cls(os.path.join(git_dir, TELEMETRY_FILENAME))
+
+    def record(self, provider: str, model: str, prompt_tokens: int, latency_ms: float, outcome: str) -> None:
+        entry = TelemetryEntry(timestamp=round(time.time(), 3), provider=provider, model=model,
+                               prompt_tokens=prompt_tokens, latency_ms=round(latency_ms, 1), outcome=outcome)
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # One write per line in append mode, so concurrent writers don't interleave
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            if os.path.getsize(self.path) > self.max_bytes:
+                self._compact()
+        except OSError:
+            pass
+
+    def _compact(self) -> None:
+        entries = self.read()
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.jsonl')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for entry in entries[len(entries) // 2:]:
+                    f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def read(self) -> List[TelemetryEntry]:
+        """All entries, oldest first; unreadable lines are skipped."""
+        entries: List[TelemetryEntry] = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and 'provider' in entry:
+                        entries.append(entry)
+        except OSError:
+            pass
+        return entries
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of values, or None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize_entries(entries: Iterable[TelemetryEntry]) -> Dict[str, ProviderStats]:
+    """Request count, error rate and p50/p95 latency per provider."""
+    by_provider: Dict[str, List[TelemetryEntry]] = {}
+    for entry in entries:
+        by_provider.setdefault(entry['provider'], []).append(entry)
+
+    stats: Dict[str, ProviderStats] = {}
+    for provider, provider_entries in by_provider.items():
+        latencies = [entry['latency_ms'] for entry in provider_entries if entry['outcome'] == 'ok']
+        errors = len(provider_entries) - len(latencies)
+        stats[provider] = ProviderStats(
+            requests=len(provider_entries),
+            errors=errors,
+            error_rate=errors / len(provider_entries),
+            p50_ms=percentile(latencies, 0.5),
+            p95_ms=percentile(latencies, 0.95),
+        )
+    return stats
+
+
+def recent_stats(entries: List[TelemetryEntry], per_provider: int = RECENT_REQUESTS,
+                 max_age: float = RECENT_SECONDS) -> Dict[str, ProviderStats]:
+    """Stats over each provider's last per_provider requests within max_age seconds."""
+    cutoff = time.time() - max_age
+    recent: Dict[str, List[TelemetryEntry]] = {}
+    for entry in reversed(entries):
+        if entry['timestamp'] < cutoff:
+            break
+        bucket = recent.setdefault(entry['provider'], [])
+        if len(bucket) < per_provider:
+            bucket.append(entry)
+    return summarize_entries(entry for bucket in recent.values() for entry in bucket)
@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Set to "1" or "stderr" to print timings to stderr, or to a file path to append JSON lines to it.
+TIMING_ENV = 'AI_COMMIT_TIMING'
+
+_state = threading.local()
+
+
+class Profile:
+    """Timing spans recorded on one thread during one run, in start order."""
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+        self._depth = 0
+
+    @property
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'total_ms': self.total_ms, 'spans': self.spans}
+
+
+def current_profile() -> Optional[Profile]:
+    return getattr(_state, 'profile', None)
+
+
+@contextmanager
+def profiling(profile: Optional[Profile]) -> Iterator[Optional[Profile]]:
+    """Record spans on this thread into profile; does nothing when profile is None."""
+    previous = current_profile()
+    _state.profile = profile
+    try:
+        yield profile
+    finally:
+        _state.profile = previous
+
+
+@contextmanager
+def span(name: str) -> Iterator[Dict[str, Any]]:
+    """Time a pipeline stage.
+
+    The yielded dict takes extra fields, such as sizes, to store with the
+    span. Without an active profile only that dict is created.
+    """
+    data: Dict[str, Any] = {}
+    profile = current_profile()
+    if profile is None:
+        yield data
+        return
+
+    record: Dict[str, Any] = {'name': name, 'depth': profile._depth}
+    profile.spans.append(record)
+    profile._depth += 1
+    start = time.perf_counter()
+    try:
+        yield data
+    finally:
+        record['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        record.update(data)
+        profile._depth -= 1
+
+
+def timing_destination() -> Optional[str]:
+    """Where to emit timings according to AI_COMMIT_TIMING, or None when disabled."""
+    value = os.getenv(TIMING_ENV, '').strip()
+    if not value or value.lower() in ('0', 'false', 'no'):
+        return None
+    if value.lower() in ('1', 'true', 'yes', 'stderr'):
+        return 'stderr'
+    return value
+
+
+def emit_profile(profile: Profile, destination: str) -> None:
+    """Write the profile as one JSON line to stderr or append it to a file."""
+    line = json.dumps(dict(profile.to_dict(), timestamp=time.time()))
+    if destination == 'stderr':
+        print(line, file=sys.stderr)
+        return
+    try:
+        with open(destination, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    except OSError as e:
+        print(f"Warning: could not write timings to {destination}: {e}", file=sys.stderr)
+
+
+def format_profile(profile: Profile) -> str:
+    """Per-stage breakdown as an indented table."""
+    total_ms = profile.total_ms
+    lines = [f"{'stage':<32} {'ms':>10} {'%':>6}  details"]
+    for record in profile.spans:
+        name = '  ' * record['depth'] + record['name']
+        duration = record.get('duration_ms', 0.0)
+        share = 100 * duration / total_ms if total_ms else 0.0
+        details = ', '.join(
+            f"{key}={value}" for key, value in record.items() if key not in ('name', 'depth', 'duration_ms')
+        )
+        lines.append(f"{name:<32} {duration:>10.1f} {share:>5.1f}%  {details}".rstrip())
+    lines.append(f"{'total':<32} {total_ms:>10.1f}")
+    return '\n'.join(lines)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Time classifying a commit's paths as important or ignored.
+
+Builds a temporary tree with nested .gitignore files and classifies a
+deterministic list of paths with ImportanceMatcher, comparing against the
+previous per-call regex list + root-only PathSpec implementation.
+
+The default budget is about three times the ~150 ms the matcher takes for
+100k paths, so reruns on a loaded machine don't fail, while a regression
+towards the legacy implementation (about a second) still does.
+
+Usage: python benchmarks/bench_is_important_file.py [--paths 100000] [--repeat 5] [--budget-ms 500]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ai-commit-generator'))
+
+from importance import ImportanceMatcher  # noqa: E402
+
+ROOT_GITIGNORE = "*.pyc\n__pycache__/\ndist/\n*.tmp\n"
+NESTED_GITIGNORE = "generated/\n*.snap\n!keep.snap\n"
+EXTENSIONS = ['py', 'js', 'ts', 'go', 'rs', 'md', 'json', 'lock', 'snap', 'pyc', 'min.js', 'map']
+
+
+def legacy_is_important_file(filename, gitignore_spec=None):
+    """The implementation ImportanceMatcher replaced."""
+    if gitignore_spec and gitignore_spec.match_file(filename):
+        return False
+
+    ignore_patterns = [
+        r'\.lock$', r'\.log$', r'\.map$', r'\.min\.',
+        r'package-lock\.json$', r'yarn\.lock$',
+        r'\.git/', r'node_modules/', r'vendor/',
+    ]
+
+    if any(re.search(pattern, filename) for pattern in ignore_patterns):
+        return False
+
+    return True
+
+
+def build_paths(count):
+    paths = []
+    for i in range(count):
+        package = f'packages/pkg_{i % 40}'
+        module = f'src/module_{(i // 40) % 50}'
+        if i % 17 == 0:
+            module += '/generated'
+        elif i % 23 == 0:
+            module = 'node_modules/dep_' + str(i % 7)
+        paths.append(f'{package}/{module}/file_{i}.{EXTENSIONS[i % len(EXTENSIONS)]}')
+    return paths
+
+
+def build_tree(root):
+    gitignore_dirs = ['']
+    with open(os.path.join(root, '.gitignore'), 'w', encoding='utf-8') as f:
+        f.write(ROOT_GITIGNORE)
+    for i in range(40):
+        directory = f'packages/pkg_{i}'
+        os.makedirs(os.path.join(root, directory))
+        with open(os.path.join(root, directory, '.gitignore'), 'w', encoding='utf-8') as f:
+            f.write(NESTED_GITIGNORE)
+        gitignore_dirs.append(directory)
+    return gitignore_dirs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--paths', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=500.0,
+                        help='maximum time for ImportanceMatcher to classify all paths')
+    args = parser.parse_args()
+
+    from pathspec import PathSpec
+    from pathspec.patterns.gitwildmatch import GitWildMatchPattern
+
+    paths = build_paths(args.paths)
+    with tempfile.TemporaryDirectory() as root:
+        gitignore_dirs = build_tree(root)
+
+        legacy_ms = matcher_ms = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            spec = PathSpec.from_lines(GitWildMatchPattern, ROOT_GITIGNORE.splitlines())
+            legacy = [legacy_is_important_file(path, spec) for path in paths]
+            legacy_ms = min(legacy_ms, (time.perf_counter() - start) * 1000)
+
+            # A fresh matcher each round, so compilation and cache warm-up are included
+            start = time.perf_counter()
+            matcher = ImportanceMatcher(root, gitignore_dirs)
+            current = [matcher.is_important(path) for path in paths]
+            matcher_ms = min(matcher_ms, (time.perf_counter() - start) * 1000)
+
+    print(f"{args.paths} paths")
+    print(f"legacy is_important_file: {legacy_ms:8.1f} ms ({sum(legacy)} important, root .gitignore only)")
+    print(f"ImportanceMatcher:        {matcher_ms:8.1f} ms ({sum(current)} important, nested .gitignore)")
+    print(f"speedup:                  {legacy_ms / matcher_ms:8.2f}x")
+
+    if matcher_ms > args.budget_ms:
+        print(f"FAIL: classification took longer than {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Benchmark the commit message pipeline on synthetic diffs.
+
+Every scenario from corpus.SCENARIOS is run through summarize_diff,
+clean_diff, is_important_file, build_prompt and the full
+generate_commit_message with an offline FakeAdapter. The report shows time
+and throughput per stage, peak memory of one full run and the prompt size.
+
+Prompt sizes are also checked against fixed budgets: the static prompt prefix
+plus the per-commit token budget for every scenario, and the tighter
+PROMPT_TOKEN_LIMITS below, so template growth fails the run on any machine.
+Each prompt must also be at least MIN_PROMPT_SAVING tokens shorter than the
+legacy template would build for the same diff. tests/test_prompt_budget.py
+enforces the same checks under pytest. After an intended prompt change,
+update MEASURED_PROMPT_TOKENS from the report; the limits follow from it.
+
+Results are compared with benchmarks/baselines.json: a scenario whose
+pipeline throughput drops, or whose peak memory or prompt size grows, by
+more than --tolerance fails the run. Baselines are machine specific;
+refresh them with --update-baselines after an intended change.
+
+Usage: python benchmarks/bench_pipeline.py [--scenario NAME ...] [--repeat 3] [--tolerance 0.3] [--update-baselines]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ai-commit-generator'))
+
+from adapters.fake import FakeAdapter  # noqa: E402
+from commit_message_generator import PROMPT_PREFIX, CommitMessageGenerator  # noqa: E402
+from compaction import estimate_tokens, get_token_budget  # noqa: E402
+from corpus import SCENARIOS, build_corpus  # noqa: E402
+from diff_parser import parse_diff  # noqa: E402
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+TOKEN_BUDGET = get_token_budget('cohere', 'command-r-plus')
+# Runs shorter than this are too noisy for a throughput comparison
+MIN_TIMED_MS = 10.0
+# Estimated prompt tokens per scenario, as measured with --update-baselines
+MEASURED_PROMPT_TOKENS = {
+    'small': 885,
+    'typical': 4007,
+    'large': 3927,
+    'lockfile': 1048,
+}
+# Headroom over the measured size: enough for a reworded instruction or two,
+# not for a new prompt section
+PROMPT_TOKEN_MARGIN = 0.05
+# Upper bounds on the estimated prompt tokens per scenario
+PROMPT_TOKEN_LIMITS = {
+    name: int(tokens * (1 + PROMPT_TOKEN_MARGIN)) for name, tokens in MEASURED_PROMPT_TOKENS.items()
+}
+
+# Tokens every scenario's prompt must save over LEGACY_PROMPT_TEMPLATE; the
+# shorter instructions alone save about 90
+MIN_PROMPT_SAVING = 80
+# The prompt template before the static instructions were moved to the front
+# and the change serialized as "field: value" lines, kept to measure the
+# reduction against
+LEGACY_PROMPT_TEMPLATE = """Analyze the following code changes and generate a Git commit message that follows the conventional commits specification. The changes include file modifications, additions, and deletions with the following context:
+
+Branch: {branch_name}
+Ticket: {ticket_number}
+
+Summary of Changes:
+Files Changed: {total_files}
+Lines Added: {total_additions}
+Lines Deleted: {total_deletions}
+File Types Modified: {file_types}
+
+Key Changes by File:{key_changes}
+
+Diff Excerpt:
+{diff_excerpt}
+
+Requirements:
+
+1. Follow this exact format:
+type(optional_scope): concise description
+
+[body]
+
+[footer]
+
+2. Type must be one of:
+- feat: New feature or significant enhancement
+- fix: Bug fixes
+- refactor: Code changes that neither fix bugs nor add features
+- test: Adding or modifying tests
+- docs: Documentation changes
+- chore: Maintenance tasks
+- style: Code style/formatting changes
+- perf: Performance improvements
+
+3. Description Guidelines:
+- Must be imperative mood ("add" not "added")
+- Maximum 50 characters
+- No period at the end
+- Should complete the sentence "If applied, this commit will..."
+
+4. Body Guidelines:
+- Wrap at 72 characters
+- Explain the WHAT and WHY, not the HOW
+- Include context about the changes
+- Describe technical details for complex changes
+- List any breaking changes or deprecations
+
+5. Footer Guidelines:
+- Reference the ticket number using "Refs: #{ticket_number}" if provided
+- List any breaking changes with "BREAKING CHANGE:"
+- Mention related issues/PRs if applicable
+
+Additional Rules:
+- Focus on the most significant changes first
+- Exclude any sensitive information, credentials, or internal identifiers
+- For large changes, group related modifications under a common theme
+- If changes span multiple concerns, focus on the primary purpose
+- Include migration notes if changes require updates to existing code"""
+
+
+def new_generator() -> CommitMessageGenerator:
+    """A fresh generator, so no memoized state carries over between runs."""
+    return CommitMessageGenerator(FakeAdapter(), token_budget=TOKEN_BUDGET)
+
+
+def legacy_format_key_changes(key_changes: Dict, token_budget: int) -> str:
+    result = []
+    used = 0
+    for index, (filename, changes) in enumerate(key_changes.items()):
+        if not changes:
+            continue
+        entry = [f"\n{filename}:"]
+        entry.extend(f"  - {change}" for change in list(dict.fromkeys(changes))[:5])
+        cost = estimate_tokens('\n'.join(entry))
+        if used + cost > token_budget:
+            result.append(f"\n... and {len(key_changes) - index} more files")
+            break
+        result.extend(entry)
+        used += cost
+    return '\n'.join(result)
+
+
+def legacy_build_prompt(diff: str) -> str:
+    """The prompt the legacy template builds for diff, from the same summary and excerpt budget."""
+    generator = new_generator()
+    summary = generator.build_summary(generator.summarize_diff(diff))
+    key_changes = legacy_format_key_changes(summary['key_changes'], TOKEN_BUDGET // 3)
+    diff_excerpt = generator.clean_diff(diff, TOKEN_BUDGET - estimate_tokens(key_changes)) or 'N/A'
+    return LEGACY_PROMPT_TEMPLATE.format(
+        branch_name='N/A', ticket_number='N/A', total_files=summary['total_files'],
+        total_additions=summary['total_additions'], total_deletions=summary['total_deletions'],
+        file_types=', '.join(summary['file_types']) if summary['file_types'] else 'unknown',
+        key_changes=key_changes, diff_excerpt=diff_excerpt,
+    )
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_scenario(diff: str, repeat: int) -> Dict:
+    paths = list(parse_diff(diff))
+    stages = {
+        'summarize_diff': lambda: new_generator().summarize_diff(diff),
+        'clean_diff': lambda: new_generator().clean_diff(diff),
+        'is_important_file': lambda: [g.is_important_file(path) for g in [new_generator()] for path in paths],
+        'build_prompt': lambda: new_generator().build_prompt(diff),
+        'generate_commit_message': lambda: new_generator().generate_commit_message(diff),
+    }
+    timings = {name: best_time(func, repeat) for name, func in stages.items()}
+
+    generator = new_generator()
+    tracemalloc.start()
+    generator.generate_commit_message(diff)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    prompt = generator.adapter.last_prompt or ''
+    legacy_prompt = legacy_build_prompt(diff)
+    megabytes = len(diff) / (1024 * 1024)
+    return {
+        'diff_mb': round(megabytes, 3),
+        'files': len(paths),
+        'stage_ms': {name: round(seconds * 1000, 3) for name, seconds in timings.items()},
+        'throughput_mb_s': round(megabytes / timings['generate_commit_message'], 3),
+        'peak_memory_mb': round(peak / (1024 * 1024), 3),
+        'prompt_bytes': len(prompt.encode('utf-8')),
+        'prompt_tokens': estimate_tokens(prompt),
+        'legacy_prompt_tokens': estimate_tokens(legacy_prompt),
+    }
+
+
+def find_regressions(name: str, result: Dict, baseline: Dict, tolerance: float):
+    timed = result['stage_ms']['generate_commit_message'] >= MIN_TIMED_MS
+    if timed and result['throughput_mb_s'] < baseline['throughput_mb_s'] * (1 - tolerance):
+        yield f"{name}: throughput {result['throughput_mb_s']} MB/s < baseline {baseline['throughput_mb_s']} MB/s"
+    for metric in ('peak_memory_mb', 'prompt_tokens'):
+        if result[metric] > baseline[metric] * (1 + tolerance):
+            yield f"{name}: {metric} {result[metric]} > baseline {baseline[metric]}"
+
+
+def check_prompt_budget(name: str, result: Dict):
+    limit = estimate_tokens(PROMPT_PREFIX) + TOKEN_BUDGET
+    if name in PROMPT_TOKEN_LIMITS:
+        limit = min(limit, PROMPT_TOKEN_LIMITS[name])
+    if result['prompt_tokens'] > limit:
+        yield f"{name}: prompt_tokens {result['prompt_tokens']} > budget {limit}"
+    if result['prompt_tokens'] > result['legacy_prompt_tokens'] - MIN_PROMPT_SAVING:
+        yield (f"{name}: prompt_tokens {result['prompt_tokens']} saves less than {MIN_PROMPT_SAVING} "
+               f"over the legacy template's {result['legacy_prompt_tokens']}")
+
+
+def print_result(name: str, result: Dict) -> None:
+    print(f"\n{name}: {result['diff_mb']:.2f} MB, {result['files']} files")
+    for stage, ms in result['stage_ms'].items():
+        throughput = result['diff_mb'] / (ms / 1000) if ms else float('inf')
+        print(f"  {stage:<24} {ms:10.1f} ms {throughput:10.1f} MB/s")
+    print(f"  {'pipeline throughput':<24} {result['throughput_mb_s']:10.1f} MB/s")
+    print(f"  {'peak memory':<24} {result['peak_memory_mb']:10.1f} MB")
+    print(f"  {'prompt':<24} {result['prompt_tokens']:10d} tokens ({result['prompt_bytes']} bytes)")
+    print(f"  {'legacy prompt':<24} {result['legacy_prompt_tokens']:10d} tokens")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run (repeatable; default: all)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='allowed relative regression against the baseline')
+    parser.add_argument('--update-baselines', action='store_true',
+                        help='store these results as the new baselines')
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    results = {}
+    regressions = []
+    for name in args.scenario or sorted(SCENARIOS):
+        result = run_scenario(build_corpus(**SCENARIOS[name]), args.repeat)
+        results[name] = result
+        print_result(name, result)
+        regressions.extend(check_prompt_budget(name, result))
+        if name in baselines and not args.update_baselines:
+            regressions.extend(find_regressions(name, result, baselines[name], args.tolerance))
+
+    if args.update_baselines and not regressions:
+        baselines.update({
+            name: {key: result[key] for key in ('throughput_mb_s', 'peak_memory_mb', 'prompt_tokens')}
+            for name, result in results.items()
+        })
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nUpdated {BASELINES_PATH}")
+        return
+
+    if regressions:
+        print("\nRegressions:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
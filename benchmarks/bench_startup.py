@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Measure hook startup: time from process start until the prompt is ready.
+
+The probe process imports main.py and the adapter factory the way the hook
+does and builds the prompt for a fixed diff. The run fails if the median
+overhead over a bare interpreter exceeds the budget, or if any provider SDK
+was imported before the prompt was ready.
+
+Usage: python benchmarks/bench_startup.py [--runs 7] [--budget-ms 100]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SOURCE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ai-commit-generator'))
+SDK_MODULES = ('cohere', 'openai')
+
+PROBE = """
+import sys
+import main
+from commit_message_generator import CommitMessageGenerator
+from language_model_factory import LanguageModelFactory
+
+diff = '''diff --git a/app/service.py b/app/service.py
+--- a/app/service.py
++++ b/app/service.py
+@@ -1,2 +1,3 @@
+ import os
++def handler(event):
+     return None
+'''
+generator = CommitMessageGenerator(adapter=None)
+prompt = generator.build_prompt(diff, 'feature/ABC-123', 'ABC-123', None)
+assert prompt
+print(','.join(name for name in {sdks!r} if name in sys.modules))
+"""
+
+
+def run(args, env):
+    start = time.perf_counter()
+    output = subprocess.check_output(args, cwd=SOURCE_DIR, env=env, text=True)
+    return time.perf_counter() - start, output.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=100.0,
+                        help='maximum allowed median overhead over a bare interpreter')
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=SOURCE_DIR)
+    probe = PROBE.format(sdks=SDK_MODULES)
+
+    baseline = [run([sys.executable, '-c', 'pass'], env)[0] for _ in range(args.runs)]
+    samples = []
+    loaded = ''
+    for _ in range(args.runs):
+        elapsed, loaded = run([sys.executable, '-c', probe], env)
+        samples.append(elapsed)
+
+    baseline_ms = statistics.median(baseline) * 1000
+    probe_ms = statistics.median(samples) * 1000
+    overhead_ms = probe_ms - baseline_ms
+
+    print(f"bare interpreter:   {baseline_ms:7.1f} ms")
+    print(f"prompt ready:       {probe_ms:7.1f} ms")
+    print(f"overhead:           {overhead_ms:7.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: provider SDKs imported before the prompt was ready: {loaded}", file=sys.stderr)
+        failed = True
+    if overhead_ms > args.budget_ms:
+        print("FAIL: startup overhead exceeds budget; inspect with "
+              "`python -X importtime main.py`", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Compare diff summarization throughput against the original implementation.
+
+Usage: python benchmarks/bench_summarize_diff.py [--size-mb 50] [--repeat 3] [--workers N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ai-commit-generator'))
+
+from diff_parser import parse_diff  # noqa: E402
+from parallel_diff import get_worker_count, parse_diff_parallel  # noqa: E402
+
+
+def legacy_summarize_diff(diff):
+    """The list-splitting implementation that parse_diff replaced."""
+    files_changed = {}
+    current_file = None
+
+    for line in diff.split('\n'):
+        if line.startswith('diff --git'):
+            parts = line.split()
+            if len(parts) >= 4:
+                current_file = parts[-1].lstrip('b/')
+                files_changed[current_file] = dict(
+                    additions=0,
+                    deletions=0,
+                    file_type=current_file.split('.')[-1] if '.' in current_file else 'unknown',
+                    important_changes=[]
+                )
+        elif current_file and line.startswith('+') and not line.startswith('+++'):
+            files_changed[current_file]['additions'] += 1
+            if re.match(r'^\+\s*(def|class|import|from|const|let|var|function|interface|type)', line):
+                clean_line = line.lstrip('+').strip()
+                if clean_line:
+                    files_changed[current_file]['important_changes'].append(clean_line)
+        elif current_file and line.startswith('-') and not line.startswith('---'):
+            files_changed[current_file]['deletions'] += 1
+
+    return files_changed
+
+
+def build_diff(size_mb: float) -> str:
+    """Build a deterministic multi-file diff of roughly size_mb megabytes."""
+    hunk = [
+        '@@ -10,8 +10,9 @@ class Example:',
+        '     context line one',
+        '-    old_value = compute(1)',
+        '+    new_value = compute(2)',
+        '+def helper_function(arg):',
+        '     context line two',
+        '-    removed = True',
+        '+    added = False',
+        '     context line three',
+        '     context line four',
+        '     context line five',
+    ]
+    target = int(size_mb * 1024 * 1024)
+    chunks = []
+    size = 0
+    index = 0
+    while size < target:
+        name = f'src/module_{index}/file_{index}.py'
+        header = [
+            f'diff --git a/{name} b/{name}',
+            'index 1234567..89abcde 100644',
+            f'--- a/{name}',
+            f'+++ b/{name}',
+        ]
+        section = '\n'.join(header + hunk * 20)
+        chunks.append(section)
+        size += len(section) + 1
+        index += 1
+    return '\n'.join(chunks)
+
+
+def measure(func, diff, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(diff)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=float, default=50.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None, help='parallel workers (default: usable cores)')
+    args = parser.parse_args()
+
+    diff = build_diff(args.size_mb)
+    megabytes = len(diff) / (1024 * 1024)
+
+    legacy_time, legacy_result = measure(legacy_summarize_diff, diff, args.repeat)
+    parser_time, parser_result = measure(parse_diff, diff, args.repeat)
+
+    workers = args.workers or get_worker_count()
+    parallel_time, parallel_result = measure(lambda text: parse_diff_parallel(text, workers, threshold=0), diff, args.repeat)
+
+    if legacy_result != parser_result:
+        print("Error: parse_diff output differs from the legacy implementation", file=sys.stderr)
+        sys.exit(1)
+    if list(parallel_result.items()) != list(parser_result.items()):
+        print("Error: parallel output differs from parse_diff", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Diff size: {megabytes:.1f} MB, {len(parser_result)} files")
+    print(f"legacy summarize_diff: {megabytes / legacy_time:8.1f} MB/s ({legacy_time:.3f}s)")
+    print(f"parse_diff:            {megabytes / parser_time:8.1f} MB/s ({parser_time:.3f}s)")
+    print(f"speedup:               {legacy_time / parser_time:8.2f}x")
+    print(f"parse_diff_parallel:   {megabytes / parallel_time:8.1f} MB/s ({parallel_time:.3f}s, {workers} workers)")
+    print(f"parallel speedup:      {parser_time / parallel_time:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Deterministic synthetic diffs for benchmarks.
+
+build_corpus() writes a `git diff`-style patch from a few parameters: number
+of files, hunk sizes, language mix, binary files, renames and the size of a
+lockfile change. The same parameters and seed always give the same diff.
+"""
+import random
+from typing import Dict, List, Sequence
+
+# Declaration line templates per extension; {n} is replaced with a counter
+SIGNATURES: Dict[str, Sequence[str]] = {
+    'py': ('def handler_{n}(request, *args):', 'class Model{n}(Base):', 'from package_{n} import helper'),
+    'js': ('function render{n}(props) {{', 'const value{n} = compute({n});', "import {{ util{n} }} from './util';"),
+    'ts': ('export interface Props{n} {{', 'export function load{n}(id: string): Item {{', 'type Key{n} = string;'),
+    'go': ('func Handle{n}(w http.ResponseWriter, r *http.Request) {{', 'type Service{n} struct {{'),
+    'rs': ('pub fn process_{n}(input: &str) -> Result<()> {{', 'impl Worker{n} {{', 'struct State{n} {{'),
+    'java': ('public class Service{n} {{', 'private static int count{n} = 0;'),
+    'md': ('## Section {n}',),
+    'json': ('  "key_{n}": "value",',),
+}
+BODY_LINES = (
+    'result = transform(value, options)',
+    'if (count > limit) return fallback;',
+    'log.debug("processing item %d", index)',
+    'items.append(normalize(entry))',
+    '    return response.json()',
+    '',
+    '# keep behaviour compatible with the old client',
+    'for (const entry of entries) {',
+)
+DEFAULT_LANGUAGES = {'py': 4, 'js': 2, 'ts': 2, 'go': 1, 'rs': 1, 'java': 1, 'md': 1, 'json': 1}
+
+
+def _hunk(rng: random.Random, ext: str, start: int, lines: int, counter: List[int]) -> List[str]:
+    body: List[str] = []
+    added = removed = context = 0
+    for _ in range(lines):
+        roll = rng.random()
+        if roll < 0.15:
+            counter[0] += 1
+            text = rng.choice(SIGNATURES[ext]).format(n=counter[0])
+            body.append('+' + text)
+            added += 1
+        elif roll < 0.45:
+            body.append('+    ' + rng.choice(BODY_LINES))
+            added += 1
+        elif roll < 0.65:
+            body.append('-    ' + rng.choice(BODY_LINES))
+            removed += 1
+        else:
+            body.append('     ' + rng.choice(BODY_LINES))
+            context += 1
+    header = f'@@ -{start},{removed + context} +{start},{added + context} @@'
+    return [header] + body
+
+
+def _file_section(rng: random.Random, path: str, ext: str, hunks: int, hunk_lines: int,
+                  counter: List[int], old_path: str = '') -> List[str]:
+    if old_path:
+        lines = [
+            f'diff --git a/{old_path} b/{path}',
+            'similarity index 87%',
+            f'rename from {old_path}',
+            f'rename to {path}',
+            'index 3b18e51..a4c2f0d 100644',
+            f'--- a/{old_path}',
+        ]
+    else:
+        lines = [
+            f'diff --git a/{path} b/{path}',
+            'index 3b18e51..a4c2f0d 100644',
+            f'--- a/{path}',
+        ]
+    lines.append(f'+++ b/{path}')
+    start = 1
+    for _ in range(hunks):
+        lines.extend(_hunk(rng, ext, start, hunk_lines, counter))
+        start += hunk_lines + rng.randint(5, 60)
+    return lines
+
+
+def _binary_section(path: str) -> List[str]:
+    return [
+        f'diff --git a/{path} b/{path}',
+        'index 0c1e4f2..9d7a3b1 100644',
+        f'Binary files a/{path} and b/{path} differ',
+    ]
+
+
+def _lockfile_section(lines: int) -> List[str]:
+    section = [
+        'diff --git a/package-lock.json b/package-lock.json',
+        'index 5f2a9c0..e71b3d4 100644',
+        '--- a/package-lock.json',
+        '+++ b/package-lock.json',
+        f'@@ -1,0 +1,{lines} @@',
+    ]
+    for i in range(lines):
+        if i % 4 == 0:
+            section.append(f'+    "node_modules/pkg-{i}": {{')
+        elif i % 4 == 1:
+            section.append(f'+      "version": "1.{i % 17}.{i % 5}",')
+        elif i % 4 == 2:
+            section.append(f'+      "resolved": "https://registry.npmjs.org/pkg-{i}/-/pkg-{i}-1.0.0.tgz",')
+        else:
+            section.append('+    },')
+    return section
+
+
+def build_corpus(files: int = 20, hunks_per_file: int = 3, hunk_lines: int = 20,
+                 languages: Dict[str, int] = DEFAULT_LANGUAGES, binary_files: int = 0,
+                 renames: int = 0, lockfile_lines: int = 0, seed: int = 0) -> str:
+    """Build a deterministic multi-file diff.
+
+    languages maps file extensions to relative weights. Renames are taken
+    from the text files; binary files and the lockfile come on top of them.
+    """
+    rng = random.Random(seed)
+    extensions = sorted(languages)
+    weights = [languages[ext] for ext in extensions]
+    counter = [0]
+    lines: List[str] = []
+
+    for index in range(files):
+        ext = rng.choices(extensions, weights)[0]
+        path = f'src/pkg_{index % 12}/module_{index}.{ext}'
+        old_path = f'lib/pkg_{index % 12}/module_{index}.{ext}' if index < renames else ''
+        lines.extend(_file_section(rng, path, ext, hunks_per_file, hunk_lines, counter, old_path))
+
+    for index in range(binary_files):
+        lines.extend(_binary_section(f'assets/image_{index}.png'))
+
+    if lockfile_lines:
+        lines.extend(_lockfile_section(lockfile_lines))
+
+    return '\n'.join(lines) + '\n'
+
+
+# Named scenarios used by bench_pipeline.py
+SCENARIOS: Dict[str, Dict] = {
+    'small': dict(files=3, hunks_per_file=2, hunk_lines=12, languages={'py': 1}),
+    'typical': dict(files=25, hunks_per_file=3, hunk_lines=20, binary_files=2, renames=2),
+    'large': dict(files=400, hunks_per_file=6, hunk_lines=40, binary_files=20, renames=30),
+    'lockfile': dict(files=4, hunks_per_file=2, hunk_lines=15, lockfile_lines=200000),
+}
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Local HTTP server imitating the Cohere generate and OpenAI chat completions APIs.
+
+Point the real adapters at it to measure hook latency, timeouts, hedging and
+batch concurrency without network access:
+
+    python benchmarks/mock_llm_server.py --port 8089 --latency lognormal:400:0.5 --error-rate 0.05
+    COHERE_BASE_URL=http://127.0.0.1:8089 OPENAI_BASE_URL=http://127.0.0.1:8089/v1 ai-commit-generator test
+
+Endpoints: POST /v1/generate (Cohere, "stream": true gives JSON lines) and
+POST /v1/chat/completions (OpenAI, "stream": true gives server-sent events).
+
+Latency specs: fixed:MS, uniform:LOW_MS:HIGH_MS, normal:MEAN_MS:STDDEV_MS,
+lognormal:MEDIAN_MS:SIGMA.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+DEFAULT_RESPONSE = "feat(mock): add generated change\n\nMessage served by the local mock LLM server."
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec into a sampler returning seconds."""
+    kind, _, params = spec.partition(':')
+    values = [float(value) for value in params.split(':')] if params else []
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == 'normal' and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == 'lognormal' and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Threaded mock server; use start()/stop() to run it in the background from benchmarks."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'fixed:0', error_rate: float = 0.0,
+                 error_status: int = 503, response: str = DEFAULT_RESPONSE, chunk_delay_ms: float = 20.0,
+                 seed: Optional[int] = None):
+        super().__init__((host, port), _Handler)
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.response = response
+        self.chunk_delay = chunk_delay_ms / 1000
+        self.stats: Dict[str, int] = {'requests': 0, 'errors': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def plan_request(self):
+        """Decide the latency of a request and whether it fails."""
+        with self._lock:
+            self.stats['requests'] += 1
+            latency = self.sample_latency(self._rng)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.stats['errors'] += 1
+        return latency, failed
+
+    def start(self) -> 'MockLLMServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def _chunks(text: str):
+    words = text.split(' ')
+    for index, word in enumerate(words):
+        yield word if index == len(words) - 1 else word + ' '
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockLLMServer
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, data: str) -> None:
+        payload = data.encode('utf-8')
+        self.wfile.write(f"{len(payload):x}\r\n".encode('ascii') + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'message': 'invalid JSON body'})
+            return
+
+        path = self.path.rstrip('/')
+        if path not in ('/v1/generate', '/v1/chat/completions'):
+            self._send_json(404, {'message': f'unknown endpoint {self.path}'})
+            return
+
+        latency, failed = self.server.plan_request()
+        time.sleep(latency)
+        if failed:
+            status = self.server.error_status
+            self._send_json(status, {'message': 'mock failure', 'error': {'message': 'mock failure', 'code': status}})
+            return
+
+        if path == '/v1/generate':
+            self._cohere_generate(request)
+        else:
+            self._openai_chat(request)
+
+    def _cohere_generate(self, request: dict) -> None:
+        text = self.server.response
+        generation_id = str(uuid.uuid4())
+        final = {
+            'id': generation_id,
+            'prompt': request.get('prompt', ''),
+            'generations': [{'id': generation_id, 'text': text, 'finish_reason': 'COMPLETE'}],
+            'meta': {'api_version': {'version': '1'}},
+        }
+        if not request.get('stream'):
+            self._send_json(200, final)
+            return
+
+        self._start_stream('application/stream+json')
+        for index, chunk in enumerate(_chunks(text)):
+            event = {'event_type': 'text-generation', 'is_finished': False, 'index': 0, 'text': chunk}
+            self._write_chunk(json.dumps(event) + '\n')
+            time.sleep(self.server.chunk_delay)
+        end = {'event_type': 'stream-end', 'is_finished': True, 'finish_reason': 'COMPLETE', 'response': final}
+        self._write_chunk(json.dumps(end) + '\n')
+        self._end_stream()
+
+    def _openai_chat(self, request: dict) -> None:
+        text = self.server.response
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = request.get('model', 'mock')
+        if not request.get('stream'):
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': text},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            })
+            return
+
+        self._start_stream('text/event-stream')
+        for chunk in _chunks(text):
+            event = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}],
+            }
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+            time.sleep(self.server.chunk_delay)
+        self._write_chunk("data: [DONE]\n\n")
+        self._end_stream()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', default='fixed:200', help='latency distribution spec')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=503, help='HTTP status of failed requests')
+    parser.add_argument('--chunk-delay-ms', type=float, default=20.0, help='delay between streamed chunks')
+    parser.add_argument('--response', default=DEFAULT_RESPONSE, help='message returned by every request')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.error_rate, args.error_status,
+                           args.response, args.chunk_delay_ms, args.seed)
+    print(f"Mock LLM server listening on {server.url}")
+    print(f"  COHERE_BASE_URL={server.url} OPENAI_BASE_URL={server.url}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.stats['requests']} requests ({server.stats['errors']} failed)")
+
+
+if __name__ == '__main__':
+    main()
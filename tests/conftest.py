@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The tool and the benchmark corpus are flat script directories, not packages
+for directory in ('ai-commit-generator', 'benchmarks'):
+    sys.path.insert(0, os.path.join(ROOT, directory))
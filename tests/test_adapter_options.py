@@ -0,0 +1,32 @@
+"""Shared provider settings must not break adapters that don't use them."""
+import pytest
+
+import main
+from language_model_factory import LOCAL_PROVIDERS, LanguageModelFactory
+
+SHARED_SETTINGS = {
+    'LANGUAGE_MODEL_MAX_TOKENS': '200',
+    'LANGUAGE_MODEL_CONNECT_TIMEOUT': '2',
+    'LANGUAGE_MODEL_READ_TIMEOUT': '10',
+}
+
+
+@pytest.mark.parametrize('provider', sorted(set(LanguageModelFactory.available_providers()) - LOCAL_PROVIDERS))
+def test_create_adapter_with_shared_settings(provider, monkeypatch, tmp_path):
+    for name, value in SHARED_SETTINGS.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv('LANGUAGE_MODEL_API_KEY', 'test-key')
+    monkeypatch.setenv('LANGUAGE_MODEL_REPLAY_FILE', str(tmp_path / 'replay.jsonl'))
+    monkeypatch.delenv('LANGUAGE_MODEL_HEDGE_PROVIDER', raising=False)
+    monkeypatch.delenv('LANGUAGE_MODEL_RECORD_FILE', raising=False)
+    try:
+        LanguageModelFactory.get_adapter_class(provider)
+    except ImportError as e:
+        pytest.skip(f"SDK for {provider} is not installed: {e}")
+
+    adapter = main.create_adapter(provider)
+    try:
+        if hasattr(adapter, 'max_tokens'):
+            assert adapter.max_tokens == 200
+    finally:
+        adapter.close()
@@ -0,0 +1,16 @@
+import pytest
+
+from batch import TokenBucket
+
+
+@pytest.mark.parametrize('rate', [0, -1.5])
+def test_token_bucket_rejects_non_positive_rates(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, 1)
+
+
+def test_token_bucket_starts_full():
+    bucket = TokenBucket(1000.0, 2)
+    bucket.acquire()
+    bucket.acquire()
+    bucket.acquire()
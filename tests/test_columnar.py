@@ -0,0 +1,31 @@
+from columnar import ColumnarChanges
+
+
+def test_add_after_read_without_key_changes():
+    changes = ColumnarChanges()
+    changes.add('a.py', 1, 0, ['def a'])
+    assert changes['a.py']['important_changes'] == ['def a']
+    changes.add('b.py', 1, 0, [])
+    assert changes['b.py']['important_changes'] == []
+    assert changes['a.py']['important_changes'] == ['def a']
+
+
+def test_extend_after_read():
+    changes = ColumnarChanges()
+    changes.add('a.py', 1, 0, ['def a'])
+    assert changes['a.py']['important_changes'] == ['def a']
+    other = ColumnarChanges()
+    other.add('b.py', 2, 1, [])
+    other.add('a.py', 1, 1, ['def a2'])
+    changes.extend(other)
+    assert changes['b.py']['important_changes'] == []
+    assert changes['a.py']['important_changes'] == ['def a', 'def a2']
+    assert changes['a.py']['additions'] == 2
+
+
+def test_extend_self():
+    changes = ColumnarChanges()
+    changes.add('a.py', 1, 0, ['def a'])
+    changes.extend(changes)
+    assert changes['a.py']['important_changes'] == ['def a', 'def a']
+    assert changes['a.py']['additions'] == 2
@@ -0,0 +1,41 @@
+from compaction import _fit_file, _line_cost, compact_diff, estimate_tokens, split_file_sections
+
+
+def make_diff(hunks, path='src/app.py'):
+    lines = [f"diff --git a/{path} b/{path}", f"--- a/{path}", f"+++ b/{path}"]
+    for index in range(hunks):
+        lines.append(f"@@ -{index * 10},3 +{index * 10},4 @@")
+        lines.append(" context line")
+        lines.append(f"+def handler_{index}(request, response, session, options):")
+        lines.append(f"+    value_{index} = compute(request)")
+        lines.append("+   ")
+    return '\n'.join(lines) + '\n'
+
+
+def test_sections_keep_only_changed_lines():
+    section, = split_file_sections(make_diff(2))
+    assert section.changed_lines == 6
+    assert [kept for _, kept in section.hunks] == [
+        ['@@ -0,3 +0,4 @@', '+def handler_0(request, response, session, options):', '+    value_0 = compute(request)'],
+        ['@@ -10,3 +10,4 @@', '+def handler_1(request, response, session, options):', '+    value_1 = compute(request)'],
+    ]
+
+
+def test_sections_drop_hunks_beyond_max_tokens():
+    section, = split_file_sections(make_diff(200), max_tokens=300)
+    assert sum(_line_cost(kept) for _, kept in section.hunks) <= 300
+    assert len(section.hunks) + section.dropped_hunks == 200
+
+
+def test_fit_file_counts_the_omitted_note():
+    section, = split_file_sections(make_diff(50))
+    for budget in range(40, 400, 7):
+        lines = _fit_file(section, budget)
+        assert lines[-1].endswith('more hunks omitted)')
+        assert _line_cost(lines) <= budget
+
+
+def test_compact_diff_stays_within_budget():
+    diff = ''.join(make_diff(40, f"pkg/module_{index}.py") for index in range(30))
+    for budget in (200, 800, 3000):
+        assert estimate_tokens(compact_diff(diff, budget)) <= budget
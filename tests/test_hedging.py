@@ -0,0 +1,43 @@
+import time
+
+from adapters.fake import FakeAdapter
+from commit_message_generator import CommitMessageGenerator
+from hedging import HedgedAdapter
+from resilience import CircuitBreaker, send_with_deadline
+
+
+class Provider(FakeAdapter):
+    def __init__(self, provider, model, fail=False):
+        super().__init__()
+        self.provider = provider
+        self.model = model
+        self.fail = fail
+
+    def send_message(self, prompt):
+        if self.fail:
+            self.calls += 1
+            raise RuntimeError(f'{self.provider} failed')
+        return super().send_message(prompt)
+
+
+def test_failing_provider_opens_its_own_circuit(tmp_path, monkeypatch):
+    monkeypatch.setenv('AI_COMMIT_RETRIES', '0')
+    primary = Provider('cohere', 'command-r-plus', fail=True)
+    backup = Provider('openai', 'gpt-3.5-turbo')
+    adapter = HedgedAdapter([primary, backup], delay=5)
+    breaker = CircuitBreaker(str(tmp_path / 'circuit.json'), failure_threshold=2)
+
+    for _ in range(3):
+        assert send_with_deadline(adapter, 'prompt', time.monotonic() + 10, breaker=breaker) == backup.response
+    # The open circuit keeps the failing provider out of the third race
+    assert primary.calls == 2
+    assert backup.calls == 3
+    assert not breaker.allow('cohere')
+    assert breaker.allow('openai')
+    assert breaker.allow('cohere+openai')
+
+
+def test_hedged_budget_is_the_smaller_providers(monkeypatch):
+    monkeypatch.delenv('AI_COMMIT_PROMPT_TOKENS', raising=False)
+    adapter = HedgedAdapter([Provider('cohere', 'command-r-plus'), Provider('openai', 'gpt-3.5-turbo')])
+    assert CommitMessageGenerator(adapter).get_token_budget() == 3000
@@ -0,0 +1,40 @@
+import pytest
+
+import main
+from commit_message_generator import HeuristicMessageGenerator
+from language_model_factory import LanguageModelFactory
+
+DIFF = (
+    "diff --git a/src/parser.py b/src/parser.py\n"
+    "--- a/src/parser.py\n+++ b/src/parser.py\n"
+    "@@ -1,1 +1,3 @@\n"
+    " import re\n"
+    "+def parse_header(line):\n"
+    "+    return line\n"
+)
+
+
+def test_heuristic_generator_builds_from_summary():
+    message = HeuristicMessageGenerator().generate_commit_message(DIFF, ticket_number='ABC-1')
+    assert message.splitlines()[0]
+    assert 'ABC-1' in message
+
+
+def test_heuristic_is_a_provider_without_adapter():
+    assert 'heuristic' in LanguageModelFactory.available_providers()
+    assert main.has_credentials('heuristic')
+    with pytest.raises(ValueError):
+        LanguageModelFactory.get_adapter_class('heuristic')
+
+
+def test_generate_message_with_heuristic_provider(monkeypatch):
+    monkeypatch.setattr(main, '_provider', 'heuristic')
+    monkeypatch.setattr(main, 'get_importance_matcher', lambda: None)
+    message = main.generate_message(DIFF, use_cache=False, use_daemon=False)
+    assert message == HeuristicMessageGenerator().generate_commit_message(DIFF)
+
+
+def test_heuristic_cannot_hedge(monkeypatch):
+    monkeypatch.setenv('LANGUAGE_MODEL_HEDGE_PROVIDER', 'heuristic')
+    with pytest.raises(ValueError, match='cannot hedge'):
+        main.create_adapter('fake')
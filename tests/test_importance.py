@@ -0,0 +1,44 @@
+from importance import ImportanceMatcher
+
+
+def make_matcher(tmp_path, files):
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    directories = [name.rpartition('/')[0] for name in files if name.endswith('.gitignore')]
+    return ImportanceMatcher(str(tmp_path), directories)
+
+
+def test_builtin_noise_is_ignored():
+    matcher = ImportanceMatcher()
+    for path in ('yarn.lock', 'app.log', 'dist/app.min.js', 'app.js.map', 'web/package-lock.json',
+                 'node_modules/dep/index.js', 'vendor/lib.go', 'sub/.git/config'):
+        assert not matcher.is_important(path), path
+    assert matcher.is_important('src/app.py')
+
+
+def test_last_matching_pattern_wins(tmp_path):
+    matcher = make_matcher(tmp_path, {
+        '.gitignore': '*.pyc\n*.snap\n',
+        'pkg/.gitignore': '!keep.snap\n*.tmp\n',
+    })
+    assert not matcher.is_important('pkg/a.snap')
+    assert matcher.is_important('pkg/keep.snap')
+    assert not matcher.is_important('keep.snap')
+    assert not matcher.is_important('pkg/deep/x.tmp')
+    assert not matcher.is_important('pkg/deep/x.pyc')
+    assert matcher.is_important('pkg/deep/x.py')
+
+
+def test_path_patterns_and_ignored_directories(tmp_path):
+    matcher = make_matcher(tmp_path, {
+        '.gitignore': 'build/\n/docs/*.html\n*.snap\n',
+        'docs/.gitignore': '!index.html\n',
+    })
+    assert not matcher.is_important('build/out.py')
+    assert not matcher.is_important('src/build/out.py')
+    assert not matcher.is_important('docs/page.html')
+    assert matcher.is_important('docs/index.html')
+    assert matcher.is_important('src/docs/page.html')
+    assert not matcher.is_important('docs/a.snap')
@@ -0,0 +1,56 @@
+import time
+
+from adapters.fake import FakeAdapter
+from commit_message_generator import CommitMessageGenerator
+from resilience import CircuitBreaker
+from telemetry import TelemetryLedger
+
+
+def make_diff():
+    parts = []
+    for directory in ('api', 'web', 'docs'):
+        path = f"{directory}/module.py"
+        parts.append(
+            f"diff --git a/{path} b/{path}\n"
+            f"--- a/{path}\n+++ b/{path}\n"
+            "@@ -1,1 +1,2 @@\n"
+            " import os\n"
+            f"+def {directory}_handler(): pass\n"
+        )
+    return ''.join(parts)
+
+
+class FailingMaps(FakeAdapter):
+    """Fails every map request and answers the final one."""
+
+    def send_message(self, prompt):
+        if prompt.startswith('Summarize one part'):
+            raise RuntimeError('map failed')
+        return super().send_message(prompt)
+
+
+def make_generator(adapter, tmp_path, failure_threshold=3):
+    return CommitMessageGenerator(
+        adapter, map_reduce='always', deadline=time.monotonic() + 30,
+        breaker=CircuitBreaker(str(tmp_path / 'circuit.json'), failure_threshold=failure_threshold),
+        ledger=TelemetryLedger(str(tmp_path / 'telemetry.jsonl')),
+    )
+
+
+def test_map_requests_are_recorded(tmp_path):
+    generator = make_generator(FakeAdapter(), tmp_path)
+    generator.generate_commit_message(make_diff())
+    entries = generator.ledger.read()
+    assert generator.adapter.calls == 4
+    assert [entry['outcome'] for entry in entries] == ['ok'] * 4
+
+
+def test_failed_map_requests_reach_the_breaker(tmp_path, monkeypatch):
+    monkeypatch.setenv('AI_COMMIT_RETRIES', '0')
+    generator = make_generator(FailingMaps(), tmp_path)
+    message = generator.generate_commit_message(make_diff())
+    assert [entry['outcome'] for entry in generator.ledger.read()] == ['error'] * 3
+    # Three failed map requests open the circuit, so the final request is skipped
+    assert not generator.breaker.allow('fake')
+    assert generator.adapter.calls == 0
+    assert message != generator.adapter.response
@@ -0,0 +1,37 @@
+"""Prompts built from the synthetic corpus must stay within the prompt-size budget."""
+import pytest
+
+from adapters.fake import FakeAdapter
+from bench_pipeline import MIN_PROMPT_SAVING, PROMPT_TOKEN_LIMITS, TOKEN_BUDGET, legacy_build_prompt
+from commit_message_generator import PROMPT_PREFIX, CommitMessageGenerator
+from compaction import estimate_tokens
+from corpus import SCENARIOS, build_corpus
+
+
+def prompt_for(diff: str) -> str:
+    adapter = FakeAdapter()
+    CommitMessageGenerator(adapter, token_budget=TOKEN_BUDGET).generate_commit_message(diff)
+    return adapter.last_prompt or ''
+
+
+@pytest.mark.parametrize('scenario', sorted(SCENARIOS))
+def test_prompt_fits_budget(scenario):
+    prompt = prompt_for(build_corpus(**SCENARIOS[scenario]))
+
+    limit = min(estimate_tokens(PROMPT_PREFIX) + TOKEN_BUDGET, PROMPT_TOKEN_LIMITS[scenario])
+    assert estimate_tokens(prompt) <= limit
+
+
+@pytest.mark.parametrize('scenario', sorted(SCENARIOS))
+def test_prompt_is_shorter_than_legacy_template(scenario):
+    diff = build_corpus(**SCENARIOS[scenario])
+    assert estimate_tokens(prompt_for(diff)) <= estimate_tokens(legacy_build_prompt(diff)) - MIN_PROMPT_SAVING
+
+
+def test_every_scenario_has_a_limit():
+    assert set(PROMPT_TOKEN_LIMITS) == set(SCENARIOS)
+
+
+def test_prompt_starts_with_static_instructions():
+    # A stable prefix is what lets providers cache the instructions across commits
+    assert prompt_for(build_corpus(**SCENARIOS['small'])).startswith(PROMPT_PREFIX)
@@ -0,0 +1,87 @@
+import re
+import subprocess
+
+import pytest
+
+import staged
+from staged import stream_patch
+
+
+@pytest.fixture
+def staged_repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    subprocess.check_call(['git', 'init', '-q'])
+    for name in ('a.py', 'b.py', 'c.py', 'd.py'):
+        (tmp_path / name).write_text(''.join(f"line {name} {i}\n" for i in range(50)))
+    subprocess.check_call(['git', 'add', '.'])
+    return tmp_path
+
+
+def files_in(patch):
+    return re.findall(r'^diff --git a/(\S+)', patch, re.MULTILINE)
+
+
+def test_stream_patch_keeps_rank_order(staged_repo):
+    patch = stream_patch(['d.py', 'b.py', 'a.py', 'c.py'], 10 ** 9)
+    assert files_in(patch) == ['d.py', 'b.py', 'a.py', 'c.py']
+
+
+def test_stream_patch_cuts_lowest_ranked_files(staged_repo):
+    full = stream_patch(['a.py'], 10 ** 9)
+    patch = stream_patch(['d.py', 'c.py', 'a.py'], 2 * len(full))
+    assert files_in(patch) == ['d.py', 'c.py']
+    assert len(patch) >= 2 * len(full)
+
+
+def test_stream_patch_stops_reading_at_limit(staged_repo, monkeypatch):
+    consumed = []
+    iter_patch_lines = staged._iter_patch_lines
+
+    def counting(paths):
+        for line in iter_patch_lines(paths):
+            consumed.append(line)
+            yield line
+
+    monkeypatch.setattr(staged, '_iter_patch_lines', counting)
+    patch = stream_patch(['a.py', 'b.py', 'c.py', 'd.py'], 200)
+    assert files_in(patch) == ['a.py']
+    assert len(consumed) == patch.count('\n')
+
+
+def test_cold_cache_reads_each_patch_once(staged_repo, monkeypatch):
+    from summary_cache import BlobSummaryCache
+
+    (staged_repo / 'e.py').write_text('def handler():\n    return 1\n')
+    subprocess.check_call(['git', 'add', 'e.py'])
+    streamed = []
+    iter_patch_lines = staged._iter_patch_lines
+
+    def counting(paths):
+        streamed.append(list(paths))
+        return iter_patch_lines(paths)
+
+    monkeypatch.setattr(staged, '_iter_patch_lines', counting)
+    cache = BlobSummaryCache(str(staged_repo / 'summaries.json'))
+    patch, stats = staged.collect_staged_changes(10 ** 6, cache=cache)
+
+    assert len(streamed) == 1
+    assert files_in(patch) == sorted(stat['path'] for stat in stats)
+    key_changes = {stat['path']: stat['important_changes'] for stat in stats}
+    assert key_changes['e.py'] == ['def handler():']
+
+    streamed.clear()
+    warm = BlobSummaryCache(str(staged_repo / 'summaries.json'))
+    _, warm_stats = staged.collect_staged_changes(10 ** 6, cache=warm)
+    assert {stat['path']: stat['important_changes'] for stat in warm_stats} == key_changes
+    assert len(streamed) == 1
+
+
+def test_cut_file_key_changes_are_not_cached(staged_repo):
+    from summary_cache import BlobSummaryCache
+
+    cache = BlobSummaryCache(str(staged_repo / 'summaries.json'))
+    patch, stats = staged.collect_staged_changes(10, cache=cache)
+    streamed = files_in(patch)
+    cached = {change['path']: cache.get(change) for change in staged.get_raw_changes()}
+    assert cached[streamed[-1]]['important_changes'] is None
+    assert all(cached[path]['important_changes'] is not None for path in streamed[:-1])